@@ -0,0 +1,304 @@
+import asyncio, logging, random, time, uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from redis import asyncio as aioredis
+
+from agent.constants import *
+from agent.exceptions import ChatAdmissionRejectedError
+from core.constants import PROJECT_LOGGER_NAME
+
+logger = logging.getLogger(PROJECT_LOGGER_NAME)
+
+# Awaited with the 1-based queue position of a waiting turn whenever it changes
+PositionCallback = Optional[Callable[[int], Awaitable[None]]]
+
+# Take a cluster-wide slot if fewer than the limit are held, after dropping
+# slots whose lease has expired.
+# KEYS[1]: sorted set of slot tokens scored by acquisition time
+# ARGV: expired_before, now, limit, token
+ACQUIRE_CLUSTER_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# Extend the lease of a cluster-wide slot that is still held
+# KEYS[1]: sorted set of slot tokens scored by acquisition time
+# ARGV: now, token
+RENEW_CLUSTER_SLOT_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class AdmissionController:
+    """
+    Limits how many chat turns call the model at the same time.
+
+    Up to max_concurrency turns run at once in this process. Further turns wait
+    in a queue of at most max_queue_size turns, served round robin across
+    sessions so one chat sending many messages cannot hold back the others.
+    Turns of the same session keep their order. A turn arriving at a full queue
+    is rejected immediately, and a turn still waiting after queue_timeout_sec
+    is rejected then.
+
+    If a Redis URL is given, an admitted turn also takes one of
+    cluster_max_concurrency slots shared by every worker, polling with
+    exponential backoff from poll_ms up to max_poll_ms. It is rejected if no
+    slot frees up within queue_timeout_sec. Slots are leased for lease_sec and
+    the lease is renewed while the turn runs, so only the slots of a crashed
+    worker expire. If Redis is unavailable, turns are only limited per process.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        redis_url: Optional[str] = None,
+        cluster_max_concurrency: int = 0,
+        lease_sec: float = 120,
+        poll_ms: float = 100,
+        max_poll_ms: float = 2000,
+        queue_timeout_sec: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.redis_url = redis_url
+        self.cluster_max_concurrency = cluster_max_concurrency
+        self.lease_sec = lease_sec
+        self.poll_sec = poll_ms / 1000
+        self.max_poll_sec = max_poll_ms / 1000
+        self.queue_timeout_sec = queue_timeout_sec
+        self._active = 0
+        # Session ID -> waiting futures; the first session is served next
+        self._waiters = OrderedDict()
+        self._queued = 0
+        self._positions = {}
+        self._callbacks = {}
+        self._tasks = set()
+        self._redis = None
+        self._redis_loop = None
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    @asynccontextmanager
+    async def admit(self, session_id: str, on_position: PositionCallback = None):
+        """
+        Wait for a free slot, hold it while the block runs and release it
+        afterwards. Raises ChatAdmissionRejectedError if the queue is full or
+        no slot frees up within queue_timeout_sec.
+        """
+        deadline = (
+            time.monotonic() + self.queue_timeout_sec
+            if self.queue_timeout_sec
+            else None
+        )
+        await self.acquire(session_id, on_position)
+        try:
+            token = await self.acquire_cluster_slot(deadline)
+            heartbeat = self.start_heartbeat(token)
+            try:
+                yield
+            finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                await self.release_cluster_slot(token)
+        finally:
+            self.release()
+
+    async def acquire(self, session_id: str, on_position: PositionCallback = None):
+        """Take a slot in this process, waiting in the queue if none is free."""
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            self._stats["admitted"] += 1
+            return
+        if self._queued >= self.max_queue_size:
+            self._stats["rejected"] += 1
+            raise ChatAdmissionRejectedError(ERR_MSG_SERVER_BUSY)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(session_id, deque()).append(future)
+        self._queued += 1
+        self._stats["queued"] += 1
+        self._callbacks[future] = on_position
+        self.notify_positions()
+        timer = None
+        if self.queue_timeout_sec:
+            timer = asyncio.get_running_loop().call_later(
+                self.queue_timeout_sec, self.expire_waiter, session_id, future
+            )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            else:
+                self.remove_waiter(session_id, future)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self._callbacks.pop(future, None)
+            self._positions.pop(future, None)
+        self._stats["admitted"] += 1
+
+    def release(self):
+        """Hand the slot to the next waiting turn, or free it."""
+        while self._waiters:
+            session_id, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                # The session waits for its next turn behind the other sessions
+                self._waiters.move_to_end(session_id)
+            else:
+                del self._waiters[session_id]
+            self._queued -= 1
+            if not future.done():
+                future.set_result(None)
+                self.notify_positions()
+                return
+        self._active -= 1
+
+    def remove_waiter(self, session_id: str, future: asyncio.Future):
+        """Remove a turn that stopped waiting from the queue."""
+        waiters = self._waiters.get(session_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        if not waiters:
+            del self._waiters[session_id]
+        self._queued -= 1
+        self.notify_positions()
+
+    def expire_waiter(self, session_id: str, future: asyncio.Future):
+        """Reject a turn that waited in the queue for queue_timeout_sec."""
+        if future.done():
+            return
+        self.remove_waiter(session_id, future)
+        self._stats["rejected"] += 1
+        future.set_exception(ChatAdmissionRejectedError(ERR_MSG_SERVER_BUSY))
+
+    def queue_order(self) -> list:
+        """Return the waiting futures in the order they will be admitted."""
+        queues = list(self._waiters.values())
+        order = []
+        depth = 0
+        while True:
+            row = [waiters[depth] for waiters in queues if len(waiters) > depth]
+            if not row:
+                return order
+            order.extend(row)
+            depth += 1
+
+    def notify_positions(self):
+        """Report the new queue position of every waiting turn whose position changed."""
+        for index, future in enumerate(self.queue_order()):
+            position = index + 1
+            if self._positions.get(future) == position:
+                continue
+            self._positions[future] = position
+            callback = self._callbacks.get(future)
+            if callback is not None:
+                task = asyncio.get_running_loop().create_task(callback(position))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def get_redis(self) -> Optional[aioredis.Redis]:
+        """
+        Return the Redis client for cluster-wide slots, or None if not configured.
+        Pooled connections belong to the event loop that opened them, so a new
+        client is created if the running loop changes.
+        """
+        if not self.redis_url:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = aioredis.Redis.from_url(self.redis_url)
+            self._redis_loop = loop
+        return self._redis
+
+    async def acquire_cluster_slot(
+        self, deadline: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Wait for a cluster-wide slot and return its token. Raises
+        ChatAdmissionRejectedError if none frees up before the deadline
+        (a time.monotonic() value).
+        """
+        client = self.get_redis()
+        if client is None:
+            return None
+        token = uuid.uuid4().hex
+        delay = self.poll_sec
+        while True:
+            now = time.time()
+            try:
+                acquired = await client.eval(
+                    ACQUIRE_CLUSTER_SLOT_SCRIPT,
+                    1,
+                    ADMISSION_REDIS_KEY,
+                    now - self.lease_sec,
+                    now,
+                    self.cluster_max_concurrency,
+                    token,
+                )
+            except aioredis.RedisError as e:
+                logger.warning(f"Cluster admission unavailable, admitting locally: {e}")
+                return None
+            if acquired:
+                return token
+            # Back off, with jitter so waiting workers do not poll in step
+            sleep = random.uniform(delay / 2, delay)
+            if deadline is not None and time.monotonic() + sleep > deadline:
+                self._stats["rejected"] += 1
+                raise ChatAdmissionRejectedError(ERR_MSG_SERVER_BUSY)
+            await asyncio.sleep(sleep)
+            delay = min(delay * 2, self.max_poll_sec)
+
+    def start_heartbeat(self, token: Optional[str]) -> Optional[asyncio.Task]:
+        """Start renewing the lease of a cluster-wide slot while it is held."""
+        if token is None:
+            return None
+        return asyncio.get_running_loop().create_task(self.renew_cluster_slot(token))
+
+    async def renew_cluster_slot(self, token: str):
+        """Renew the lease of a cluster-wide slot every third of lease_sec."""
+        while True:
+            await asyncio.sleep(self.lease_sec / 3)
+            try:
+                renewed = await self.get_redis().eval(
+                    RENEW_CLUSTER_SLOT_SCRIPT,
+                    1,
+                    ADMISSION_REDIS_KEY,
+                    time.time(),
+                    token,
+                )
+            except aioredis.RedisError as e:
+                # Retried on the next beat, before the lease runs out
+                logger.warning(f"Failed to renew cluster admission slot: {e}")
+                continue
+            if not renewed:
+                logger.warning("Cluster admission slot expired before its turn ended")
+                return
+
+    async def release_cluster_slot(self, token: Optional[str]):
+        """Give a cluster-wide slot back."""
+        if token is None:
+            return
+        try:
+            await self.get_redis().zrem(ADMISSION_REDIS_KEY, token)
+        except aioredis.RedisError as e:
+            # The lease expires on its own
+            logger.warning(f"Failed to release cluster admission slot: {e}")
+
+    def stats(self) -> dict:
+        """Return the running and waiting turns and the admission counters."""
+        return {**self._stats, "active": self._active, "queue_depth": self._queued}
@@ -12,6 +12,9 @@ class AgentConfig(AppConfig):
         """
         This method is called when the app is ready.
         """
+        # Register signal handlers
+        from agent import signals
+
         allowed_commands = {"runserver"}
         if len(sys.argv) > 1 and sys.argv[1] in allowed_commands:
             if sys.argv[1] == "runserver" and os.environ.get("RUN_MAIN") != "true":
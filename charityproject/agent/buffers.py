@@ -0,0 +1,167 @@
+import logging, queue, threading, time
+from typing import List, Type
+
+from django.db import OperationalError, close_old_connections
+from django.db.models import Model
+
+from core.constants import PROJECT_LOGGER_NAME
+
+logger = logging.getLogger(PROJECT_LOGGER_NAME)
+
+
+class WriteBehindBuffer:
+    """
+    Collects unsaved model instances and saves them in batches with bulk_create.
+
+    add() only queues the instance. A worker thread writes the queued instances
+    once max_batch_size of them are collected or max_wait_ms has elapsed since
+    the first one arrived, so concurrent writers share one INSERT and one
+    database write lock instead of taking one each. A batch that hits a locked
+    database is retried up to max_retries times.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        model: Type[Model],
+        max_batch_size: int = 100,
+        max_wait_ms: float = 1000,
+        max_retries: int = 2,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_ms / 1000
+        self.max_retries = max_retries
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._flush_count = 0
+        self._row_count = 0
+        self._failed_row_count = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def add(self, instance: Model) -> None:
+        """Queue an unsaved instance to be written with the next batch."""
+        self._ensure_worker()
+        self._queue.put(instance)
+
+    def flush(self) -> None:
+        """Block until every queued instance has been written."""
+        self._queue.join()
+
+    def close(self, timeout: float = 5) -> None:
+        """Write the queued instances and stop the worker thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+            return
+        # Without a worker, write what is left from the calling thread
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="write-behind-buffer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        """Worker loop: collect a batch, write it, repeat until stopped."""
+        while True:
+            batch, stopped = self._collect_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stopped):
+                self._queue.task_done()
+            if stopped:
+                return
+
+    def _collect_batch(self) -> tuple[List[Model], bool]:
+        """
+        Block for the first instance, then gather more until the batch is full
+        or the wait window closes. Also returns whether close() was called.
+        """
+        first = self._queue.get()
+        if first is self._STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[Model]) -> None:
+        """Save the batch in one bulk_create, retrying while the database is locked."""
+        started = time.monotonic()
+        failed = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                close_old_connections()
+                self.model.objects.bulk_create(batch)
+                break
+            except OperationalError as e:
+                if attempt < self.max_retries:
+                    time.sleep(0.1 * (attempt + 1))
+                    continue
+                logger.error(f"Failed to write {len(batch)} buffered rows: {e}")
+                failed = True
+            except Exception as e:
+                # The worker must keep running for the rows queued after these
+                logger.error(f"Failed to write {len(batch)} buffered rows: {e}")
+                failed = True
+                break
+        self._record_flush(len(batch), (time.monotonic() - started) * 1000, failed)
+
+    def _record_flush(self, size: int, elapsed_ms: float, failed: bool) -> None:
+        with self._lock:
+            self._flush_count += 1
+            if failed:
+                self._failed_row_count += size
+            else:
+                self._row_count += size
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+    def queue_depth(self) -> int:
+        """Return the number of instances waiting to be written."""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """Return the queue depth, the written and failed rows and flush latencies."""
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth(),
+                "flushes": self._flush_count,
+                "rows": self._row_count,
+                "failed_rows": self._failed_row_count,
+                "last_flush_ms": self._last_flush_ms,
+                "max_flush_ms": self._max_flush_ms,
+                "avg_flush_ms": (
+                    self._total_flush_ms / self._flush_count
+                    if self._flush_count
+                    else 0.0
+                ),
+            }
@@ -9,16 +9,43 @@ ERR_MSG_MISSING_FIELDS = (
 ERR_MSG_INVALID_JSON = (
     "Invalid JSON format. Please check the message format and try again."
 )
+ERR_MSG_TURN_IN_PROGRESS = (
+    "I'm still working on my reply to your previous message. "
+    "Please send your next message once it has arrived."
+)
+ERR_MSG_SERVER_BUSY = (
+    "I'm helping a lot of people right now and can't take your message at the moment. "
+    "Please try again in a minute."
+)
 # Message types used in WebSocket communication
 MESSAGE_TYPE_ASSISTANT = "assistant.message"
+MESSAGE_TYPE_ASSISTANT_CHUNK = "assistant.message.chunk"
+MESSAGE_TYPE_ASSISTANT_CANCELLED = "assistant.message.cancelled"
 MESSAGE_TYPE_ERROR = "error.message"
+MESSAGE_TYPE_QUEUE_POSITION = "queue.position"
 MESSAGE_TYPE_CLOSE = "websocket.close"
 # WebSocket close code for unauthorized access
 UNAUTHORIZED_ACCESS_CODE = 4001
+# Progress message sent while a turn waits for admission
+QUEUE_POSITION_MSG = (
+    "Many people are chatting right now. You are number {position} in line..."
+)
+# Redis sorted set holding the cluster-wide admission slots
+ADMISSION_REDIS_KEY = "chat:admission:slots"
+# Django cache key prefix of the per-FAQ-entry versions of the FAQ answer cache
+FAQ_ANSWER_VERSION_KEY_PREFIX = "agent:faq_answer_version"
 # Limit for number of recommended children to return
 MAX_CHILDREN_RESULTS = 3
 
 
+class TurnPolicy:
+    """What to do with a message that arrives while a reply is being generated."""
+
+    QUEUE = "queue"
+    SUPERSEDE = "supersede"
+    REJECT = "reject"
+
+
 class MessageSender:
     USER = "user"
     ASSISTANT = "assistant"
@@ -59,9 +86,58 @@ class OpenAIAPIErrorMessages:
     UNDEFINED_TOOL_CALL = (
         "OpenAI model wants to call a function not defined: {function_name}"
     )
+    INVALID_TOOL_ARGUMENTS = (
+        "OpenAI model called {function_name} with arguments that are not valid JSON"
+    )
     UNKNOWN_FINISH_REASON = "Unexpected finish_reason: {finish_reason}"
 
 
+# Intents recognised by the intent router; the tool intents use the tool names
+INTENT_FAQ = "search_relevant_faqs"
+INTENT_CHILD_SEARCH = "fetch_children"
+INTENT_OTHER = "other"
+# Intents the router answers without asking the model which tool to call.
+# Child searches need arguments extracted by the model, so they are not routed.
+ROUTED_INTENTS = {INTENT_FAQ}
+# Labelled example utterances the intent centroids are computed from
+INTENT_EXAMPLES = {
+    INTENT_FAQ: [
+        "How can I donate?",
+        "What payment methods do you accept?",
+        "What is the difference between a one-time donation and a monthly donation?",
+        "How are donations spent?",
+        "What percentage of my donation reaches the children?",
+        "What is The Virtual Charity's mission?",
+        "Is my donation tax deductible?",
+        "How do I cancel my monthly sponsorship?",
+        "Can I write letters to the child I sponsor?",
+        "How do I contact the support team?",
+    ],
+    INTENT_CHILD_SEARCH: [
+        "I want to sponsor a child from Kenya.",
+        "Are there any young girls I can sponsor?",
+        "I'm looking to sponsor a child who has a passion for football.",
+        "Show me boys between 5 and 8 years old.",
+        "Is there a child whose birthday is in May?",
+        "Find a child who loves drawing and music.",
+        "Who dreams of becoming a doctor?",
+        "Can you introduce me to another child?",
+    ],
+    INTENT_OTHER: [
+        "Hello, how are you?",
+        "Thank you!",
+        "Good morning!",
+        "Who are you?",
+        "Can you give me a recipe for pancakes?",
+        "What's the weather like today?",
+        "Tell me a joke.",
+        "Goodbye.",
+    ],
+}
+
+# Joins the context returned by tool calls answered in the same turn
+TOOL_RESULTS_SEPARATOR = "\n\n"
+
 RELEVANT_DOCS_FORMAT = (
     "FAQ ID:{id}\nQuestion:{question}\nAnswer:{answer}\nLink:{link}\n\n"
 )
@@ -1,7 +1,10 @@
-import json, logging
+import asyncio, json, logging
+from collections import deque
 from typing import Dict
 
+from django.conf import settings
 from django.utils import timezone
+from channels.consumer import get_handler_name
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 
@@ -32,6 +35,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """Connection event handler provided by AsyncWebsocketConsumer."""
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
         self.room_group_name = f"chat_{self.room_name}"
+        # Turn being generated, and messages waiting for it under the queue policy
+        self.turn_task = None
+        self.pending_turns = deque()
         # Accept connection
         await self.accept()
         # Verify session ID and handle unauthorized access
@@ -41,15 +47,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
             await self.close(code=UNAUTHORIZED_ACCESS_CODE)
             return
-        # Add user to the chat room group
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        # Add user to the chat room group, unless replies go straight to the socket
+        if not settings.CHAT_DIRECT_SEND:
+            await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         logger.info(f"New connection established in room: {self.room_name}")
         # Send a welcome message to the user
         await self.send_message_to_group(
             MESSAGE_TYPE_ASSISTANT, INITIAL_MSG, MessageSender.ASSISTANT
         )
         # Save assistant message to Redis
-        RedisChatHistoryService.save_message(
+        await RedisChatHistoryService.save_message(
             self.room_name,
             MessageSender.ASSISTANT,
             INITIAL_MSG,
@@ -61,54 +68,101 @@ class ChatConsumer(AsyncWebsocketConsumer):
         logger.info(
             f"Client disconnecting from room {self.room_name} with code: {close_code}"
         )
+        # Stop generating a reply nobody will receive
+        await self.cancel_turn()
         # Remove user from the group
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if not settings.CHAT_DIRECT_SEND:
+            await self.channel_layer.group_discard(
+                self.room_group_name, self.channel_name
+            )
 
     async def receive(self, text_data):
-        """Message receive handler provided by AsyncWebsocketConsumer."""
+        """
+        Message receive handler provided by AsyncWebsocketConsumer.
+        The reply is generated in a separate task, so the consumer keeps
+        handling new messages and disconnects while it runs.
+        """
         logger.debug("Received WebSocket message")
         try:
             # Parse incoming message
             data = json.loads(text_data)
             message = data.get("message")
             sender = data.get("sender")
-
-            # Check if required fields are present
-            if not sender or not message:
-                logger.error(ERR_MISSING_FIELDS)
-                await self.send_message_to_group(
-                    MESSAGE_TYPE_ERROR, ERR_MSG_MISSING_FIELDS, MessageSender.ASSISTANT
-                )
-                return
-
-            # Save user message to chat history
-            RedisChatHistoryService.save_message(
-                self.room_name, sender, message, self.current_time
-            )
-            await self.save_message_to_db(sender, message)
-            # Generate response using OpenAI API
-            response = await ChatOrchestrator.generate_response(self.room_name)
-            # Process and save AI response
-            bot_message = response["content"]
-            await self.send_message_to_group(
-                MESSAGE_TYPE_ASSISTANT,
-                bot_message,
-                MessageSender.ASSISTANT,
-            )
-            # Save AI response to chat history
-            RedisChatHistoryService.save_message(
-                self.room_name,
-                MessageSender.ASSISTANT,
-                bot_message,
-                self.current_time,
-            )
-            await self.save_message_to_db(MessageSender.ASSISTANT, bot_message)
         except json.JSONDecodeError:
             logger.error(ERR_INVALID_JSON)
             await self.send_message_to_group(
                 MESSAGE_TYPE_ERROR, ERR_MSG_INVALID_JSON, MessageSender.ASSISTANT
             )
-        except (ChatResponseTooLongError, ChatContentFilteredError) as e:
+            return
+
+        # Check if required fields are present
+        if not sender or not message:
+            logger.error(ERR_MISSING_FIELDS)
+            await self.send_message_to_group(
+                MESSAGE_TYPE_ERROR, ERR_MSG_MISSING_FIELDS, MessageSender.ASSISTANT
+            )
+            return
+
+        await self.start_turn(sender, message)
+
+    async def start_turn(self, sender: str, message: str) -> None:
+        """
+        Start generating the reply to a message. A message arriving while a
+        reply is still generated is handled according to CHAT_TURN_POLICY:
+        queued behind it, answered instead of it, or rejected.
+        """
+        if self.turn_task is not None and not self.turn_task.done():
+            if settings.CHAT_TURN_POLICY == TurnPolicy.REJECT:
+                await self.send_message_to_group(
+                    MESSAGE_TYPE_ERROR,
+                    ERR_MSG_TURN_IN_PROGRESS,
+                    MessageSender.ASSISTANT,
+                )
+                return
+            if settings.CHAT_TURN_POLICY == TurnPolicy.SUPERSEDE:
+                await self.cancel_turn()
+                await self.send_message_to_group(
+                    MESSAGE_TYPE_ASSISTANT_CANCELLED, "", MessageSender.ASSISTANT
+                )
+            else:
+                self.pending_turns.append((sender, message))
+                return
+        self.turn_task = asyncio.create_task(self.run_turns(sender, message))
+
+    async def run_turns(self, sender: str, message: str) -> None:
+        """Reply to the message, then to the messages queued meanwhile."""
+        await self.process_turn(sender, message)
+        while self.pending_turns:
+            await self.process_turn(*self.pending_turns.popleft())
+
+    async def cancel_turn(self) -> None:
+        """
+        Cancel the reply being generated and drop the queued messages.
+        Cancelling releases the admission slot and the upstream connections.
+        """
+        self.pending_turns.clear()
+        task = self.turn_task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def process_turn(self, sender: str, message: str) -> None:
+        """Reply to a message, sending an error message if the reply fails."""
+        try:
+            # Wait for a free slot; the turn is rejected if too many are waiting
+            async with ChatAdmissionService.get_controller().admit(
+                self.room_name, self.send_queue_position
+            ):
+                await self.handle_turn(sender, message)
+        except (
+            ChatResponseTooLongError,
+            ChatContentFilteredError,
+            ChatAdmissionRejectedError,
+        ) as e:
             await self.send_message_to_group(
                 MESSAGE_TYPE_ERROR, str(e), MessageSender.ASSISTANT
             )
@@ -118,22 +172,74 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 MESSAGE_TYPE_ERROR, ERR_MSG_UNEXPECTED, MessageSender.ASSISTANT
             )
 
+    async def handle_turn(self, sender: str, message: str) -> None:
+        """Save the user message, then generate, send and save the reply."""
+        # Save user message to chat history
+        await RedisChatHistoryService.save_message(
+            self.room_name, sender, message, self.current_time
+        )
+        await self.save_message_to_db(sender, message)
+        # Generate response using OpenAI API, streaming it if enabled
+        on_delta = self.send_message_chunk if settings.CHAT_STREAMING_ENABLED else None
+        response = await ChatOrchestrator.generate_response(self.room_name, on_delta)
+        # Process and save AI response
+        bot_message = response["content"]
+        await self.send_message_to_group(
+            MESSAGE_TYPE_ASSISTANT,
+            bot_message,
+            MessageSender.ASSISTANT,
+            model=response["model"],
+            total_tokens=response["total_tokens"],
+        )
+        # Save AI response to chat history
+        await RedisChatHistoryService.save_message(
+            self.room_name,
+            MessageSender.ASSISTANT,
+            bot_message,
+            self.current_time,
+        )
+        await self.save_message_to_db(MessageSender.ASSISTANT, bot_message)
+
     async def send_message_to_group(
-        self, message_type: str, message: str, sender: str
+        self, message_type: str, message: str, sender: str, **extra
     ) -> None:
-        """Send a message to the group channel."""
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": message_type,
-                "message": message,
-                "sender": sender,
-                "timestamp": self.current_time,
-            },
+        """
+        Send a message to the group channel. In direct-send mode the message is
+        handed to this consumer's handler, which writes it to the socket without
+        a round trip through the channel layer.
+        """
+        event = {
+            "type": message_type,
+            "message": message,
+            "sender": sender,
+            "timestamp": self.current_time,
+            **extra,
+        }
+        if settings.CHAT_DIRECT_SEND:
+            await getattr(self, get_handler_name(event))(event)
+        else:
+            await self.channel_layer.group_send(self.room_group_name, event)
+
+    async def send_message_chunk(self, delta: str) -> None:
+        """Send a piece of a streamed assistant reply to the group channel."""
+        await self.send_message_to_group(
+            MESSAGE_TYPE_ASSISTANT_CHUNK, delta, MessageSender.ASSISTANT
+        )
+
+    async def send_queue_position(self, position: int) -> None:
+        """Tell the client where its message is in the admission queue."""
+        await self.send_message_to_group(
+            MESSAGE_TYPE_QUEUE_POSITION,
+            QUEUE_POSITION_MSG.format(position=position),
+            MessageSender.ASSISTANT,
+            position=position,
         )
 
     async def assistant_message(self, message_data: Dict[str, str]) -> None:
-        """Send the response message to the client."""
+        """
+        Send the response message to the client. Replies generated by the model
+        also carry the model name and the number of tokens used.
+        """
         await self.send(
             text_data=json.dumps(
                 {
@@ -141,6 +247,50 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     "message": message_data["message"],
                     "sender": message_data["sender"],
                     "timestamp": message_data["timestamp"],
+                    **{
+                        key: message_data[key]
+                        for key in ("model", "total_tokens")
+                        if key in message_data
+                    },
+                }
+            )
+        )
+
+    async def assistant_message_chunk(self, message_data: Dict[str, str]) -> None:
+        """Send a piece of a streamed response message to the client."""
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": MESSAGE_TYPE_ASSISTANT_CHUNK,
+                    "message": message_data["message"],
+                    "sender": message_data["sender"],
+                    "timestamp": message_data["timestamp"],
+                }
+            )
+        )
+
+    async def assistant_message_cancelled(self, message_data: Dict[str, str]) -> None:
+        """Tell the client to discard the partially streamed response message."""
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": MESSAGE_TYPE_ASSISTANT_CANCELLED,
+                    "sender": message_data["sender"],
+                    "timestamp": message_data["timestamp"],
+                }
+            )
+        )
+
+    async def queue_position(self, message_data: Dict[str, str]) -> None:
+        """Send the queue position of the user's message to the client."""
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": MESSAGE_TYPE_QUEUE_POSITION,
+                    "message": message_data["message"],
+                    "sender": message_data["sender"],
+                    "timestamp": message_data["timestamp"],
+                    "position": message_data["position"],
                 }
             )
         )
@@ -158,8 +308,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
         )
 
-    @database_sync_to_async
-    def save_message_to_db(self, sender: str, message: str) -> None:
-        ChatMessage.objects.create(
+    async def save_message_to_db(self, sender: str, message: str) -> None:
+        chat_message = ChatMessage(
             session_id=self.room_name, sender_type=sender, content=message
         )
+        # Buffered messages are written in batches by a background thread
+        if settings.CHAT_MESSAGE_WRITE_BEHIND_ENABLED:
+            ChatMessageBufferService.get_buffer().add(chat_message)
+        else:
+            await database_sync_to_async(chat_message.save)()
@@ -39,3 +39,11 @@ class ChatUndefinedToolCallError(Exception):
     """
 
     pass
+
+
+class ChatAdmissionRejectedError(Exception):
+    """
+    Raised when a chat turn cannot be admitted because the admission queue is full.
+    """
+
+    pass
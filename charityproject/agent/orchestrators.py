@@ -1,34 +1,50 @@
-import ast, random
-from typing import Optional
+import asyncio, json, logging, random
+from typing import Awaitable, Callable, Optional
 from openai import NOT_GIVEN, ChatCompletion
 
+from django.conf import settings
 from agent.constants import *
+from agent.routers import IntentRouter
 from agent.services import *
 from agent.exceptions import *
+from core.constants import PROJECT_LOGGER_NAME
 from core.utils import *
 from semanticsearch.services import *
+from semanticsearch.utils import encode_date, escape_filter_value
 from sponsors.models import Child
+from sponsors.utils import birth_date_range
+
+logger = logging.getLogger(PROJECT_LOGGER_NAME)
+
+# Awaited with each piece of text while a completion is streamed
+DeltaCallback = Optional[Callable[[str], Awaitable[None]]]
 
 
 class ChatOrchestrator:
 
     @staticmethod
-    async def generate_response(room_name) -> dict:
+    async def generate_response(room_name, on_delta: DeltaCallback = None) -> dict:
         """
         Generates a response based on the chat history and model's output.
+        If on_delta is given, completions are streamed and on_delta is awaited
+        with each piece of the reply as it is generated.
         """
-        chat_history = RedisChatHistoryService.get_chat_history(room_name)
+        chat_history = await RedisChatHistoryService.get_chat_history(room_name)
+        # Answer plainly-FAQ messages without asking the model which tool to call
+        if settings.INTENT_ROUTER_ENABLED:
+            response = await ChatOrchestrator.route_locally(chat_history, on_delta)
+            if response is not None:
+                return response
         # Generate an initial response from the API
-        completion = OpenAIClientService.chat_completion(
-            SELECTED_MODEL, SYSTEM_PROMPT_INITIAL_INSTRUCTION, chat_history, TOOLS
+        completion = await ChatOrchestrator.complete(
+            SYSTEM_PROMPT_INITIAL_INSTRUCTION, chat_history, on_delta, TOOLS
         )
         finish_reason = completion.choices[0].finish_reason
         # Handle tool calls if requested by the model
         if finish_reason == FinishReason.TOOL_CALLS:
-            completion = await ChatOrchestrator.handle_tool_calls(
-                completion, chat_history
+            return await ChatOrchestrator.handle_tool_calls(
+                completion, chat_history, on_delta
             )
-            return ChatOrchestrator.compose_response(completion)
         # Return the final response if the generation is complete
         elif finish_reason == FinishReason.STOP:
             return ChatOrchestrator.compose_response(completion)
@@ -45,59 +61,172 @@ class ChatOrchestrator:
             )
 
     @staticmethod
-    async def handle_tool_calls(
-        completion: ChatCompletion, chat_history: list
+    async def complete(
+        system_content: str,
+        chat_history: list,
+        on_delta: DeltaCallback = None,
+        tools=NOT_GIVEN,
     ) -> ChatCompletion:
         """
-        Processes tool call requests and dispatches them to the appropriate handler.
+        Get a completion, streaming it to on_delta when a callback is given.
         """
-        tool_function = completion.choices[0].message.tool_calls[0].function
-        function_name = tool_function.name
-        arguments = ast.literal_eval(tool_function.arguments)
-        if function_name == "search_relevant_faqs":
-            return ChatOrchestrator.search_relevant_faqs(arguments, chat_history)
-        elif function_name == "fetch_children":
-            return await ChatOrchestrator.fetch_children(arguments, chat_history)
-        else:
-            raise ChatUndefinedToolCallError(
-                OpenAIAPIErrorMessages.UNDEFINED_TOOL_CALL.format(
-                    function_name=function_name
+        if on_delta is None:
+            return await OpenAIClientService.achat_completion(
+                SELECTED_MODEL, system_content, chat_history, tools
+            )
+        return await OpenAIClientService.astream_chat_completion(
+            SELECTED_MODEL, system_content, chat_history, on_delta, tools
+        )
+
+    @staticmethod
+    async def route_locally(
+        chat_history: list, on_delta: DeltaCallback = None
+    ) -> Optional[dict]:
+        """
+        Classify the last user message with the intent router. If it is
+        confidently an FAQ question, answer it from the FAQ search directly and
+        return the response; otherwise return None so the model routes it.
+        The model also routes the message if the router fails or times out.
+        """
+        message = ChatOrchestrator.get_last_user_message(chat_history)
+        try:
+            intent = await IntentRouter.aroute(message)
+        except Exception as e:
+            # Includes asyncio.TimeoutError from the search executor
+            logger.warning(f"Intent router failed, routing with the model: {e!r}")
+            return None
+        if intent == INTENT_FAQ:
+            return await ChatOrchestrator.answer_faq(
+                {"search_keywords": [message]}, chat_history, on_delta
+            )
+        return None
+
+    @staticmethod
+    def get_last_user_message(chat_history: list) -> str:
+        """Return the content of the latest user message in the chat history."""
+        for message in reversed(chat_history):
+            if message["role"] == MessageSender.USER:
+                return message["content"]
+        return ""
+
+    @staticmethod
+    async def handle_tool_calls(
+        completion: ChatCompletion, chat_history: list, on_delta: DeltaCallback = None
+    ) -> dict:
+        """
+        Processes tool call requests and dispatches them to the appropriate handlers.
+
+        Every tool call in the completion is run concurrently, and the context
+        they return is merged into a single follow-up completion. A turn that
+        only searches the FAQs is answered through the FAQ answer cache.
+        """
+        handlers = {
+            "search_relevant_faqs": ChatOrchestrator.search_relevant_faqs,
+            "fetch_children": ChatOrchestrator.fetch_children,
+        }
+        calls = []
+        for tool_call in completion.choices[0].message.tool_calls:
+            function_name = tool_call.function.name
+            if function_name not in handlers:
+                raise ChatUndefinedToolCallError(
+                    OpenAIAPIErrorMessages.UNDEFINED_TOOL_CALL.format(
+                        function_name=function_name
+                    )
+                )
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                raise ChatUndefinedToolCallError(
+                    OpenAIAPIErrorMessages.INVALID_TOOL_ARGUMENTS.format(
+                        function_name=function_name
+                    )
                 )
+            calls.append((function_name, arguments))
+        if len(calls) == 1 and calls[0][0] == "search_relevant_faqs":
+            return await ChatOrchestrator.answer_faq(
+                calls[0][1], chat_history, on_delta
             )
+        system_contents = await asyncio.gather(
+            *(handlers[name](arguments) for name, arguments in calls)
+        )
+        completion = await ChatOrchestrator.complete(
+            TOOL_RESULTS_SEPARATOR.join(system_contents), chat_history, on_delta
+        )
+        return ChatOrchestrator.compose_response(completion)
 
     @staticmethod
-    def search_relevant_faqs(arguments: dict, chat_history: list) -> ChatCompletion:
+    async def answer_faq(
+        arguments: dict, chat_history: list, on_delta: DeltaCallback = None
+    ) -> dict:
+        """
+        Answers a turn that only searches the FAQs.
+
+        If a similar message retrieved the same FAQ entries before, the cached
+        answer is returned without calling the model. Otherwise a follow-up
+        completion is generated and cached.
+        """
+        message = ChatOrchestrator.get_last_user_message(chat_history)
+        # The model may leave out the keywords; search with the message instead
+        arguments = {
+            **arguments,
+            "search_keywords": arguments.get("search_keywords") or [message],
+        }
+        if not settings.FAQ_ANSWER_CACHE_ENABLED:
+            system_content = await ChatOrchestrator.search_relevant_faqs(arguments)
+            completion = await ChatOrchestrator.complete(
+                system_content, chat_history, on_delta
+            )
+            return ChatOrchestrator.compose_response(completion)
+
+        # Embed the search keywords and the user message together
+        query = arguments["search_keywords"]
+        vectors = await USEModelService.aget_vector_representation(query + [message])
+        query_vectors, message_vector = vectors[:-1], vectors[-1]
+        result = await MilvusClientService.asearch_faq_hybrid(query_vectors)
+        faq_ids = [
+            faq["id"] for faq in OpenAIClientService.select_relevant_faqs(result)
+        ]
+        cached = await FAQAnswerCacheService.aget(message_vector, faq_ids)
+        if cached is not None:
+            return {**cached, "total_tokens": 0}
+
+        system_content = OpenAIClientService.compose_relevant_docs(result)
+        completion = await ChatOrchestrator.complete(
+            system_content, chat_history, on_delta
+        )
+        response = ChatOrchestrator.compose_response(completion)
+        # Only complete answers grounded in at least one FAQ entry are reused
+        if faq_ids and completion.choices[0].finish_reason == FinishReason.STOP:
+            await FAQAnswerCacheService.aset(message_vector, faq_ids, response)
+        return response
+
+    @staticmethod
+    async def search_relevant_faqs(arguments: dict) -> str:
         """
         Handles the 'search_relevant_faqs' tool call.
 
         Retrieves relevant FAQ documents using a semantic search and returns
-        a follow-up completion generated with those results.
+        the system content presenting those results.
         """
         query = arguments.get("search_keywords")
-        query_vectors = USEModelService.get_vector_representation(query)
-        result = MilvusClientService.search_faq_hybrid(query_vectors)
-        system_content = OpenAIClientService.compose_relevant_docs(result)
-        return OpenAIClientService.chat_completion(
-            SELECTED_MODEL, system_content, chat_history, NOT_GIVEN
-        )
+        query_vectors = await USEModelService.aget_vector_representation(query)
+        result = await MilvusClientService.asearch_faq_hybrid(query_vectors)
+        return OpenAIClientService.compose_relevant_docs(result)
 
     @staticmethod
-    async def fetch_children(arguments: dict, chat_history) -> ChatCompletion:
+    async def fetch_children(arguments: dict) -> str:
         """
         Handles the 'fetch_children' tool call.
 
         Retrieves children based on given arguments and returns
-        a follow-up completion with a formatted introduction.
+        the system content with a formatted introduction.
         """
         children, found, semantic_search_keyword = (
             await ChatOrchestrator.search_children(arguments)
         )
-        system_content = OpenAIClientService.compose_child_introduction(
+        return OpenAIClientService.compose_child_introduction(
             children, found, semantic_search_keyword
         )
-        return OpenAIClientService.chat_completion(
-            SELECTED_MODEL, system_content, chat_history, NOT_GIVEN
-        )
 
     @staticmethod
     def compose_response(completion: ChatCompletion) -> dict:
@@ -120,20 +249,58 @@ class ChatOrchestrator:
             filters["gender__name__iexact"] = arguments["gender"]
         if arguments.get("country") and arguments["country"].lower() != "all":
             filters["country__name__iexact"] = arguments["country"]
-        if isinstance(arguments.get("min_age"), int):
-            filters["age__gte"] = arguments["min_age"]
-        if isinstance(arguments.get("max_age"), int):
-            filters["age__lte"] = arguments["max_age"]
+        born_after, born_on_or_before = ChatOrchestrator.birth_date_range(arguments)
+        if born_on_or_before:
+            filters["date_of_birth__lte"] = born_on_or_before
+        if born_after:
+            filters["date_of_birth__gt"] = born_after
         if isinstance(arguments.get("birth_month"), int):
             filters["date_of_birth__month"] = arguments["birth_month"]
         if isinstance(arguments.get("birth_day"), int):
             filters["date_of_birth__day"] = arguments["birth_day"]
         return filters
 
+    @staticmethod
+    def birth_date_range(arguments: dict) -> tuple:
+        """
+        Translate the age arguments into a date of birth range, so age filters
+        do not depend on the age stored when the child was imported.
+        """
+        min_age, max_age = arguments.get("min_age"), arguments.get("max_age")
+        return birth_date_range(
+            min_age if isinstance(min_age, int) else None,
+            max_age if isinstance(max_age, int) else None,
+        )
+
+    @staticmethod
+    def build_child_vector_filter(arguments: dict) -> str:
+        """
+        Build a filter expression over the scalar fields of the child vector
+        collection, using the same conditions as build_structured_child_filters.
+        """
+        conditions = []
+        if arguments.get("gender") and arguments["gender"].lower() != "all":
+            gender = escape_filter_value(arguments["gender"].lower())
+            conditions.append(f"gender == {gender}")
+        if arguments.get("country") and arguments["country"].lower() != "all":
+            country = escape_filter_value(arguments["country"].lower())
+            conditions.append(f"country == {country}")
+        born_after, born_on_or_before = ChatOrchestrator.birth_date_range(arguments)
+        if born_on_or_before:
+            conditions.append(f"birth_date <= {encode_date(born_on_or_before)}")
+        if born_after:
+            conditions.append(f"birth_date > {encode_date(born_after)}")
+        if isinstance(arguments.get("birth_month"), int):
+            conditions.append(f"birth_month == {arguments['birth_month']}")
+        if isinstance(arguments.get("birth_day"), int):
+            conditions.append(f"birth_day == {arguments['birth_day']}")
+        return " and ".join(conditions)
+
     @staticmethod
     async def structured_search_for_children(arguments: dict) -> tuple[list[int], bool]:
         """
         Performs a structured search for children based on filterable attributes.
+        At most MAX_CHILDREN_RESULTS IDs are fetched.
 
         Returns:
             child_ids (List[int]): List of matching child IDs.
@@ -148,10 +315,10 @@ class ChatOrchestrator:
 
         # Query children matching the filter conditions
         child_ids = [
-            child.id
-            async for child in Child.objects.filter(**filters).select_related(
-                "country", "gender"
-            )
+            id
+            async for id in Child.objects.filter(**filters).values_list(
+                "id", flat=True
+            )[:MAX_CHILDREN_RESULTS]
         ]
 
         return child_ids, False
@@ -160,6 +327,8 @@ class ChatOrchestrator:
     async def semantic_search_for_children(arguments: dict) -> tuple[list[int], str]:
         """
         Performs a semantic search for children based on profile description.
+        The structured attributes are applied as a filter of the vector search,
+        so the top matches are taken among the children that satisfy them.
 
         Returns:
             child_ids (List[int]): List of matching child IDs.
@@ -170,24 +339,18 @@ class ChatOrchestrator:
         # Perform semantic search if profile description is provided
         if arguments.get("profile_description"):
             query_keyword = arguments["profile_description"]
-            query_vectors = USEModelService.get_vector_representation([query_keyword])
-            result = MilvusClientService.search_child_profiles(query_vectors)
+            query_vectors = await USEModelService.aget_vector_representation(
+                [query_keyword]
+            )
+            result = await MilvusClientService.asearch_child_profiles(
+                query_vectors,
+                filter=ChatOrchestrator.build_child_vector_filter(arguments),
+            )
             for hits in result:
                 for hit in hits:
                     child_ids.append(hit["entity"]["id"])
         return child_ids, query_keyword
 
-    @staticmethod
-    def intersect_children_ids(
-        structured_match_ids: list[int], semantic_match_ids: list[int]
-    ) -> list[int]:
-        """
-        Returns IDs that appear in both structured and semantic search results,
-        preserving the original order of semantic search.
-        """
-        structured_set = set(structured_match_ids)
-        return [id for id in semantic_match_ids if id in structured_set]
-
     @staticmethod
     async def search_children(arguments: dict) -> tuple[list, bool, str]:
         """
@@ -199,21 +362,14 @@ class ChatOrchestrator:
             child_found (bool): True if children were found through search; False if fallback was used.
             semantic_keyword (str): The keyword used for semantic search (empty if not used).
         """
-        # Perform structured and semantic search
-        structured_match_ids, is_filter_missing = (
-            await ChatOrchestrator.structured_search_for_children(arguments)
-        )
-        semantic_match_ids, semantic_keyword = (
+        # A profile description is searched with one filtered vector search;
+        # structured attributes alone are looked up in the relational DB
+        child_ids, semantic_keyword = (
             await ChatOrchestrator.semantic_search_for_children(arguments)
         )
-        # Determine which IDs to use based on the available search results
-        if is_filter_missing:
-            child_ids = semantic_match_ids
-        elif not semantic_keyword:
-            child_ids = structured_match_ids
-        else:
-            child_ids = ChatOrchestrator.intersect_children_ids(
-                structured_match_ids, semantic_match_ids
+        if not semantic_keyword:
+            child_ids, _ = await ChatOrchestrator.structured_search_for_children(
+                arguments
             )
         # Retrieve children by IDs or fall back to a random child
         if child_ids:
@@ -223,7 +379,9 @@ class ChatOrchestrator:
         return children, bool(child_ids), semantic_keyword
 
     @staticmethod
-    async def get_children_by_ids(child_ids: list[int], limit: int = 3) -> list:
+    async def get_children_by_ids(
+        child_ids: list[int], limit: int = MAX_CHILDREN_RESULTS
+    ) -> list:
         """
         Retrieves Child objects by ID, preserving the order of the input list.
 
@@ -0,0 +1,90 @@
+import logging, threading
+from typing import Optional
+
+import numpy as np
+
+from django.conf import settings
+from agent.constants import *
+from core.constants import PROJECT_LOGGER_NAME
+from semanticsearch.services import SearchExecutorService, USEModelService
+
+logger = logging.getLogger(PROJECT_LOGGER_NAME)
+
+
+class IntentRouter:
+    """
+    Nearest-centroid intent classifier over the USE embeddings.
+
+    Each intent is represented by the normalized mean of the embeddings of its
+    example utterances in INTENT_EXAMPLES. A message is assigned the intent
+    whose centroid is most similar, and the result is only trusted when the
+    similarity and its lead over the runner-up clear the configured thresholds.
+    """
+
+    _intents = None
+    _centroids = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def load_centroids(cls):
+        """Embed the example utterances and compute one centroid per intent."""
+        with cls._lock:
+            if cls._centroids is not None:
+                return
+            intents, centroids = [], []
+            for intent, examples in INTENT_EXAMPLES.items():
+                vectors = USEModelService.get_vector_representation(
+                    examples, use_cache=False
+                )
+                intents.append(intent)
+                centroids.append(cls.normalize(vectors.mean(axis=0)))
+            cls._intents = intents
+            cls._centroids = np.stack(centroids)
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+    @classmethod
+    def classify(cls, message: str) -> tuple[str, float, float]:
+        """
+        Return the nearest intent for the message, its cosine similarity and
+        its margin over the second nearest intent.
+        """
+        if cls._centroids is None:
+            cls.load_centroids()
+        vector = cls.normalize(USEModelService.get_vector_representation([message])[0])
+        similarities = cls._centroids @ vector
+        runner_up, best = np.argsort(similarities)[-2:]
+        return (
+            cls._intents[best],
+            float(similarities[best]),
+            float(similarities[best] - similarities[runner_up]),
+        )
+
+    @classmethod
+    def route(cls, message: str) -> Optional[str]:
+        """
+        Return the intent of the message if it is one of ROUTED_INTENTS and the
+        router is confident about it, otherwise None so the model routes it.
+        """
+        if not message:
+            return None
+        intent, similarity, margin = cls.classify(message)
+        logger.debug(
+            f"Intent router: {intent} (similarity {similarity:.3f}, margin {margin:.3f})"
+        )
+        if intent not in ROUTED_INTENTS:
+            return None
+        if similarity < settings.INTENT_ROUTER_MIN_SIMILARITY:
+            return None
+        if margin < settings.INTENT_ROUTER_MIN_MARGIN:
+            return None
+        return intent
+
+    @classmethod
+    async def aroute(cls, message: str) -> Optional[str]:
+        """
+        Awaitable route that runs on the search executor.
+        """
+        return await SearchExecutorService.run(cls.route, message)
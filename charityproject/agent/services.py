@@ -1,12 +1,21 @@
-import json
-from openai import OpenAI
+import asyncio, atexit, json, threading, time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+import numpy as np
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 from openai import NOT_GIVEN
-import redis
+from openai.lib.streaming.chat import ChatCompletionStreamState
+from redis import asyncio as aioredis
 
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 
 from agent.constants import *
+from agent.admission import AdmissionController
+from agent.buffers import WriteBehindBuffer
 from core.utils import *
 
 
@@ -14,6 +23,8 @@ class OpenAIClientService:
     """Service class for interacting with the OpenAI chat completion API."""
 
     _client = None
+    _async_client = None
+    _async_client_loop = None
 
     @classmethod
     def init_client(cls):
@@ -26,20 +37,78 @@ class OpenAIClientService:
                 print(f"Failed to initialize OpenAI client: {e}")
 
     @classmethod
-    def chat_completion(cls, model, system_content, chat_history, tools=NOT_GIVEN):
+    def get_async_client(cls) -> AsyncOpenAI:
         """
-        Get a completion from the OpenAI model using the system content and chat history
+        Return the process-wide async OpenAI client, creating it on first use.
+        Its keep-alive connection pool is shared by every chat on the worker.
+        Pooled connections belong to the event loop that opened them, so a new
+        client is created if the running loop changes.
         """
-        if cls._client is None:
-            cls.init_client()
+        loop = asyncio.get_running_loop()
+        if cls._async_client is None or cls._async_client_loop is not loop:
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY_SEC,
+                ),
+            )
+            cls._async_client = AsyncOpenAI(
+                http_client=http_client,
+                timeout=settings.OPENAI_TIMEOUT_SEC,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+            )
+            cls._async_client_loop = loop
+        return cls._async_client
 
+    @classmethod
+    async def achat_completion(
+        cls, model, system_content, chat_history, tools=NOT_GIVEN, timeout=None
+    ):
+        """
+        Get a completion from the OpenAI model using the system content and chat history,
+        without blocking the event loop.
+        """
         messages = cls.compose_messages_with_history(system_content, chat_history)
-        return cls._client.chat.completions.create(
+        return await cls.get_async_client().chat.completions.create(
             model=model,
             messages=messages,
             tools=tools,
+            timeout=timeout or settings.OPENAI_TIMEOUT_SEC,
         )
 
+    @classmethod
+    async def astream_chat_completion(
+        cls,
+        model,
+        system_content,
+        chat_history,
+        on_delta,
+        tools=NOT_GIVEN,
+        timeout=None,
+    ):
+        """
+        Stream a completion from the OpenAI model, awaiting on_delta with each
+        piece of generated text as it arrives. Returns the accumulated completion,
+        including token usage, once the stream ends.
+        """
+        messages = cls.compose_messages_with_history(system_content, chat_history)
+        stream = await cls.get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=tools,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout or settings.OPENAI_TIMEOUT_SEC,
+        )
+        state = ChatCompletionStreamState(input_tools=tools)
+        async for chunk in stream:
+            state.handle_chunk(chunk)
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    await on_delta(choice.delta.content)
+        return state.get_final_completion()
+
     @classmethod
     def get_chat_completion(cls, model, system_content, user_content):
         if cls._client is None:
@@ -56,11 +125,10 @@ class OpenAIClientService:
         return model_used, total_tokens, content
 
     @classmethod
-    def compose_relevant_docs(cls, search_result):
-        """Compose formatted content from search results, selecting most relevant FAQs."""
+    def select_relevant_faqs(cls, search_result):
+        """Select the most relevant unique FAQs from search results."""
         processed_faq_ids = set()
         unique_faqs = []
-        formatted_content = ""
         max_faqs = 5
         # Collect unique FAQs from all search results
         for result_group in search_result:
@@ -70,8 +138,14 @@ class OpenAIClientService:
                     unique_faqs.append(faq)
         # Sort FAQs by distance
         sorted_faqs = sorted(unique_faqs, key=lambda x: x["distance"], reverse=True)
+        return sorted_faqs[:max_faqs]
+
+    @classmethod
+    def compose_relevant_docs(cls, search_result):
+        """Compose formatted content from search results, selecting most relevant FAQs."""
+        formatted_content = ""
         # Format top N FAQs with their details and URLs
-        for faq in sorted_faqs[:max_faqs]:
+        for faq in cls.select_relevant_faqs(search_result):
             faq_url = reverse("faqs:faq_detail", kwargs={"pk": faq["id"]})
             formatted_content += RELEVANT_DOCS_FORMAT.format(
                 id=faq["id"],
@@ -128,16 +202,22 @@ class OpenAIClientService:
 
 
 class RedisChatHistoryService:
-    """Service class for storing and retrieving chat history."""
+    """
+    Service class for storing and retrieving chat history.
+
+    Every chat on a worker shares one asyncio Redis client and its connection
+    pool. Each session keeps at most CHAT_HISTORY_MAX_MESSAGES messages.
+    """
 
     _redis = None
+    _redis_loop = None
 
     @classmethod
     def init_redis(cls):
         """Initialize the Redis client."""
         if cls._redis is None:
             try:
-                cls._redis = redis.Redis.from_url(
+                cls._redis = aioredis.Redis.from_url(
                     settings.REDIS_CHAT_HISTORY_URL, decode_responses=True
                 )
                 print("Redis client initialized.")
@@ -145,14 +225,27 @@ class RedisChatHistoryService:
                 print(f"Failed to initialize Redis client: {e}")
 
     @classmethod
-    def save_message(cls, session_id, sender, message, timestamp, ttl_sec=60 * 60):
+    def get_redis(cls) -> aioredis.Redis:
         """
-        Save a chat message to Redis.
+        Return the process-wide Redis client. Pooled connections belong to the
+        event loop that opened them, so a new client is created if the running
+        loop changes.
         """
-        log_user_test(f"{sender} message: {message}")
+        loop = asyncio.get_running_loop()
+        if cls._redis is not None and cls._redis_loop not in (None, loop):
+            cls._redis = None
         if cls._redis is None:
             cls.init_redis()
+        cls._redis_loop = loop
+        return cls._redis
 
+    @classmethod
+    async def save_message(cls, session_id, sender, message, timestamp, ttl_sec=None):
+        """
+        Save a chat message to Redis, trimming the session to the most recent
+        messages and refreshing its expiry in the same round trip.
+        """
+        log_user_test(f"{sender} message: {message}")
         key = f"chat:{session_id}"
         # Compose the message data
         message_data = {
@@ -160,21 +253,21 @@ class RedisChatHistoryService:
             "message": message,
             "timestamp": timestamp,
         }
-        # Save the message to Redis
-        cls._redis.rpush(key, json.dumps(message_data))
-        # Set the expiration time for the key
-        cls._redis.expire(key, ttl_sec)
+        async with cls.get_redis().pipeline(transaction=False) as pipe:
+            pipe.rpush(key, json.dumps(message_data))
+            pipe.ltrim(key, -settings.CHAT_HISTORY_MAX_MESSAGES, -1)
+            pipe.expire(key, ttl_sec or settings.CHAT_HISTORY_TTL_SEC)
+            await pipe.execute()
 
     @classmethod
-    def get_chat_history(cls, session_id):
+    async def get_chat_history(cls, session_id):
         """
-        Retrieve the chat history for a given session.
+        Retrieve the most recent messages of the chat history for a given session.
         """
-        if cls._redis is None:
-            cls.init_redis()
-
         key = f"chat:{session_id}"
-        chats_json_list = cls._redis.lrange(key, 0, -1)
+        chats_json_list = await cls.get_redis().lrange(
+            key, -settings.CHAT_HISTORY_MAX_MESSAGES, -1
+        )
         chat_history = [json.loads(chat_json) for chat_json in chats_json_list]
         return cls.compose_messages(chat_history)
 
@@ -187,3 +280,219 @@ class RedisChatHistoryService:
         for chat in chat_history:
             messages.append({"role": chat["sender"], "content": chat["message"]})
         return messages
+
+
+class FAQAnswerCacheService:
+    """
+    Semantic cache of assistant answers to FAQ questions.
+
+    An answer is stored with the embedding of the user message and the IDs of
+    the FAQ entries it was generated from. It is served again for a message
+    within FAQ_ANSWER_CACHE_MAX_DISTANCE (cosine distance) of the stored one
+    that retrieves the same FAQ entries. Entries expire after
+    FAQ_ANSWER_CACHE_TTL_SEC.
+
+    Entries are kept in process memory, together with the versions their FAQ
+    entries had when they were stored. Versions live in the Django cache and
+    are bumped when an FAQ entry changes, so with a shared cache backend an
+    edit made through any process stops every process from serving answers
+    built from the old text.
+    """
+
+    # FAQ ID tuple -> list of cached answers, least recently used first
+    _groups = OrderedDict()
+    _size = 0
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(vector: np.ndarray) -> np.ndarray:
+        return vector / np.linalg.norm(vector)
+
+    @staticmethod
+    def version_key(faq_id: int) -> str:
+        return f"{FAQ_ANSWER_VERSION_KEY_PREFIX}:{faq_id}"
+
+    @classmethod
+    def get_versions(cls, faq_ids: tuple) -> tuple:
+        """Return the current version of each FAQ entry, 0 if it never changed."""
+        versions = cache.get_many([cls.version_key(faq_id) for faq_id in faq_ids])
+        return tuple(versions.get(cls.version_key(faq_id), 0) for faq_id in faq_ids)
+
+    @classmethod
+    async def aget_versions(cls, faq_ids: tuple) -> tuple:
+        """Async version of get_versions, for use in the consumer's event loop."""
+        versions = await cache.aget_many(
+            [cls.version_key(faq_id) for faq_id in faq_ids]
+        )
+        return tuple(versions.get(cls.version_key(faq_id), 0) for faq_id in faq_ids)
+
+    @classmethod
+    def bump_version(cls, faq_id: int) -> None:
+        """Mark the answers built from the FAQ entry as stale in every process."""
+        try:
+            cache.incr(cls.version_key(faq_id))
+        except ValueError:
+            # No version yet, so answers were stored under version 0
+            cache.add(cls.version_key(faq_id), 1, timeout=None)
+
+    @classmethod
+    def get(cls, query_vector: np.ndarray, faq_ids: list) -> Optional[dict]:
+        """
+        Return the cached response for the nearest similar message that
+        retrieved the same FAQ entries, or None.
+        """
+        key = tuple(sorted(faq_ids))
+        return cls.lookup(key, cls.get_versions(key), query_vector)
+
+    @classmethod
+    async def aget(cls, query_vector: np.ndarray, faq_ids: list) -> Optional[dict]:
+        """Async version of get, which reads the FAQ versions without blocking."""
+        key = tuple(sorted(faq_ids))
+        return cls.lookup(key, await cls.aget_versions(key), query_vector)
+
+    @classmethod
+    def lookup(
+        cls, key: tuple, versions: tuple, query_vector: np.ndarray
+    ) -> Optional[dict]:
+        """Search the answers cached for the FAQ ID tuple at the given versions."""
+        now = time.monotonic()
+        with cls._lock:
+            entries = cls._groups.get(key, [])
+            fresh = [entry for entry in entries if entry["versions"] == versions]
+            live = [entry for entry in fresh if entry["expires_at"] > now]
+            cls._size -= len(entries) - len(live)
+            cls._stats["invalidations"] += len(entries) - len(fresh)
+            if live:
+                cls._groups[key] = live
+                cls._groups.move_to_end(key)
+                similarities = np.stack([e["vector"] for e in live]) @ cls.normalize(
+                    query_vector
+                )
+                best = int(np.argmax(similarities))
+                if 1 - similarities[best] <= settings.FAQ_ANSWER_CACHE_MAX_DISTANCE:
+                    cls._stats["hits"] += 1
+                    return dict(live[best]["response"])
+            elif key in cls._groups:
+                del cls._groups[key]
+            cls._stats["misses"] += 1
+            return None
+
+    @classmethod
+    def set(cls, query_vector: np.ndarray, faq_ids: list, response: dict) -> None:
+        """Cache the response generated for a message from the given FAQ entries."""
+        key = tuple(sorted(faq_ids))
+        cls.store(key, cls.get_versions(key), query_vector, response)
+
+    @classmethod
+    async def aset(
+        cls, query_vector: np.ndarray, faq_ids: list, response: dict
+    ) -> None:
+        """Async version of set, which reads the FAQ versions without blocking."""
+        key = tuple(sorted(faq_ids))
+        cls.store(key, await cls.aget_versions(key), query_vector, response)
+
+    @classmethod
+    def store(
+        cls, key: tuple, versions: tuple, query_vector: np.ndarray, response: dict
+    ) -> None:
+        """Add an answer for the FAQ ID tuple, recorded at the given versions."""
+        entry = {
+            "vector": cls.normalize(query_vector),
+            "response": dict(response),
+            "versions": versions,
+            "expires_at": time.monotonic() + settings.FAQ_ANSWER_CACHE_TTL_SEC,
+        }
+        with cls._lock:
+            cls._groups.setdefault(key, []).append(entry)
+            cls._groups.move_to_end(key)
+            cls._size += 1
+            # Evict the oldest answers of the least recently used FAQ sets
+            while cls._size > settings.FAQ_ANSWER_CACHE_MAX_ENTRIES:
+                oldest_key, entries = next(iter(cls._groups.items()))
+                entries.pop(0)
+                if not entries:
+                    del cls._groups[oldest_key]
+                cls._size -= 1
+                cls._stats["evictions"] += 1
+
+    @classmethod
+    def invalidate(cls, faq_id: int) -> None:
+        """
+        Drop every cached answer generated from the given FAQ entry. Other
+        processes drop theirs on their next lookup of the same FAQ entries.
+        """
+        cls.bump_version(faq_id)
+        with cls._lock:
+            for key in [key for key in cls._groups if faq_id in key]:
+                dropped = len(cls._groups.pop(key))
+                cls._size -= dropped
+                cls._stats["invalidations"] += dropped
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Return the cache counters, its size and its hit rate."""
+        with cls._lock:
+            lookups = cls._stats["hits"] + cls._stats["misses"]
+            return {
+                **cls._stats,
+                "size": cls._size,
+                "hit_rate": cls._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop every entry and reset the counters."""
+        with cls._lock:
+            cls._groups.clear()
+            cls._size = 0
+            for name in cls._stats:
+                cls._stats[name] = 0
+
+
+class ChatMessageBufferService:
+    """Process-wide write-behind buffer for ChatMessage rows."""
+
+    _buffer = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_buffer(cls) -> WriteBehindBuffer:
+        """Return the buffer, creating it on first use."""
+        with cls._lock:
+            if cls._buffer is None:
+                from agent.models import ChatMessage
+
+                cls._buffer = WriteBehindBuffer(
+                    ChatMessage,
+                    max_batch_size=settings.CHAT_MESSAGE_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.CHAT_MESSAGE_BATCH_MAX_WAIT_MS,
+                )
+                # Write the buffered messages before the process exits
+                atexit.register(cls._buffer.close)
+        return cls._buffer
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Return the buffer's queue depth and flush counters."""
+        return cls.get_buffer().stats()
+
+
+class ChatAdmissionService:
+    """Process-wide admission controller for chat turns."""
+
+    _controller = None
+
+    @classmethod
+    def get_controller(cls) -> AdmissionController:
+        """Return the controller, creating it on first use."""
+        if cls._controller is None:
+            cls._controller = AdmissionController(
+                max_concurrency=settings.CHAT_ADMISSION_MAX_CONCURRENCY,
+                max_queue_size=settings.CHAT_ADMISSION_MAX_QUEUE,
+                redis_url=settings.CHAT_ADMISSION_REDIS_URL,
+                cluster_max_concurrency=settings.CHAT_ADMISSION_CLUSTER_MAX_CONCURRENCY,
+                lease_sec=settings.CHAT_ADMISSION_LEASE_SEC,
+                queue_timeout_sec=settings.CHAT_ADMISSION_QUEUE_TIMEOUT_SEC,
+            )
+        return cls._controller
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from agent.services import FAQAnswerCacheService
+from faqs.models import FAQEntry
+
+
+@receiver([post_save, post_delete], sender=FAQEntry)
+def invalidate_faq_answers(sender, instance, **kwargs):
+    """Drop cached answers generated from an FAQ entry when it changes."""
+    FAQAnswerCacheService.invalidate(instance.id)
@@ -11,7 +11,10 @@ const url = `${wsProtocol}${hostName}/ws/chat/${roomName}/`;
 // Constants for the WebSocket connection
 const MESSAGE_TYPE_CLOSE = "close.connection";
 const MESSAGE_TYPE_ASSISTANT = "assistant.message";
+const MESSAGE_TYPE_ASSISTANT_CHUNK = "assistant.message.chunk";
+const MESSAGE_TYPE_ASSISTANT_CANCELLED = "assistant.message.cancelled";
 const MESSAGE_TYPE_ERROR = "error.message";
+const MESSAGE_TYPE_QUEUE_POSITION = "queue.position";
 const SESSION_TERMINATE_CODE = 4000;
 const UNAUTHORIZED_ACCESS_CODE = 4001;
 const MAX_RETRIES = 3;
@@ -136,6 +139,9 @@ class WebSocketClient {
 
 // Initialize the WebSocket client
 const client = new WebSocketClient(url);
+// Assistant reply that is currently being streamed
+let streamingMessageDom = null;
+let streamingMessageText = "";
 
 // Add an event handler for the "open" event
 client.addHandler("open", () => {
@@ -149,15 +155,68 @@ client.addHandler("message", (data) => {
   if (data.type === MESSAGE_TYPE_CLOSE) {
     // Terminate the chat session
     handleSessionEnd(data);
+  } else if (data.type === MESSAGE_TYPE_QUEUE_POSITION) {
+    // Show where the message is in the queue while it waits
+    setThinkingMessageText(data.message);
+  } else if (data.type === MESSAGE_TYPE_ASSISTANT_CHUNK) {
+    // Append a piece of the reply that is being streamed
+    appendMessageChunk(data.message);
+  } else if (data.type === MESSAGE_TYPE_ASSISTANT_CANCELLED) {
+    // Discard the reply superseded by a newer message
+    if (streamingMessageDom) {
+      streamingMessageDom.remove();
+      endStreaming();
+    }
+  } else if (data.type === MESSAGE_TYPE_ASSISTANT && streamingMessageDom) {
+    // Replace the streamed reply with the complete message
+    setMessageContent(streamingMessageDom, data.message);
+    endStreaming();
   } else if (
     data.type === MESSAGE_TYPE_ASSISTANT ||
     data.type === MESSAGE_TYPE_ERROR
   ) {
+    // Discard a partially streamed reply
+    if (streamingMessageDom) {
+      streamingMessageDom.remove();
+      endStreaming();
+    }
     // Display a message from the assistant
     displayMessage(data.message, (isAssistant = true));
   }
 });
 
+/**
+ * Appends a streamed piece of text to the assistant's reply in progress.
+ */
+function appendMessageChunk(chunk) {
+  streamingMessageText += chunk;
+  if (!streamingMessageDom) {
+    streamingMessageDom = createAssistantMessageDom(streamingMessageText);
+    appendMessageDom(streamingMessageDom);
+  } else {
+    setMessageContent(streamingMessageDom, streamingMessageText);
+  }
+}
+
+/**
+ * Clears the state of the streamed reply.
+ */
+function endStreaming() {
+  streamingMessageDom = null;
+  streamingMessageText = "";
+}
+
+/**
+ * Sets the text of a message DOM created by createAssistantMessageDom.
+ */
+function setMessageContent(messageDom, message) {
+  // Replace newlines with <br> for formatting
+  messageDom.querySelector(".card-text").innerHTML = message.replace(
+    /\n/g,
+    "<br>"
+  );
+}
+
 /**
  * Handles the end of the chat session.
  */
@@ -249,6 +308,13 @@ function displayMessage(message, isAssistant = false) {
   } else {
     messageDom = createUserMessageDom(message);
   }
+  appendMessageDom(messageDom);
+}
+
+/**
+ * Appends a message DOM to the chat container.
+ */
+function appendMessageDom(messageDom) {
   // Remove the "Thinking..." message if exists
   const thinkingMsg = document.getElementById(THINKING_MESSAGE_ID);
   if (thinkingMsg) {
@@ -296,6 +362,16 @@ function appendThinkingMessage() {
   });
 }
 
+/**
+ * Replaces the text of the "Thinking..." indicator, if it is displayed.
+ */
+function setThinkingMessageText(text) {
+  const thinkingMsg = document.getElementById(THINKING_MESSAGE_ID);
+  if (thinkingMsg) {
+    thinkingMsg.textContent = text;
+  }
+}
+
 /**
  * Sets up event listeners for the message input and the send button.
  */
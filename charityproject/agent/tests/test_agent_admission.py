@@ -0,0 +1,209 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from agent.admission import *
+from agent.exceptions import ChatAdmissionRejectedError
+
+
+async def hold(controller, session_id, started, release, positions=None):
+    """Run a turn that holds its slot until release is set."""
+
+    async def on_position(position):
+        positions.append(position)
+
+    async with controller.admit(
+        session_id, on_position if positions is not None else None
+    ):
+        started.append(session_id)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+class TestAdmissionController:
+    """Test suite for AdmissionController."""
+
+    async def test_queues_turns_over_the_limit(self):
+        """Test that turns over the concurrency limit wait for a free slot."""
+        controller = AdmissionController(max_concurrency=2, max_queue_size=10)
+        started, release = [], asyncio.Event()
+
+        tasks = [
+            asyncio.create_task(hold(controller, f"s{i}", started, release))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+
+        assert started == ["s0", "s1"]
+        assert controller.stats()["queue_depth"] == 1
+        release.set()
+        await asyncio.gather(*tasks)
+        assert started == ["s0", "s1", "s2"]
+        assert controller.stats()["active"] == 0
+
+    async def test_serves_sessions_round_robin(self):
+        """Test that a session with many waiting turns does not hold back others."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        started = []
+        releases = [asyncio.Event() for _ in range(5)]
+        sessions = ["busy", "busy", "busy", "other", "third"]
+
+        tasks = []
+        for session_id, release in zip(sessions, releases):
+            tasks.append(
+                asyncio.create_task(hold(controller, session_id, started, release))
+            )
+            await asyncio.sleep(0)
+        for release in releases:
+            await asyncio.sleep(0.01)
+            release.set()
+        await asyncio.gather(*tasks)
+
+        assert started == ["busy", "busy", "other", "third", "busy"]
+
+    async def test_reports_queue_positions(self):
+        """Test that waiting turns are told their position as the queue advances."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        started, release = [], asyncio.Event()
+        positions = []
+
+        tasks = [asyncio.create_task(hold(controller, "s0", started, release))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold(controller, "s1", started, release)))
+        await asyncio.sleep(0)
+        tasks.append(
+            asyncio.create_task(hold(controller, "s2", started, release, positions))
+        )
+        await asyncio.sleep(0.01)
+        assert positions == [2]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert positions == [2, 1]
+
+    async def test_rejects_when_queue_is_full(self):
+        """Test that a turn arriving at a full queue is rejected immediately."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        started, release = [], asyncio.Event()
+        tasks = [
+            asyncio.create_task(hold(controller, f"s{i}", started, release))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ChatAdmissionRejectedError):
+            await hold(controller, "s2", started, release)
+
+        assert controller.stats()["rejected"] == 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled waiting turn gives up its place in the queue."""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=10)
+        started, release = [], asyncio.Event()
+        first = asyncio.create_task(hold(controller, "s0", started, release))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold(controller, "s1", started, release))
+        await asyncio.sleep(0.01)
+
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 0
+
+        release.set()
+        await first
+        assert started == ["s0"]
+        assert controller.stats()["active"] == 0
+
+    async def test_waits_for_cluster_slot(self):
+        """Test that a turn polls for a cluster-wide slot and releases it afterwards."""
+        controller = AdmissionController(
+            max_concurrency=1,
+            max_queue_size=1,
+            redis_url="redis://localhost:6379/0",
+            cluster_max_concurrency=1,
+            poll_ms=1,
+        )
+        mock_redis = MagicMock()
+        mock_redis.eval = AsyncMock(side_effect=[0, 1])
+        mock_redis.zrem = AsyncMock()
+        controller.get_redis = MagicMock(return_value=mock_redis)
+
+        async with controller.admit("s0"):
+            pass
+
+        assert mock_redis.eval.await_count == 2
+        token = mock_redis.eval.await_args.args[-1]
+        mock_redis.zrem.assert_awaited_once_with(ADMISSION_REDIS_KEY, token)
+
+    async def test_rejects_turn_waiting_past_timeout(self):
+        """Test that a turn still queued after the queue timeout is rejected."""
+        controller = AdmissionController(
+            max_concurrency=1, max_queue_size=10, queue_timeout_sec=0.02
+        )
+        started, release = [], asyncio.Event()
+        first = asyncio.create_task(hold(controller, "s0", started, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ChatAdmissionRejectedError):
+            await hold(controller, "s1", started, release)
+
+        assert controller.stats()["rejected"] == 1
+        assert controller.stats()["queue_depth"] == 0
+        release.set()
+        await first
+        assert started == ["s0"]
+        assert controller.stats()["active"] == 0
+
+    async def test_rejects_when_no_cluster_slot_frees_up(self):
+        """Test that polling for a cluster slot backs off and gives up at the timeout."""
+        controller = AdmissionController(
+            max_concurrency=1,
+            max_queue_size=1,
+            redis_url="redis://localhost:6379/0",
+            cluster_max_concurrency=1,
+            poll_ms=1,
+            max_poll_ms=8,
+            queue_timeout_sec=0.05,
+        )
+        mock_redis = MagicMock()
+        mock_redis.eval = AsyncMock(return_value=0)
+        controller.get_redis = MagicMock(return_value=mock_redis)
+
+        with pytest.raises(ChatAdmissionRejectedError):
+            async with controller.admit("s0"):
+                pass
+
+        # Without backoff a 1 ms poll would run about 50 times
+        assert 2 <= mock_redis.eval.await_count < 20
+        assert controller.stats()["rejected"] == 1
+        assert controller.stats()["active"] == 0
+
+    async def test_renews_cluster_slot_while_turn_runs(self):
+        """Test that the lease of a held cluster slot is renewed until it is released."""
+        controller = AdmissionController(
+            max_concurrency=1,
+            max_queue_size=1,
+            redis_url="redis://localhost:6379/0",
+            cluster_max_concurrency=1,
+            lease_sec=0.03,
+        )
+        mock_redis = MagicMock()
+        mock_redis.eval = AsyncMock(return_value=1)
+        mock_redis.zrem = AsyncMock()
+        controller.get_redis = MagicMock(return_value=mock_redis)
+
+        async with controller.admit("s0"):
+            await asyncio.sleep(0.05)
+
+        renewals = [
+            call
+            for call in mock_redis.eval.await_args_list
+            if call.args[0] == RENEW_CLUSTER_SLOT_SCRIPT
+        ]
+        token = mock_redis.zrem.await_args.args[-1]
+        assert len(renewals) >= 2
+        assert all(call.args[-1] == token for call in renewals)
+        await asyncio.sleep(0.03)
+        assert mock_redis.eval.await_count == len(renewals) + 1
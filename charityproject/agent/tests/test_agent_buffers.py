@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch
+from django.db import OperationalError
+
+from agent.buffers import *
+from agent.constants import MessageSender
+from agent.models import ChatMessage
+
+
+def make_message(content: str) -> ChatMessage:
+    return ChatMessage(
+        session_id="test_session", sender_type=MessageSender.USER, content=content
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWriteBehindBuffer:
+    """Test suite for WriteBehindBuffer."""
+
+    def test_flush_writes_queued_instances(self):
+        """Test that queued instances are saved once the buffer is flushed."""
+        buffer = WriteBehindBuffer(ChatMessage, max_wait_ms=20)
+
+        for i in range(3):
+            buffer.add(make_message(f"message {i}"))
+        buffer.flush()
+
+        assert list(ChatMessage.objects.values_list("content", flat=True)) == [
+            "message 0",
+            "message 1",
+            "message 2",
+        ]
+        stats = buffer.stats()
+        assert stats["rows"] == 3
+        assert stats["queue_depth"] == 0
+        assert stats["max_flush_ms"] >= stats["avg_flush_ms"] > 0
+
+    def test_full_batch_is_written_without_waiting(self):
+        """Test that a batch is written as soon as it reaches max_batch_size."""
+        buffer = WriteBehindBuffer(ChatMessage, max_batch_size=2, max_wait_ms=60_000)
+
+        with patch.object(
+            ChatMessage.objects, "bulk_create", wraps=ChatMessage.objects.bulk_create
+        ) as mock_bulk_create:
+            for i in range(4):
+                buffer.add(make_message(f"message {i}"))
+            buffer.flush()
+
+        assert [len(call.args[0]) for call in mock_bulk_create.call_args_list] == [2, 2]
+        assert ChatMessage.objects.count() == 4
+
+    def test_close_writes_pending_instances(self):
+        """Test that close writes instances still waiting for their batch."""
+        buffer = WriteBehindBuffer(ChatMessage, max_wait_ms=60_000)
+
+        buffer.add(make_message("pending"))
+        buffer.close()
+
+        assert ChatMessage.objects.filter(content="pending").exists()
+
+    def test_locked_database_is_retried(self):
+        """Test that a batch failing with a locked database is retried."""
+        buffer = WriteBehindBuffer(ChatMessage, max_wait_ms=20)
+        bulk_create = ChatMessage.objects.bulk_create
+        attempts = []
+
+        def locked_once(batch):
+            attempts.append(len(batch))
+            if len(attempts) == 1:
+                raise OperationalError("database is locked")
+            return bulk_create(batch)
+
+        with patch.object(ChatMessage.objects, "bulk_create", side_effect=locked_once):
+            buffer.add(make_message("retried"))
+            buffer.flush()
+
+        assert ChatMessage.objects.filter(content="retried").exists()
+        assert attempts == [1, 1]
+        assert buffer.stats()["failed_rows"] == 0
@@ -1,14 +1,37 @@
+import asyncio
 import pytest
+from channels.layers import get_channel_layer
 from channels.routing import URLRouter
 from channels.testing import WebsocketCommunicator
-from unittest.mock import patch
+from unittest.mock import DEFAULT, patch
 
+from django.test import override_settings
 from django.urls import path
 
+from agent.admission import AdmissionController
 from agent.consumers import *
 from conftest import *
 
 
+@pytest.fixture(autouse=True)
+def flush_chat_messages():
+    """Write buffered chat messages while the test still has database access."""
+    yield
+    ChatMessageBufferService.get_buffer().flush()
+
+
+@pytest.fixture
+def in_memory_channel_layer(settings):
+    """
+    Return a fresh in-memory channel layer, so no layer bound to the event loop
+    of an earlier test is reused.
+    """
+    settings.CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    return get_channel_layer()
+
+
 async def setup_communicator(room_name: str) -> WebsocketCommunicator:
     """Setup a WebSocket communicator for the chat room."""
     application = URLRouter(
@@ -40,11 +63,52 @@ async def test_receive_welcome_message():
 
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
+async def test_direct_send_bypasses_channel_layer(in_memory_channel_layer):
+    """Test that in direct-send mode replies do not go through the channel group."""
+    with patch(
+        "channels.consumer.get_channel_layer", wraps=get_channel_layer
+    ) as mock_get_channel_layer, patch.multiple(
+        in_memory_channel_layer,
+        group_add=DEFAULT,
+        group_send=DEFAULT,
+        group_discard=DEFAULT,
+    ) as group_methods:
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        await communicator.disconnect()
+
+    assert response["message"] == INITIAL_MSG
+    mock_get_channel_layer.assert_called()
+    group_methods["group_add"].assert_not_called()
+    group_methods["group_send"].assert_not_called()
+    group_methods["group_discard"].assert_not_called()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_DIRECT_SEND=False)
+async def test_receive_welcome_message_through_group(in_memory_channel_layer):
+    """Test receiving the welcome message through the chat room group."""
+    session_id = generate_session_id()
+    communicator = await setup_communicator(session_id)
+    connected, _ = await communicator.connect()
+    assert connected, "WebSocket connection failed"
+    response = await communicator.receive_json_from()
+    assert response["type"] == MESSAGE_TYPE_ASSISTANT
+    assert response["message"] == INITIAL_MSG
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=False)
 async def test_send_receive_message():
     """Test sending and receiving a message."""
     mock_completion = make_mock_chat_completion(finish_reason=FinishReason.STOP)
     with patch(
-        "agent.services.OpenAIClientService.chat_completion",
+        "agent.services.OpenAIClientService.achat_completion",
         return_value=mock_completion,
     ) as mocked_chat_completion:
         session_id = generate_session_id()
@@ -58,6 +122,40 @@ async def test_send_receive_message():
         await communicator.disconnect()
 
 
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=True)
+async def test_send_receive_streamed_message():
+    """Test that a reply is streamed in chunks followed by the complete message."""
+    mock_completion = make_mock_chat_completion(
+        finish_reason=FinishReason.STOP, content="Hello!"
+    )
+
+    async def stream_completion(model, system_content, chat_history, on_delta, *args):
+        for delta in ["Hel", "lo!"]:
+            await on_delta(delta)
+        return mock_completion
+
+    with patch(
+        "agent.services.OpenAIClientService.astream_chat_completion",
+        side_effect=stream_completion,
+    ):
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "hello", "sender": "user"})
+        chunks = [await communicator.receive_json_from() for _ in range(2)]
+        response = await communicator.receive_json_from()
+        assert [chunk["type"] for chunk in chunks] == [MESSAGE_TYPE_ASSISTANT_CHUNK] * 2
+        assert [chunk["message"] for chunk in chunks] == ["Hel", "lo!"]
+        assert response["type"] == MESSAGE_TYPE_ASSISTANT
+        assert response["message"] == "Hello!"
+        assert response["model"] == mock_completion.model
+        assert response["total_tokens"] == mock_completion.usage.total_tokens
+        await communicator.disconnect()
+
+
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
 async def test_deny_connect_for_invalid_session_id():
@@ -101,3 +199,152 @@ async def test_receive_invalid_json():
     assert response["message"] == ERR_MSG_INVALID_JSON
     assert response["sender"] == MessageSender.ASSISTANT
     await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_receive_rejected_when_queue_is_full():
+    """Test that a message is answered with a busy error when it cannot be queued."""
+    controller = AdmissionController(max_concurrency=0, max_queue_size=0)
+    with patch(
+        "agent.services.ChatAdmissionService.get_controller", return_value=controller
+    ), patch(
+        "agent.services.OpenAIClientService.achat_completion"
+    ) as mocked_chat_completion:
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "hello", "sender": "user"})
+        response = await communicator.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_ERROR
+        assert response["message"] == ERR_MSG_SERVER_BUSY
+        mocked_chat_completion.assert_not_called()
+        await communicator.disconnect()
+
+
+class HangingCompletion:
+    """Completion whose complete() blocks on the first call until cancelled."""
+
+    def __init__(self, completion):
+        self.completion = completion
+        self.messages = []
+        self.started = asyncio.Event()
+        self.cancelled = asyncio.Event()
+
+    async def complete(self, model, system_content, chat_history, *args):
+        self.messages.append(chat_history[-1]["content"])
+        if len(self.messages) > 1:
+            return self.completion
+        self.started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=False)
+async def test_disconnect_cancels_turn_in_progress():
+    """Test that disconnecting cancels the reply being generated."""
+    completion = HangingCompletion(
+        make_mock_chat_completion(finish_reason=FinishReason.STOP)
+    )
+    with patch(
+        "agent.services.OpenAIClientService.achat_completion",
+        side_effect=completion.complete,
+    ):
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "hello", "sender": "user"})
+        await asyncio.wait_for(completion.started.wait(), 1)
+        await communicator.disconnect()
+        assert completion.cancelled.is_set()
+    assert ChatAdmissionService.get_controller().stats()["active"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=False, CHAT_TURN_POLICY=TurnPolicy.SUPERSEDE)
+async def test_new_message_supersedes_turn_in_progress():
+    """Test that under the supersede policy a new message cancels the reply in progress."""
+    completion = HangingCompletion(
+        make_mock_chat_completion(finish_reason=FinishReason.STOP, content="Second")
+    )
+    with patch(
+        "agent.services.OpenAIClientService.achat_completion",
+        side_effect=completion.complete,
+    ):
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "first", "sender": "user"})
+        await asyncio.wait_for(completion.started.wait(), 1)
+        await communicator.send_json_to({"message": "second", "sender": "user"})
+        cancelled = await communicator.receive_json_from()
+        response = await communicator.receive_json_from()
+        assert completion.cancelled.is_set()
+        assert cancelled["type"] == MESSAGE_TYPE_ASSISTANT_CANCELLED
+        assert response["type"] == MESSAGE_TYPE_ASSISTANT
+        assert response["message"] == "Second"
+        await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=False, CHAT_TURN_POLICY=TurnPolicy.REJECT)
+async def test_new_message_rejected_while_turn_in_progress():
+    """Test that under the reject policy a new message is refused while a reply is generated."""
+    completion = HangingCompletion(
+        make_mock_chat_completion(finish_reason=FinishReason.STOP)
+    )
+    with patch(
+        "agent.services.OpenAIClientService.achat_completion",
+        side_effect=completion.complete,
+    ):
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "first", "sender": "user"})
+        await asyncio.wait_for(completion.started.wait(), 1)
+        await communicator.send_json_to({"message": "second", "sender": "user"})
+        response = await communicator.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_ERROR
+        assert response["message"] == ERR_MSG_TURN_IN_PROGRESS
+        assert not completion.cancelled.is_set()
+        assert completion.messages == ["first"]
+        await communicator.disconnect()
+        assert completion.cancelled.is_set()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@override_settings(CHAT_STREAMING_ENABLED=False, CHAT_TURN_POLICY=TurnPolicy.QUEUE)
+async def test_new_message_queued_behind_turn_in_progress():
+    """Test that under the queue policy messages are answered one after another."""
+    replies = iter(["First", "Second"])
+
+    async def complete(model, system_content, chat_history, *args):
+        await asyncio.sleep(0.05)
+        return make_mock_chat_completion(
+            finish_reason=FinishReason.STOP, content=next(replies)
+        )
+
+    with patch(
+        "agent.services.OpenAIClientService.achat_completion", side_effect=complete
+    ):
+        session_id = generate_session_id()
+        communicator = await setup_communicator(session_id)
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"message": "first", "sender": "user"})
+        await communicator.send_json_to({"message": "second", "sender": "user"})
+        responses = [await communicator.receive_json_from() for _ in range(2)]
+        assert [response["message"] for response in responses] == ["First", "Second"]
+        await communicator.disconnect()
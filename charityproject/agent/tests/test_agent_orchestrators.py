@@ -1,6 +1,10 @@
+import asyncio
 import pytest
+import numpy as np
 from model_bakery import baker
-from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from agent.orchestrators import *
 from agent.constants import *
@@ -56,11 +60,12 @@ class TestChatOrchestrator:
             "birth_month": 3,
             "birth_day": 15,
         }
+        born_after, born_on_or_before = birth_date_range(5, 10)
         expected_filters = {
             "gender__name__iexact": "female",
             "country__name__iexact": "Bolivia",
-            "age__gte": 5,
-            "age__lte": 10,
+            "date_of_birth__lte": born_on_or_before,
+            "date_of_birth__gt": born_after,
             "date_of_birth__month": 3,
             "date_of_birth__day": 15,
         }
@@ -173,7 +178,7 @@ class TestChatOrchestrator:
             finish_reason=FinishReason.STOP, content=content
         )
         mocker.patch(
-            "agent.services.OpenAIClientService.chat_completion",
+            "agent.services.OpenAIClientService.achat_completion",
             return_value=mock_completion,
         )
         mocker.patch(
@@ -184,6 +189,79 @@ class TestChatOrchestrator:
         expected = {"model": "gpt-3.5-turbo", "total_tokens": 100, "content": content}
         assert response == expected
 
+    @pytest.mark.asyncio
+    async def test_generate_response_streams_to_callback(
+        self, mocker, mock_chat_history
+    ):
+        """Test that generate_response streams the completion when a callback is given."""
+        mock_completion = make_mock_chat_completion(finish_reason=FinishReason.STOP)
+        mock_stream = mocker.patch(
+            "agent.services.OpenAIClientService.astream_chat_completion",
+            return_value=mock_completion,
+        )
+        mock_completion_call = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion"
+        )
+        mocker.patch(
+            "agent.services.RedisChatHistoryService.get_chat_history",
+            return_value=mock_chat_history,
+        )
+        on_delta = AsyncMock()
+
+        response = await ChatOrchestrator.generate_response("test_session_id", on_delta)
+
+        assert response["content"] == mock_completion.choices[0].message.content
+        assert mock_stream.await_args.args[3] is on_delta
+        mock_completion_call.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_handle_tool_calls_runs_every_tool_call(
+        self, mocker, mock_chat_history
+    ):
+        """Test that every tool call is dispatched and answered by one follow-up completion."""
+        completion = make_mock_chat_completion(
+            finish_reason=FinishReason.TOOL_CALLS, function_name="search_relevant_faqs"
+        )
+        child_call = MagicMock()
+        child_call.function.name = "fetch_children"
+        child_call.function.arguments = json.dumps({"country": "Kenya"})
+        completion.choices[0].message.tool_calls.append(child_call)
+        mock_faqs = mocker.patch(
+            "agent.orchestrators.ChatOrchestrator.search_relevant_faqs",
+            return_value="FAQ context",
+        )
+        mock_children = mocker.patch(
+            "agent.orchestrators.ChatOrchestrator.fetch_children",
+            return_value="Child context",
+        )
+        follow_up = make_mock_chat_completion(finish_reason=FinishReason.STOP)
+        mock_completion = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion",
+            return_value=follow_up,
+        )
+
+        result = await ChatOrchestrator.handle_tool_calls(completion, mock_chat_history)
+
+        assert result == ChatOrchestrator.compose_response(follow_up)
+        mock_faqs.assert_awaited_once_with({})
+        mock_children.assert_awaited_once_with({"country": "Kenya"})
+        mock_completion.assert_awaited_once()
+        system_content = mock_completion.await_args.args[1]
+        assert (
+            system_content == "FAQ context" + TOOL_RESULTS_SEPARATOR + "Child context"
+        )
+
+    @pytest.mark.asyncio
+    async def test_handle_tool_calls_rejects_invalid_arguments(self, mock_chat_history):
+        """Test that tool arguments which are not valid JSON raise a tool call error."""
+        completion = make_mock_chat_completion(
+            finish_reason=FinishReason.TOOL_CALLS, function_name="fetch_children"
+        )
+        completion.choices[0].message.tool_calls[0].function.arguments = "{'age': 5}"
+
+        with pytest.raises(ChatUndefinedToolCallError):
+            await ChatOrchestrator.handle_tool_calls(completion, mock_chat_history)
+
     @pytest.mark.asyncio
     async def run_generate_response_error_test(
         self,
@@ -195,7 +273,7 @@ class TestChatOrchestrator:
         """Helper to test that generate_response raises the correct exception for a given finish_reason."""
         mock_completion = make_mock_chat_completion(finish_reason=finish_reason)
         mocker.patch(
-            "agent.services.OpenAIClientService.chat_completion",
+            "agent.services.OpenAIClientService.achat_completion",
             return_value=mock_completion,
         )
         mocker.patch(
@@ -221,3 +299,227 @@ class TestChatOrchestrator:
         await self.run_generate_response_error_test(
             mocker, mock_chat_history, finish_reason, expected_exception
         )
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_for_children_uses_async_search(self, mocker):
+        """Ensure semantic search awaits the non-blocking embedding and search API."""
+        mock_vectors = mocker.patch(
+            "agent.orchestrators.USEModelService.aget_vector_representation",
+            new_callable=AsyncMock,
+        )
+        mock_search = mocker.patch(
+            "agent.orchestrators.MilvusClientService.asearch_child_profiles",
+            new_callable=AsyncMock,
+            return_value=[[{"entity": {"id": 7}}, {"entity": {"id": 3}}]],
+        )
+        arguments = {"profile_description": "loves football"}
+
+        child_ids, keyword = await ChatOrchestrator.semantic_search_for_children(
+            arguments
+        )
+
+        assert child_ids == [7, 3]
+        assert keyword == "loves football"
+        mock_vectors.assert_awaited_once_with(["loves football"])
+        mock_search.assert_awaited_once_with(mock_vectors.return_value, filter="")
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_for_children_filters_vector_search(self, mocker):
+        """Ensure structured attributes are pushed down into the vector search."""
+        mocker.patch(
+            "agent.orchestrators.USEModelService.aget_vector_representation",
+            new_callable=AsyncMock,
+        )
+        mock_search = mocker.patch(
+            "agent.orchestrators.MilvusClientService.asearch_child_profiles",
+            new_callable=AsyncMock,
+            return_value=[[{"entity": {"id": 5}}]],
+        )
+        arguments = {
+            "gender": "Female",
+            "country": "Peru",
+            "profile_description": "loves football",
+        }
+
+        child_ids, _ = await ChatOrchestrator.semantic_search_for_children(arguments)
+
+        assert child_ids == [5]
+        assert (
+            mock_search.call_args.kwargs["filter"]
+            == 'gender == "female" and country == "peru"'
+        )
+
+    def test_build_child_vector_filter(self):
+        """
+        Test if build_child_vector_filter turns input arguments into a filter expression.
+        """
+        arguments = {
+            "gender": "all",
+            "country": 'Cote "d\'Ivoire"',
+            "min_age": 5,
+            "max_age": 10,
+            "birth_month": 3,
+            "birth_day": 15,
+        }
+
+        expression = ChatOrchestrator.build_child_vector_filter(arguments)
+
+        born_after, born_on_or_before = birth_date_range(5, 10)
+        assert expression == (
+            'country == "cote \\"d\'ivoire\\"" '
+            f"and birth_date <= {encode_date(born_on_or_before)} "
+            f"and birth_date > {encode_date(born_after)} "
+            "and birth_month == 3 and birth_day == 15"
+        )
+
+    @pytest.mark.asyncio
+    async def test_structured_search_for_children_is_limited(self):
+        """Ensure structured search fetches at most MAX_CHILDREN_RESULTS IDs."""
+        gender = await Gender.objects.acreate(name="Female")
+        await sync_to_async(baker.make)(
+            Child, gender=gender, _quantity=MAX_CHILDREN_RESULTS + 2
+        )
+
+        child_ids, is_filter_missing = (
+            await ChatOrchestrator.structured_search_for_children({"gender": "female"})
+        )
+
+        assert len(child_ids) == MAX_CHILDREN_RESULTS
+        assert is_filter_missing is False
+
+    @pytest.mark.asyncio
+    @override_settings(INTENT_ROUTER_ENABLED=True)
+    async def test_generate_response_routes_faq_locally(
+        self, mocker, mock_chat_history
+    ):
+        """Test that a routed FAQ message skips the initial tool routing completion."""
+        mocker.patch("agent.orchestrators.IntentRouter.aroute", return_value=INTENT_FAQ)
+        mock_answer = mocker.patch(
+            "agent.orchestrators.ChatOrchestrator.answer_faq",
+            return_value={"content": "Answer"},
+        )
+        mock_completion = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion"
+        )
+        mocker.patch(
+            "agent.services.RedisChatHistoryService.get_chat_history",
+            return_value=mock_chat_history,
+        )
+
+        response = await ChatOrchestrator.generate_response("test_session_id")
+
+        assert response == {"content": "Answer"}
+        mock_answer.assert_awaited_once_with(
+            {"search_keywords": ["Hello, how are you?"]}, mock_chat_history, None
+        )
+        mock_completion.assert_not_called()
+
+    @pytest.mark.asyncio
+    @override_settings(INTENT_ROUTER_ENABLED=True)
+    @pytest.mark.parametrize(
+        "error", [asyncio.TimeoutError(), RuntimeError("embedding server down")]
+    )
+    async def test_generate_response_falls_back_when_router_fails(
+        self, mocker, mock_chat_history, error
+    ):
+        """Test that the model routes the message when the intent router raises."""
+        mocker.patch("agent.orchestrators.IntentRouter.aroute", side_effect=error)
+        mock_answer = mocker.patch("agent.orchestrators.ChatOrchestrator.answer_faq")
+        mock_completion = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion",
+            return_value=make_mock_chat_completion(
+                finish_reason=FinishReason.STOP, content="Hello!"
+            ),
+        )
+        mocker.patch(
+            "agent.services.RedisChatHistoryService.get_chat_history",
+            return_value=mock_chat_history,
+        )
+
+        response = await ChatOrchestrator.generate_response("test_session_id")
+
+        assert response["content"] == "Hello!"
+        assert mock_completion.await_args.args[3] == TOOLS
+        mock_answer.assert_not_called()
+
+    @pytest.mark.asyncio
+    @override_settings(INTENT_ROUTER_ENABLED=True)
+    async def test_generate_response_falls_back_to_model_routing(
+        self, mocker, mock_chat_history
+    ):
+        """Test that the model routes the message when the router is not confident."""
+        mocker.patch("agent.orchestrators.IntentRouter.aroute", return_value=None)
+        mock_completion = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion",
+            return_value=make_mock_chat_completion(finish_reason=FinishReason.STOP),
+        )
+        mocker.patch(
+            "agent.services.RedisChatHistoryService.get_chat_history",
+            return_value=mock_chat_history,
+        )
+
+        await ChatOrchestrator.generate_response("test_session_id")
+
+        assert mock_completion.await_args.args[3] == TOOLS
+
+    @pytest.mark.asyncio
+    async def test_answer_faq_serves_cached_answer(self, mocker, mock_chat_history):
+        """Test that a similar FAQ question over the same FAQs is answered from the cache."""
+        FAQAnswerCacheService.clear()
+        mocker.patch(
+            "agent.orchestrators.USEModelService.aget_vector_representation",
+            side_effect=[
+                np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32),
+                np.array([[0.0, 1.0], [0.99, 0.1]], dtype=np.float32),
+            ],
+        )
+        faq = {"id": 1, "distance": 0.9, "entity": {"question": "Q", "answer": "A"}}
+        mocker.patch(
+            "agent.orchestrators.MilvusClientService.asearch_faq_hybrid",
+            return_value=[[faq]],
+        )
+        mock_completion = mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion",
+            return_value=make_mock_chat_completion(
+                finish_reason=FinishReason.STOP, content="Answer"
+            ),
+        )
+        arguments = {"search_keywords": ["donation methods"]}
+
+        first = await ChatOrchestrator.answer_faq(arguments, mock_chat_history)
+        second = await ChatOrchestrator.answer_faq(arguments, mock_chat_history)
+
+        mock_completion.assert_awaited_once()
+        assert second["content"] == first["content"] == "Answer"
+        assert second["total_tokens"] == 0
+        assert FAQAnswerCacheService.stats()["hits"] == 1
+        FAQAnswerCacheService.clear()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("arguments", [{}, {"search_keywords": None}])
+    async def test_answer_faq_without_keywords_searches_message(
+        self, mocker, mock_chat_history, arguments
+    ):
+        """Test that an FAQ call without search keywords searches the user message."""
+        FAQAnswerCacheService.clear()
+        mock_vectors = mocker.patch(
+            "agent.orchestrators.USEModelService.aget_vector_representation",
+            return_value=np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32),
+        )
+        mocker.patch(
+            "agent.orchestrators.MilvusClientService.asearch_faq_hybrid",
+            return_value=[[]],
+        )
+        mocker.patch(
+            "agent.services.OpenAIClientService.achat_completion",
+            return_value=make_mock_chat_completion(
+                finish_reason=FinishReason.STOP, content="Answer"
+            ),
+        )
+
+        response = await ChatOrchestrator.answer_faq(arguments, mock_chat_history)
+
+        message = mock_chat_history[-1]["content"]
+        mock_vectors.assert_awaited_once_with([message, message])
+        assert response["content"] == "Answer"
+        FAQAnswerCacheService.clear()
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+from django.test import override_settings
+
+from agent.constants import *
+from agent.routers import IntentRouter
+
+# Unit vector per intent, so each centroid points along one axis.
+# The last axis belongs to no intent.
+INTENT_AXES = {INTENT_FAQ: 0, INTENT_CHILD_SEARCH: 1, INTENT_OTHER: 2}
+
+
+def fake_embeddings(messages):
+    """Return fake embeddings for the intent examples and the test messages."""
+
+    def embed(query_list, use_cache=True):
+        vectors = []
+        for text in query_list:
+            if text in messages:
+                vectors.append(messages[text])
+                continue
+            intent = next(i for i, ex in INTENT_EXAMPLES.items() if text in ex)
+            vector = np.zeros(4, dtype=np.float32)
+            vector[INTENT_AXES[intent]] = 1.0
+            vectors.append(vector)
+        return np.stack(vectors)
+
+    return embed
+
+
+class TestIntentRouter:
+    """Test suite for IntentRouter."""
+
+    @pytest.fixture(autouse=True)
+    def reset_router(self, mocker):
+        IntentRouter._intents = None
+        IntentRouter._centroids = None
+        messages = {
+            "How do I donate?": np.array([0.9, 0.1, 0.1, 0.0], dtype=np.float32),
+            "Any kids from Peru?": np.array([0.1, 0.9, 0.1, 0.0], dtype=np.float32),
+            "Donate to a kid?": np.array([0.6, 0.55, 0.0, 0.0], dtype=np.float32),
+            "Hmm": np.array([0.4, 0.0, 0.0, 0.9], dtype=np.float32),
+        }
+        self.mock_embed = mocker.patch(
+            "agent.routers.USEModelService.get_vector_representation",
+            side_effect=fake_embeddings(messages),
+        )
+        yield
+        IntentRouter._intents = None
+        IntentRouter._centroids = None
+
+    def test_classify_returns_nearest_intent(self):
+        """Test that a message is assigned the intent with the nearest centroid."""
+        intent, similarity, margin = IntentRouter.classify("Any kids from Peru?")
+
+        assert intent == INTENT_CHILD_SEARCH
+        assert similarity > 0.9
+        assert margin > 0.5
+
+    def test_centroids_are_computed_once(self):
+        """Test that the example utterances are only embedded on first use."""
+        IntentRouter.classify("How do I donate?")
+        IntentRouter.classify("Any kids from Peru?")
+
+        assert self.mock_embed.call_count == len(INTENT_EXAMPLES) + 2
+
+    @override_settings(INTENT_ROUTER_MIN_SIMILARITY=0.5, INTENT_ROUTER_MIN_MARGIN=0.1)
+    @pytest.mark.parametrize(
+        "message,expected",
+        [
+            # Confident FAQ question
+            ("How do I donate?", INTENT_FAQ),
+            # Child searches need arguments from the model
+            ("Any kids from Peru?", None),
+            # Too close to the runner-up
+            ("Donate to a kid?", None),
+            # Not similar enough to any intent
+            ("Hmm", None),
+            ("", None),
+        ],
+    )
+    def test_route(self, message, expected):
+        """Test that only confident FAQ messages are routed locally."""
+        assert IntentRouter.route(message) == expected
@@ -1,7 +1,10 @@
-import json
+import httpx, json
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime
+import numpy as np
+from django.test import override_settings
+from model_bakery import baker
 
 from agent.services import *
 from conftest import *
@@ -30,24 +33,146 @@ class TestOpenAIClientService:
         assert total_tokens == 100
         assert content == "Hello!"
 
+    @pytest.mark.asyncio
+    @patch("agent.services.AsyncOpenAI")
+    async def test_achat_completion_awaits_async_client(self, mock_async_openai_class):
+        """Test that achat_completion awaits the async client with a per-call timeout."""
+        mock_completion = make_mock_chat_completion(finish_reason="stop")
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_completion)
+        mock_async_openai_class.return_value = mock_client
+        OpenAIClientService._async_client = None
+
+        completion = await OpenAIClientService.achat_completion(
+            "gpt-3.5-turbo", "You are helpful.", [{"role": "user", "content": "Hi!"}]
+        )
+
+        assert completion == mock_completion
+        kwargs = mock_client.chat.completions.create.await_args.kwargs
+        assert kwargs["messages"] == [
+            {"role": "system", "content": "You are helpful."},
+            {"role": "user", "content": "Hi!"},
+        ]
+        assert kwargs["timeout"] == settings.OPENAI_TIMEOUT_SEC
+
+    @pytest.mark.asyncio
+    async def test_async_client_is_shared_within_event_loop(self, monkeypatch):
+        """Test that one pooled async client is reused on the same event loop."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        OpenAIClientService._async_client = None
+
+        client = OpenAIClientService.get_async_client()
+
+        assert OpenAIClientService.get_async_client() is client
+        pool = client._client._transport._pool
+        assert pool._max_connections == settings.OPENAI_MAX_CONNECTIONS
+        assert (
+            pool._max_keepalive_connections == settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS
+        )
+
+    @staticmethod
+    def stub_openai_stream(chunks):
+        """Return an AsyncOpenAI client whose API is a local stub streaming chunks."""
+
+        def handler(request):
+            body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=body + "data: [DONE]\n\n",
+            )
+
+        return AsyncOpenAI(
+            api_key="test-key",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+    @pytest.mark.asyncio
+    async def test_astream_chat_completion_forwards_deltas(self):
+        """Test that streamed text is forwarded as it arrives and accumulated with usage."""
+        chunk = {
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-4o-mini",
+        }
+        chunks = [
+            {
+                **chunk,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": text},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            for text in ["Hel", "lo!"]
+        ]
+        chunks.append(
+            {
+                **chunk,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+        )
+        chunks.append(
+            {
+                **chunk,
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 5,
+                    "completion_tokens": 2,
+                    "total_tokens": 7,
+                },
+            }
+        )
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        with patch.object(
+            OpenAIClientService,
+            "get_async_client",
+            return_value=self.stub_openai_stream(chunks),
+        ):
+            completion = await OpenAIClientService.astream_chat_completion(
+                "gpt-4o-mini", "You are helpful.", [], on_delta
+            )
+
+        assert deltas == ["Hel", "lo!"]
+        assert completion.model == "gpt-4o-mini"
+        assert completion.choices[0].message.content == "Hello!"
+        assert completion.choices[0].finish_reason == "stop"
+        assert completion.usage.total_tokens == 7
+
 
 class TestRedisChatHistoryService:
     session_id = "test_session"
 
     @pytest.fixture
     def mock_redis(self):
-        with patch("agent.services.redis.Redis") as mock_redis_class:
+        with patch("agent.services.aioredis.Redis") as mock_redis_class:
             mock_redis_instance = MagicMock()
+            mock_redis_instance.lrange = AsyncMock()
+            mock_pipeline = MagicMock()
+            mock_pipeline.execute = AsyncMock()
+            mock_redis_instance.pipeline.return_value.__aenter__.return_value = (
+                mock_pipeline
+            )
             mock_redis_class.from_url.return_value = mock_redis_instance
+            RedisChatHistoryService._redis = None
             yield mock_redis_instance
+            RedisChatHistoryService._redis = None
 
-    def test_save_message_should_push_data_and_set_expiry(self, mock_redis):
-        RedisChatHistoryService._redis = None
+    @pytest.mark.asyncio
+    @override_settings(CHAT_HISTORY_MAX_MESSAGES=20, CHAT_HISTORY_TTL_SEC=3600)
+    async def test_save_message_pipelines_push_trim_and_expiry(self, mock_redis):
         sender = "user"
         message = "Hello"
         timestamp = datetime.now().isoformat()
 
-        RedisChatHistoryService.save_message(
+        await RedisChatHistoryService.save_message(
             self.session_id, sender, message, timestamp
         )
 
@@ -55,12 +180,16 @@ class TestRedisChatHistoryService:
         expected_data = json.dumps(
             {"sender": sender, "message": message, "timestamp": timestamp}
         )
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        pipe = mock_redis.pipeline.return_value.__aenter__.return_value
+        pipe.rpush.assert_called_once_with(key, expected_data)
+        pipe.ltrim.assert_called_once_with(key, -20, -1)
+        pipe.expire.assert_called_once_with(key, 60 * 60)
+        pipe.execute.assert_awaited_once()
 
-        mock_redis.rpush.assert_called_once_with(key, expected_data)
-        mock_redis.expire.assert_called_once_with(key, 60 * 60)
-
-    def test_get_chat_history_returns_composed_messages(self, mock_redis):
-        RedisChatHistoryService._redis = None
+    @pytest.mark.asyncio
+    @override_settings(CHAT_HISTORY_MAX_MESSAGES=20)
+    async def test_get_chat_history_returns_composed_messages(self, mock_redis):
         key = f"chat:{self.session_id}"
 
         stored_messages = [
@@ -77,10 +206,106 @@ class TestRedisChatHistoryService:
         ]
         mock_redis.lrange.return_value = stored_messages
 
-        result = RedisChatHistoryService.get_chat_history(self.session_id)
+        result = await RedisChatHistoryService.get_chat_history(self.session_id)
 
         assert result == [
             {"role": "user", "content": "Hi"},
             {"role": "assistant", "content": "Hello!"},
         ]
-        mock_redis.lrange.assert_called_once_with(key, 0, -1)
+        mock_redis.lrange.assert_awaited_once_with(key, -20, -1)
+
+
+class TestFAQAnswerCacheService:
+    """Test suite for FAQAnswerCacheService."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        FAQAnswerCacheService.clear()
+        yield
+        FAQAnswerCacheService.clear()
+
+    def test_serves_similar_question_over_same_faqs(self):
+        """Test that a nearby question retrieving the same FAQs is a hit."""
+        response = {"model": "gpt-4o", "total_tokens": 10, "content": "Answer"}
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [2, 1], response)
+
+        assert FAQAnswerCacheService.get(np.array([0.99, 0.05]), [1, 2]) == response
+        assert FAQAnswerCacheService.get(np.array([0.99, 0.05]), [1, 3]) is None
+        assert FAQAnswerCacheService.get(np.array([0.5, 0.5]), [1, 2]) is None
+        stats = FAQAnswerCacheService.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+    @override_settings(FAQ_ANSWER_CACHE_TTL_SEC=0)
+    def test_expired_entries_are_dropped(self):
+        """Test that entries are not served after their TTL."""
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [1], {"content": "Answer"})
+
+        assert FAQAnswerCacheService.get(np.array([1.0, 0.0]), [1]) is None
+        assert FAQAnswerCacheService.stats()["size"] == 0
+
+    @override_settings(FAQ_ANSWER_CACHE_MAX_ENTRIES=2)
+    def test_evicts_least_recently_used_faq_set(self):
+        """Test that the oldest answers are evicted once the cache is full."""
+        for faq_id in [1, 2, 3]:
+            FAQAnswerCacheService.set(np.array([1.0, 0.0]), [faq_id], {})
+
+        assert FAQAnswerCacheService.get(np.array([1.0, 0.0]), [1]) is None
+        assert FAQAnswerCacheService.stats()["evictions"] == 1
+        assert FAQAnswerCacheService.stats()["size"] == 2
+
+    @pytest.mark.django_db
+    def test_faq_update_invalidates_answers(self):
+        """Test that saving or deleting an FAQ entry drops the answers built from it."""
+        faq = baker.make("faqs.FAQEntry")
+        other = baker.make("faqs.FAQEntry")
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [faq.id, other.id], {})
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [other.id], {})
+
+        faq.answer = "Updated answer"
+        faq.save()
+
+        assert (
+            FAQAnswerCacheService.get(np.array([1.0, 0.0]), [faq.id, other.id]) is None
+        )
+        assert FAQAnswerCacheService.get(np.array([1.0, 0.0]), [other.id]) == {}
+        other.delete()
+        assert FAQAnswerCacheService.stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_async_path_uses_async_cache_api(self):
+        """Test that aget and aset read the FAQ versions without blocking cache calls."""
+        response = {"content": "Answer"}
+        with patch("agent.services.cache") as mock_cache:
+            mock_cache.aget_many = AsyncMock(return_value={})
+            mock_cache.get_many.side_effect = AssertionError("blocking cache call")
+            await FAQAnswerCacheService.aset(np.array([1.0, 0.0]), [1], response)
+            cached = await FAQAnswerCacheService.aget(np.array([1.0, 0.0]), [1])
+
+        assert cached == response
+        assert mock_cache.aget_many.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_async_path_skips_answers_of_changed_faqs(self):
+        """Test that aget does not serve answers once an FAQ version was bumped."""
+        await FAQAnswerCacheService.aset(np.array([1.0, 0.0]), [1], {})
+
+        FAQAnswerCacheService.bump_version(1)
+
+        assert await FAQAnswerCacheService.aget(np.array([1.0, 0.0]), [1]) is None
+        assert FAQAnswerCacheService.stats()["invalidations"] == 1
+
+    def test_faq_update_in_another_process_invalidates_answers(self):
+        """Test that answers are not served once another process bumped an FAQ version."""
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [1, 2], {})
+        FAQAnswerCacheService.set(np.array([1.0, 0.0]), [2], {})
+
+        # Only the shared version changes, as when the edit is made elsewhere
+        FAQAnswerCacheService.bump_version(1)
+
+        assert FAQAnswerCacheService.get(np.array([1.0, 0.0]), [1, 2]) is None
+        assert FAQAnswerCacheService.get(np.array([1.0, 0.0]), [2]) == {}
+        stats = FAQAnswerCacheService.stats()
+        assert stats["invalidations"] == 1
+        assert stats["size"] == 1
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-import os
+import os, json
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +44,58 @@ KAGGLE_USERNAME = os.getenv("KAGGLE_USERNAME")
 KAGGLE_KEY = os.getenv("KAGGLE_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Async OpenAI client: per-call timeout and the process-wide connection pool
+OPENAI_TIMEOUT_SEC = float(os.getenv("OPENAI_TIMEOUT_SEC", 30))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+OPENAI_KEEPALIVE_EXPIRY_SEC = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SEC", 30))
+
+# Stream assistant replies to the chat as they are generated
+CHAT_STREAMING_ENABLED = os.getenv("CHAT_STREAMING_ENABLED", "true") == "true"
+
+# What to do with a message sent while the reply to the previous one is being
+# generated: "queue" it, "supersede" the previous reply, or "reject" it
+CHAT_TURN_POLICY = os.getenv("CHAT_TURN_POLICY", "queue")
+
+# Send replies straight to the chat's socket instead of through its channel group
+CHAT_DIRECT_SEND = os.getenv("CHAT_DIRECT_SEND", "true") == "true"
+
+# Route plainly-FAQ messages with the local intent router instead of the model
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "false") == "true"
+INTENT_ROUTER_MIN_SIMILARITY = float(os.getenv("INTENT_ROUTER_MIN_SIMILARITY", 0.5))
+INTENT_ROUTER_MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", 0.1))
+
+# Admission control of chat turns: turns running at once per process, turns
+# waiting for a slot, and an optional limit shared by every worker through Redis
+CHAT_ADMISSION_MAX_CONCURRENCY = int(os.getenv("CHAT_ADMISSION_MAX_CONCURRENCY", 32))
+CHAT_ADMISSION_MAX_QUEUE = int(os.getenv("CHAT_ADMISSION_MAX_QUEUE", 100))
+CHAT_ADMISSION_QUEUE_TIMEOUT_SEC = float(
+    os.getenv("CHAT_ADMISSION_QUEUE_TIMEOUT_SEC", 60)
+)
+CHAT_ADMISSION_REDIS_URL = os.getenv("CHAT_ADMISSION_REDIS_URL")
+CHAT_ADMISSION_CLUSTER_MAX_CONCURRENCY = int(
+    os.getenv("CHAT_ADMISSION_CLUSTER_MAX_CONCURRENCY", 100)
+)
+CHAT_ADMISSION_LEASE_SEC = float(os.getenv("CHAT_ADMISSION_LEASE_SEC", 120))
+
+# Semantic cache of answers to FAQ questions
+FAQ_ANSWER_CACHE_ENABLED = os.getenv("FAQ_ANSWER_CACHE_ENABLED", "true") == "true"
+FAQ_ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("FAQ_ANSWER_CACHE_MAX_DISTANCE", 0.1))
+FAQ_ANSWER_CACHE_TTL_SEC = int(os.getenv("FAQ_ANSWER_CACHE_TTL_SEC", 60 * 60))
+FAQ_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("FAQ_ANSWER_CACHE_MAX_ENTRIES", 1000))
+
+# Write-behind batching of chat message rows
+CHAT_MESSAGE_WRITE_BEHIND_ENABLED = (
+    os.getenv("CHAT_MESSAGE_WRITE_BEHIND_ENABLED", "true") == "true"
+)
+CHAT_MESSAGE_BATCH_MAX_SIZE = int(os.getenv("CHAT_MESSAGE_BATCH_MAX_SIZE", 100))
+CHAT_MESSAGE_BATCH_MAX_WAIT_MS = float(
+    os.getenv("CHAT_MESSAGE_BATCH_MAX_WAIT_MS", 1000)
+)
+
 # Local cache directory (default: ~/.cache)
 CACHE_DIR = Path(os.getenv("CACHE_DIR", os.path.expanduser("~/.cache")))
 
@@ -59,14 +111,94 @@ USE_MODEL_DIR = str(
     / "2"
 )
 
+# Embedding backend: "local" loads the USE model in every process, "server" sends
+# requests to the shared embedding server (manage.py run_embedding_server)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "local")
+EMBEDDING_SERVER_SOCKET = os.getenv(
+    "EMBEDDING_SERVER_SOCKET", "/tmp/charityproject-embedding.sock"
+)
+EMBEDDING_SERVER_TIMEOUT_SEC = float(os.getenv("EMBEDDING_SERVER_TIMEOUT_SEC", 10))
+# Version of the embedding model, part of the shared embedding cache keys;
+# change it whenever the model is replaced
+EMBEDDING_MODEL_VERSION = os.getenv(
+    "EMBEDDING_MODEL_VERSION", "universal-sentence-encoder-multilingual/2"
+)
+
+# Embedding cache: in-process LRU size and optional shared Redis tier
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 2048))
+EMBEDDING_CACHE_REDIS_URL = os.getenv("EMBEDDING_CACHE_REDIS_URL")
+EMBEDDING_CACHE_TTL_SEC = int(os.getenv("EMBEDDING_CACHE_TTL_SEC", 60 * 60 * 24 * 7))
+
+# Micro-batching of concurrent embedding requests
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true") == "true"
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 64))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))
+
+# Thread pool for embedding and vector search calls made from async code
+SEMANTIC_SEARCH_MAX_WORKERS = int(os.getenv("SEMANTIC_SEARCH_MAX_WORKERS", 8))
+SEMANTIC_SEARCH_TIMEOUT_SEC = float(os.getenv("SEMANTIC_SEARCH_TIMEOUT_SEC", 5))
+
 # Paths to vector database files
 VECTOR_DB_FILE = str(BASE_DIR / "charity_chatbot.db")
 VECTOR_DB_FILE_TEST = str(BASE_DIR / "charity_chatbot_test.db")
 
+# ANN index per vector collection. The index type is FLAT, IVF_FLAT, HNSW,
+# AUTOINDEX or AUTO (FLAT for small collections, IVF_FLAT for large ones).
+# Build and search params are JSON objects merged over the defaults of the type.
+# Milvus Lite only supports FLAT, IVF_FLAT and AUTOINDEX.
+VECTOR_INDEX_CONFIG = {
+    "faq_vectors": {
+        "index_type": os.getenv("FAQ_VECTOR_INDEX_TYPE", "AUTO"),
+        "build_params": json.loads(os.getenv("FAQ_VECTOR_INDEX_BUILD_PARAMS", "{}")),
+        "search_params": json.loads(os.getenv("FAQ_VECTOR_INDEX_SEARCH_PARAMS", "{}")),
+    },
+    "child_profiles": {
+        "index_type": os.getenv("CHILD_VECTOR_INDEX_TYPE", "AUTO"),
+        "build_params": json.loads(os.getenv("CHILD_VECTOR_INDEX_BUILD_PARAMS", "{}")),
+        "search_params": json.loads(
+            os.getenv("CHILD_VECTOR_INDEX_SEARCH_PARAMS", "{}")
+        ),
+    },
+}
+
+# Versioned vector collections: how long searches cache the active version, and
+# how long a replaced version is kept before the sync commands drop it
+VECTOR_COLLECTION_CACHE_SEC = float(os.getenv("VECTOR_COLLECTION_CACHE_SEC", 30))
+VECTOR_COLLECTION_GRACE_SEC = int(os.getenv("VECTOR_COLLECTION_GRACE_SEC", 60 * 60))
+
 # Redis URL for storing chat history
 REDIS_CHAT_HISTORY_URL = os.getenv(
     "REDIS_CHAT_HISTORY_URL", f"redis://localhost:6379/0"
 )
+# Messages kept per chat session, and how long an idle session is kept
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", 40))
+CHAT_HISTORY_TTL_SEC = int(os.getenv("CHAT_HISTORY_TTL_SEC", 60 * 60))
+
+# Pagination of the children list: "page" numbers, or "cursor" (keyset) pages
+# whose cost does not grow with depth; cursor pages only count the matching
+# children if enabled
+CHILD_LIST_PAGINATION = os.getenv("CHILD_LIST_PAGINATION", "page")
+CHILD_LIST_CURSOR_COUNT_ENABLED = (
+    os.getenv("CHILD_LIST_CURSOR_COUNT_ENABLED", "false") == "true"
+)
+
+# Cache backend: Redis if a URL is set, so cached values are shared by every
+# process, otherwise an in-process cache
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+        if CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+# Cached counts and facet counts of the children list filter combinations
+CHILD_COUNT_CACHE_ENABLED = os.getenv("CHILD_COUNT_CACHE_ENABLED", "true") == "true"
+CHILD_COUNT_CACHE_TTL_SEC = int(os.getenv("CHILD_COUNT_CACHE_TTL_SEC", 300))
 
 # Base URL for Bootstrap Icons
 BS_ICONS_BASE_URL = "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/"
@@ -9,11 +9,19 @@ from unittest.mock import MagicMock
 from pymilvus import MilvusClient
 
 from django.conf import settings
+from django.core.cache import cache
 
 from semanticsearch.schemas import *
 from semanticsearch.constants import *
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache, as the database is rolled back."""
+    cache.clear()
+    yield
+
+
 @pytest.fixture
 def milvus_client():
     """Return a Milvus client for testing."""
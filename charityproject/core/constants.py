@@ -17,3 +17,5 @@ MAX_QUESTION_LEN = 255
 MAX_ANSWER_LEN = 2048
 MAX_CHILD_NAME_LEN = 255
 MAX_CHILD_PROFILE_LEN = 2048
+MAX_COUNTRY_NAME_LEN = 255
+MAX_GENDER_NAME_LEN = 50
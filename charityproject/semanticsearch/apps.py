@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 import os, sys
 from semanticsearch.services import *
@@ -23,5 +24,7 @@ class SemanticsearchConfig(AppConfig):
             # Load the USE model when the app is ready
             if os.environ.get("RUN_MAIN") == "true":
                 print("ready method called")
-                USEModelService.load_model()
+                # The embedding server owns the model in server mode
+                if settings.EMBEDDING_BACKEND == EMBEDDING_BACKEND_LOCAL:
+                    USEModelService.load_model()
                 MilvusClientService.init_client()
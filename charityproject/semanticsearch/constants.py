@@ -2,3 +2,38 @@
 FAQ_COLLECTION_NAME = "faq_vectors"
 CHILD_COLLECTION_NAME = "child_profiles"
 NUM_DIM = 512  # The vectors Google USE creates has 512 dimensions
+CONTENT_HASH_LEN = 64  # SHA-256 hex digest of the embedded text
+VERSIONED_COLLECTION_FORMAT = "{name}_v{version}"  # Physical collection per rebuild
+
+# ANN indexes
+VECTOR_INDEX_AUTO = "AUTO"  # Choose the index type from the collection size
+VECTOR_METRIC_TYPE = "IP"
+SCALAR_INDEX_TYPE = "INVERTED"  # Index for the scalar fields used in search filters
+CHILD_FILTER_FIELDS = ["country", "gender", "birth_date", "birth_month", "birth_day"]
+FLAT_INDEX_MAX_ROWS = 20_000  # Exact search stays fast enough below this size
+IVF_NLIST_RANGE = (16, 65536)  # nlist defaults to 4 * sqrt(rows) within this range
+# Defaults per index type, used when the settings do not override them
+DEFAULT_INDEX_BUILD_PARAMS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nlist": 128},
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "AUTOINDEX": {},
+}
+DEFAULT_INDEX_SEARCH_PARAMS = {
+    "FLAT": {},
+    "IVF_FLAT": {"nprobe": 16},
+    "HNSW": {"ef": 64},
+    "AUTOINDEX": {},
+}
+
+# Embedding cache
+EMBEDDING_CACHE_KEY_PREFIX = "emb"
+EMBEDDING_DTYPE = "float32"
+
+# Embedding backends
+EMBEDDING_BACKEND_LOCAL = "local"  # Load the USE model in this process
+EMBEDDING_BACKEND_SERVER = "server"  # Delegate to the shared embedding server
+EMBEDDING_SERVER_HEADER_BYTES = 4  # Big-endian length prefix of each frame
+
+# Vector sync
+VECTOR_SYNC_BATCH_SIZE = 256  # Rows read and embedded per batch by the sync commands
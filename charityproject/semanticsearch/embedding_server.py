@@ -0,0 +1,145 @@
+"""
+Shared embedding server and its client.
+
+A single long-lived process owns the USE model and serves embedding requests
+over a local UNIX socket, so ASGI workers do not each load their own copy.
+
+Each frame is a big-endian length prefix followed by the payload:
+- request:  JSON {"texts": [...]}
+- response: JSON header {"shape": [rows, dim], "error": null}, followed by a
+  second frame holding the raw float32 vectors
+"""
+
+import json, os, socket, socketserver, struct, threading
+from typing import Callable, List
+
+import numpy as np
+
+from django.conf import settings
+from semanticsearch.constants import *
+from semanticsearch.exceptions import EmbeddingServerError
+
+
+def send_frame(sock: socket.socket, payload: bytes) -> None:
+    """Send a length-prefixed frame."""
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """Read exactly size bytes, raising ConnectionError if the peer closes."""
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    """Receive a length-prefixed frame."""
+    (length,) = struct.unpack(">I", recv_exactly(sock, EMBEDDING_SERVER_HEADER_BYTES))
+    return recv_exactly(sock, length)
+
+
+class EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    """Serves embedding requests over one client connection until it closes."""
+
+    def handle(self):
+        while True:
+            try:
+                request = json.loads(recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+            try:
+                vectors = np.asarray(
+                    self.server.encode_fn(request["texts"]), dtype=EMBEDDING_DTYPE
+                )
+                header = {"shape": list(vectors.shape), "error": None}
+                send_frame(self.request, json.dumps(header).encode())
+                send_frame(self.request, vectors.tobytes())
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                header = {"shape": [0, NUM_DIM], "error": str(e)}
+                send_frame(self.request, json.dumps(header).encode())
+                send_frame(self.request, b"")
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """
+    UNIX socket server that encodes texts with the given function.
+    Connections are served on separate threads, so concurrent requests can be
+    coalesced by a batch scheduler behind encode_fn.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, encode_fn: Callable[[List[str]], np.ndarray]):
+        self.encode_fn = encode_fn
+        # Remove a stale socket left by a previous run
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, EmbeddingRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class EmbeddingServerClient:
+    """
+    Client backend for USEModelService that delegates encoding to the embedding server.
+    Each thread keeps its own persistent connection.
+    """
+
+    _local = threading.local()
+
+    @classmethod
+    def connect(cls) -> socket.socket:
+        """Return this thread's connection, opening it on first use."""
+        sock = getattr(cls._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(settings.EMBEDDING_SERVER_TIMEOUT_SEC)
+            sock.connect(settings.EMBEDDING_SERVER_SOCKET)
+            cls._local.sock = sock
+        return sock
+
+    @classmethod
+    def close(cls) -> None:
+        """Close this thread's connection."""
+        sock = getattr(cls._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            cls._local.sock = None
+
+    @classmethod
+    def encode(cls, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts on the embedding server.
+        A broken connection is retried once on a fresh socket.
+        """
+        for attempt in range(2):
+            try:
+                return cls.request(texts)
+            except (ConnectionError, OSError) as e:
+                cls.close()
+                if attempt == 1:
+                    raise EmbeddingServerError(
+                        f"Embedding server unavailable at "
+                        f"{settings.EMBEDDING_SERVER_SOCKET}: {e}"
+                    ) from e
+
+    @classmethod
+    def request(cls, texts: List[str]) -> np.ndarray:
+        """Send one request on this thread's connection and read the response."""
+        sock = cls.connect()
+        send_frame(sock, json.dumps({"texts": list(texts)}).encode())
+        header = json.loads(recv_frame(sock))
+        payload = recv_frame(sock)
+        if header["error"]:
+            raise EmbeddingServerError(header["error"])
+        return np.frombuffer(payload, dtype=EMBEDDING_DTYPE).reshape(header["shape"])
@@ -0,0 +1,19 @@
+"""
+Custom exceptions for the semantic search services.
+"""
+
+
+class EmbeddingServerError(Exception):
+    """
+    Raised when the embedding server cannot be reached or fails to encode a request.
+    """
+
+    pass
+
+
+class VectorIndexError(Exception):
+    """
+    Raised when a newly built vector collection fails validation.
+    """
+
+    pass
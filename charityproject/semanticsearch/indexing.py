@@ -0,0 +1,136 @@
+import re, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Iterable, Iterator, List
+
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from semanticsearch.exceptions import VectorIndexError
+
+
+def iterate_keyset(
+    queryset: QuerySet, fields: List[str], batch_size: int
+) -> Iterator[List[dict]]:
+    """
+    Yield rows of the queryset in primary key order, batch_size rows at a time.
+    Each batch is fetched with a keyset predicate (id > last id) instead of an
+    OFFSET, so every query costs the same regardless of how deep the scan is.
+    """
+    last_id = None
+    while True:
+        page = queryset.order_by("id")
+        if last_id is not None:
+            page = page.filter(id__gt=last_id)
+        batch = list(page.values(*fields)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]["id"]
+
+
+def rebatch(rows: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    """Regroup a stream of rows into lists of batch_size rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class IndexingStats:
+    """Counters reported by BulkIndexer."""
+
+    rows: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed_sec(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows in {self.elapsed_sec:.1f}s "
+            f"({self.rows_per_sec:.0f} rows/sec)"
+        )
+
+
+class BulkIndexer:
+    """
+    Pipelined bulk indexer shared by the vector sync commands.
+
+    prepare turns a batch of source rows into vector DB rows (this is where the
+    embedding happens) and write stores them. Writes run on a background thread,
+    so the vector DB insert of batch N overlaps with the embedding of batch N+1.
+    At most one write is in flight, which keeps memory bounded to two batches.
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[List[dict]], List[dict]],
+        write: Callable[[List[dict]], None],
+    ):
+        self.prepare = prepare
+        self.write = write
+        self.stats = IndexingStats()
+
+    def run(self, batches: Iterable[List[dict]]) -> IndexingStats:
+        """Index all batches and return the counters."""
+        with ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bulk-indexer"
+        ) as writer:
+            pending = None
+            for batch in batches:
+                rows = self.prepare(batch)
+                # Wait for the previous write before queueing the next one
+                if pending is not None:
+                    pending.result()
+                if rows:
+                    pending = writer.submit(self.write, rows)
+                    self.stats.rows += len(rows)
+                    self.stats.batches += 1
+            if pending is not None:
+                pending.result()
+        return self.stats
+
+
+def validate_row_count(client, collection_name: str, expected: int) -> None:
+    """Raise VectorIndexError if the collection does not hold the expected rows."""
+    stats = client.get_collection_stats(collection_name=collection_name)
+    row_count = stats["row_count"]
+    if row_count != expected:
+        raise VectorIndexError(
+            f"{collection_name} holds {row_count} rows, expected {expected}"
+        )
+
+
+def drop_retired_collections(client, state, grace_sec: int) -> List[str]:
+    """
+    Drop every version of the state's collection other than the active one,
+    including the unversioned legacy collection. Nothing is dropped until
+    grace_sec has passed since the last switch, so searches still holding the
+    previous name can finish.
+    """
+    if state.activated_at is None:
+        return []
+    if timezone.now() < state.activated_at + timedelta(seconds=grace_sec):
+        return []
+    pattern = re.compile(rf"{re.escape(state.collection_name)}(_v\d+)?")
+    retired = [
+        name
+        for name in client.list_collections()
+        if pattern.fullmatch(name) and name != state.active_collection
+    ]
+    for name in retired:
+        client.drop_collection(collection_name=name)
+    return retired
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from semanticsearch.services import *
+from semanticsearch.embedding_server import EmbeddingServer
+
+
+class Command(BaseCommand):
+    # python manage.py run_embedding_server --help
+    help = (
+        "Run the shared embedding server.\n\n"
+        "Loads the USE model once and serves batched embedding requests over a "
+        "UNIX socket to processes configured with EMBEDDING_BACKEND=server.\n\n"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            type=str,
+            default=settings.EMBEDDING_SERVER_SOCKET,
+            help="Path of the UNIX socket to listen on (default: EMBEDDING_SERVER_SOCKET).",
+        )
+
+    def handle(self, *args, **kwargs):
+        socket_path = kwargs["socket"]
+        USEModelService.load_model()
+        if USEModelService._model is None:
+            self.stdout.write(self.style.ERROR("USE model could not be loaded."))
+            return
+
+        # Serve with the in-process encoder so requests from all clients share batches
+        server = EmbeddingServer(socket_path, USEModelService.encode_local)
+        self.stdout.write(
+            self.style.SUCCESS(f"Embedding server listening on {socket_path}")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.SUCCESS("Embedding server stopped."))
@@ -1,59 +1,256 @@
 from pymilvus import MilvusClient
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db.models import Max
 
 from semanticsearch.services import *
 from semanticsearch.constants import *
 from semanticsearch.schemas import *
+from semanticsearch.models import VectorSyncState
+from semanticsearch.exceptions import VectorIndexError
+from semanticsearch.indexing import *
+from semanticsearch.utils import *
 from sponsors.models import *
 from core.constants import *
+from core.utils import *
 
 
 class Command(BaseCommand):
     # python manage.py sync_child_vectors --help
-    help = "Sync child data from the relational DB to the vector DB.\n\n"
+    help = (
+        "Sync child data from the relational DB to the vector DB.\n\n"
+        "By default only children updated since the last sync are read, and "
+        "deleted children are found by comparing IDs. Use --full-scan to compare "
+        "the text hash of every child with the vector DB instead. Use --full to "
+        "re-embed every child into a new version of the collection, which "
+        "searches switch to once it is complete.\n\n"
+    )
+
+    child_fields = [
+        "id",
+        "name",
+        "profile_description",
+        "date_of_birth",
+        "country__name",
+        "gender__name",
+        "updated_at",
+        "deleted_at",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the whole collection instead of syncing changes.",
+        )
+        parser.add_argument(
+            "--full-scan",
+            action="store_true",
+            help="Check every child for changes, not only those updated since the last sync.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=VECTOR_SYNC_BATCH_SIZE,
+            help="Number of children read and embedded per batch.",
+        )
 
     def handle(self, *args, **kwargs):
         # Init client
-        client = MilvusClient(settings.VECTOR_DB_FILE)
+        self.client = MilvusClient(settings.VECTOR_DB_FILE)
+        self.batch_size = kwargs["batch_size"]
+        state, _ = VectorSyncState.objects.get_or_create(
+            collection_name=CHILD_COLLECTION_NAME
+        )
+
+        self.collection_name = state.current_collection
+
+        # Rebuild when asked to, or when the collection predates the current schema
+        if kwargs["full"] or not collection_matches_schema(
+            self.client, self.collection_name, create_child_schema()
+        ):
+            self.rebuild(state)
+        else:
+            self.sync_changes(state, kwargs["full_scan"])
+
+        # Drop versions replaced by earlier rebuilds once their grace period is over
+        retired = drop_retired_collections(
+            self.client, state, settings.VECTOR_COLLECTION_GRACE_SEC
+        )
+        if retired:
+            write_success(self.stdout, self.style, f"Dropped {', '.join(retired)}")
 
-        # Delete exisiting data
-        if client.has_collection(collection_name=CHILD_COLLECTION_NAME):
-            client.drop_collection(collection_name=CHILD_COLLECTION_NAME)
+        self.client.close()
+
+    def rebuild(self, state):
+        """
+        Embed every live child into a new version of the collection and switch
+        searches to it. The active version keeps serving until the switch.
+        """
+        version, self.collection_name = state.next_version()
+        # Drop a version left half-built by a failed run
+        if self.client.has_collection(collection_name=self.collection_name):
+            self.client.drop_collection(collection_name=self.collection_name)
 
         # Create collection
         schema = create_child_schema()
-        client.create_collection(collection_name=CHILD_COLLECTION_NAME, schema=schema)
-
-        # Prepare data
-        children = Child.objects.all()
-        total_count = children.count()
-        batch_size = 10
-        for i in range(0, total_count, batch_size):
-            children_batch = children[i : i + batch_size]
-            profiles = [child.profile_description for child in children_batch]
-            profile_vectors = USEModelService.get_vector_representation(
-                profiles
-            ).tolist()
-            data = [
-                {
-                    "id": child.id,
-                    "name": child.name,
-                    "profile_description": child.profile_description,
-                    "profile_description_vector": profile_vector,
-                }
-                for child, profile_vector in zip(children_batch, profile_vectors)
-            ]
-            # Insert data to DB
-            res = client.insert(collection_name=CHILD_COLLECTION_NAME, data=data)
-            print(res)
+        self.client.create_collection(
+            collection_name=self.collection_name, schema=schema
+        )
+
+        # Read the high-water mark first, so edits made during the sync are
+        # picked up by the next incremental run
+        high_water_mark = self.latest_update()
+
+        # Insert data to DB, inserting each batch while the next one is embedded
+        batches = iterate_keyset(
+            Child.objects.filter(deleted_at__isnull=True),
+            self.child_fields,
+            self.batch_size,
+        )
+        stats = BulkIndexer(self.embed_rows, self.insert_rows).run(batches)
 
         # Create index for vector field
-        base_index_params = client.prepare_index_params()
-        index_params = create_child_index_params(base_index_params)
-        client.create_index(
-            collection_name=CHILD_COLLECTION_NAME, index_params=index_params, sync=True
+        base_index_params = self.client.prepare_index_params()
+        index_params = create_child_index_params(base_index_params, stats.rows)
+        self.client.create_index(
+            collection_name=self.collection_name, index_params=index_params, sync=True
+        )
+
+        # Only switch to the new version once it holds every row
+        try:
+            validate_row_count(self.client, self.collection_name, stats.rows)
+        except VectorIndexError as e:
+            self.client.drop_collection(collection_name=self.collection_name)
+            raise CommandError(str(e))
+
+        state.high_water_mark = high_water_mark
+        state.activate(self.collection_name, version)
+        write_success(
+            self.stdout, self.style, f"Rebuilt {self.collection_name}: {stats}"
+        )
+
+    def sync_changes(self, state, full_scan=False):
+        """
+        Upsert children updated after the high-water mark, re-embedding those
+        whose text hash changed, and delete children that were removed or
+        soft-deleted. Rows whose text is unchanged keep their stored vector.
+        With full_scan, every live child is compared with the vector DB.
+        """
+        self.to_refresh = []
+        high_water_mark = self.latest_update() or state.high_water_mark
+
+        # Children with changed text are embedded as the scan streams them in
+        changes = self.scan_changes(state.high_water_mark, full_scan)
+        stats = BulkIndexer(self.embed_rows, self.upsert_rows).run(
+            rebatch(changes, self.batch_size)
+        )
+        BulkIndexer(self.reuse_stored_vectors, self.upsert_rows).run(
+            rebatch(self.to_refresh, self.batch_size)
+        )
+
+        # Children removed or soft-deleted, found by comparing IDs only
+        live_ids = set(
+            Child.objects.filter(deleted_at__isnull=True).values_list("id", flat=True)
+        )
+        stored_ids = fetch_stored_fields(self.client, self.collection_name, [])
+        to_delete = sorted(set(stored_ids) - live_ids)
+        if to_delete:
+            self.client.delete(collection_name=self.collection_name, ids=to_delete)
+        unchanged_count = len(live_ids) - stats.rows - len(self.to_refresh)
+
+        self.save_state(state, high_water_mark)
+        write_success(
+            self.stdout,
+            self.style,
+            f"Synced {self.collection_name}: {stats.rows} embedded, "
+            f"{len(self.to_refresh)} refreshed, {len(to_delete)} deleted, "
+            f"{unchanged_count} unchanged ({stats})",
+        )
+
+    def scan_changes(self, high_water_mark, full_scan=False):
+        """
+        Scan the live children updated after the high-water mark, or every live
+        child with full_scan or no high-water mark, and yield those whose text
+        must be re-embedded. Other updated children are collected to refresh.
+        """
+        children = Child.objects.filter(deleted_at__isnull=True)
+        if high_water_mark is not None and not full_scan:
+            children = children.filter(updated_at__gt=high_water_mark)
+        for batch in iterate_keyset(children, self.child_fields, self.batch_size):
+            stored_hashes = self.fetch_stored_hashes([child["id"] for child in batch])
+            for child in batch:
+                if stored_hashes.get(child["id"]) != self.content_hash(child):
+                    yield child
+                elif high_water_mark is None or child["updated_at"] > high_water_mark:
+                    self.to_refresh.append(child)
+
+    def fetch_stored_hashes(self, ids):
+        """Return the stored text hash of each of the given children in the vector DB."""
+        stored = self.client.get(
+            collection_name=self.collection_name,
+            ids=ids,
+            output_fields=["content_hash"],
         )
+        return {row["id"]: row["content_hash"] for row in stored}
+
+    def latest_update(self):
+        """Return the latest updated_at of all children, deleted ones included."""
+        return Child.objects.aggregate(latest=Max("updated_at"))["latest"]
+
+    def content_hash(self, child):
+        """Hash of the embedded profile text, stored alongside the vector."""
+        return compute_content_hash(child["profile_description"])
+
+    def build_row(self, child, profile_vector):
+        """Compose a vector DB row for a child."""
+        return {
+            "id": child["id"],
+            "name": child["name"],
+            "profile_description": child["profile_description"],
+            "content_hash": self.content_hash(child),
+            "country": child["country__name"].lower(),
+            "gender": child["gender__name"].lower(),
+            "birth_date": encode_date(child["date_of_birth"]),
+            "birth_month": child["date_of_birth"].month,
+            "birth_day": child["date_of_birth"].day,
+            "profile_description_vector": profile_vector,
+        }
+
+    def embed_rows(self, children_batch):
+        """Embed a batch of children and compose their vector DB rows."""
+        profiles = [child["profile_description"] for child in children_batch]
+        # Rows of the float32 matrix are passed as is; pymilvus packs them
+        profile_vectors = USEModelService.get_vector_representation(
+            profiles, use_cache=False
+        )
+        return [
+            self.build_row(child, profile_vector)
+            for child, profile_vector in zip(children_batch, profile_vectors)
+        ]
+
+    def reuse_stored_vectors(self, children_batch):
+        """Compose rows for children with unchanged text from their stored vectors."""
+        stored = self.client.get(
+            collection_name=self.collection_name,
+            ids=[child["id"] for child in children_batch],
+            output_fields=["profile_description_vector"],
+        )
+        vectors = {row["id"]: row["profile_description_vector"] for row in stored}
+        return [
+            self.build_row(child, vectors[child["id"]])
+            for child in children_batch
+            if child["id"] in vectors
+        ]
+
+    def insert_rows(self, rows):
+        self.client.insert(collection_name=self.collection_name, data=rows)
+
+    def upsert_rows(self, rows):
+        self.client.upsert(collection_name=self.collection_name, data=rows)
 
-        client.close()
+    def save_state(self, state, high_water_mark):
+        """Store the high-water mark reached by this sync."""
+        state.high_water_mark = high_water_mark
+        state.save()
@@ -1,63 +1,232 @@
 from pymilvus import MilvusClient
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from semanticsearch.services import *
+from semanticsearch.models import VectorSyncState
+from semanticsearch.exceptions import VectorIndexError
 
 from faqs.models import *
 from semanticsearch.schemas import *
 from semanticsearch.constants import *
+from semanticsearch.indexing import *
+from semanticsearch.utils import *
 from core.constants import *
+from core.utils import *
 
 
 class Command(BaseCommand):
     # python manage.py sync_faq_vectors --help
-    help = "Sync FAQ entries from the relational DB to the vector DB.\n\n"
+    help = (
+        "Sync FAQ entries from the relational DB to the vector DB.\n\n"
+        "By default only the questions and answers whose text changed are "
+        "re-embedded. Use --full to re-embed everything into a new version of the "
+        "collection, which searches switch to once it is complete.\n\n"
+    )
+
+    faq_fields = ["id", "question", "answer", "deleted_at"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the whole collection instead of syncing changes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=VECTOR_SYNC_BATCH_SIZE,
+            help="Number of FAQ entries read and embedded per batch.",
+        )
 
     def handle(self, *args, **kwargs):
         # Init client
         client = MilvusClient(settings.VECTOR_DB_FILE)
+        self.client = client
+        self.batch_size = kwargs["batch_size"]
+        self.computed_count = 0
+        self.skipped_count = 0
+        state, _ = VectorSyncState.objects.get_or_create(
+            collection_name=FAQ_COLLECTION_NAME
+        )
+        self.collection_name = state.current_collection
+
+        # Rebuild when asked to, or when the collection predates the current schema
+        if kwargs["full"] or not collection_matches_schema(
+            client, self.collection_name, create_faq_schema()
+        ):
+            self.rebuild(client, state)
+        else:
+            self.sync_changes(client)
+
+        # Drop versions replaced by earlier rebuilds once their grace period is over
+        retired = drop_retired_collections(
+            client, state, settings.VECTOR_COLLECTION_GRACE_SEC
+        )
+        if retired:
+            write_success(self.stdout, self.style, f"Dropped {', '.join(retired)}")
+
+        write_success(
+            self.stdout,
+            self.style,
+            f"Embeddings computed: {self.computed_count}, "
+            f"skipped: {self.skipped_count}",
+        )
+        client.close()
 
-        # Delete exisiting data
-        if client.has_collection(collection_name=FAQ_COLLECTION_NAME):
-            client.drop_collection(collection_name=FAQ_COLLECTION_NAME)
+    def rebuild(self, client, state):
+        """
+        Embed every live FAQ entry into a new version of the collection and switch
+        searches to it. The active version keeps serving until the switch.
+        """
+        version, self.collection_name = state.next_version()
+        # Drop a version left half-built by a failed run
+        if client.has_collection(collection_name=self.collection_name):
+            client.drop_collection(collection_name=self.collection_name)
 
         schema = create_faq_schema()
-        client.create_collection(collection_name=FAQ_COLLECTION_NAME, schema=schema)
-
-        # Prepare data
-        faqs = FAQEntry.objects.all()
-        total_count = faqs.count()
-        batch_size = 10
-        for i in range(0, total_count, batch_size):
-            faqs_batch = faqs[i : i + batch_size]
-            questions = [entry.question for entry in faqs_batch]
-            answers = [entry.answer for entry in faqs_batch]
-            question_vectors = USEModelService.get_vector_representation(
-                questions
-            ).tolist()
-            answer_vectors = USEModelService.get_vector_representation(answers).tolist()
-            data = [
-                {
-                    "id": faq.id,
-                    "question": faq.question,
-                    "answer": faq.answer,
-                    "question_vector": questioin_vector,
-                    "answer_vector": answer_vector,
-                }
-                for faq, questioin_vector, answer_vector in zip(
-                    faqs_batch, question_vectors, answer_vectors
-                )
-            ]
-            # Insert data to DB
-            res = client.insert(collection_name=FAQ_COLLECTION_NAME, data=data)
-            print(res)
+        client.create_collection(collection_name=self.collection_name, schema=schema)
+
+        # Insert data to DB, inserting each batch while the next one is embedded
+        batches = iterate_keyset(
+            FAQEntry.objects.filter(deleted_at__isnull=True),
+            self.faq_fields,
+            self.batch_size,
+        )
+        changes = ([(faq, True, True) for faq in batch] for batch in batches)
+        stats = BulkIndexer(self.prepare_rows, self.insert_rows).run(changes)
 
         # Create index
         base_index_params = client.prepare_index_params()
-        index_params = create_faq_index_params(base_index_params)
+        index_params = create_faq_index_params(base_index_params, stats.rows)
         client.create_index(
-            collection_name=FAQ_COLLECTION_NAME, index_params=index_params, sync=True
+            collection_name=self.collection_name, index_params=index_params, sync=True
         )
 
-        client.close()
+        # Only switch to the new version once it holds every row
+        try:
+            validate_row_count(client, self.collection_name, stats.rows)
+        except VectorIndexError as e:
+            client.drop_collection(collection_name=self.collection_name)
+            raise CommandError(str(e))
+
+        state.activate(self.collection_name, version)
+        write_success(
+            self.stdout, self.style, f"Rebuilt {self.collection_name}: {stats}"
+        )
+
+    def sync_changes(self, client):
+        """
+        Upsert FAQ entries whose question or answer changed, re-embedding only the
+        changed side, and delete entries that were removed or soft-deleted.
+        """
+        stored = fetch_stored_fields(
+            client, self.collection_name, ["question_hash", "answer_hash"]
+        )
+        self.to_delete = []
+        self.seen_ids = set()
+
+        # Entries with changed text are embedded as the scan streams them in
+        changes = self.scan_changes(stored)
+        stats = BulkIndexer(self.prepare_rows, self.upsert_rows).run(
+            rebatch(changes, self.batch_size)
+        )
+
+        # FAQ entries that no longer exist in the relational DB
+        self.to_delete += [id for id in stored if id not in self.seen_ids]
+        if self.to_delete:
+            client.delete(collection_name=self.collection_name, ids=self.to_delete)
+
+        write_success(
+            self.stdout,
+            self.style,
+            f"Synced {self.collection_name}: {stats.rows} upserted, "
+            f"{len(self.to_delete)} deleted ({stats})",
+        )
+
+    def scan_changes(self, stored):
+        """
+        Scan every FAQ entry and yield (faq, question_changed, answer_changed)
+        for those with changed text. Entries to delete are collected along the way.
+        """
+        faqs = iterate_keyset(FAQEntry.objects.all(), self.faq_fields, self.batch_size)
+        for batch in faqs:
+            for faq in batch:
+                self.seen_ids.add(faq["id"])
+                row = stored.get(faq["id"])
+                if faq["deleted_at"] is not None:
+                    if row is not None:
+                        self.to_delete.append(faq["id"])
+                    continue
+                question_hash = compute_content_hash(faq["question"])
+                answer_hash = compute_content_hash(faq["answer"])
+                question_changed = row is None or row["question_hash"] != question_hash
+                answer_changed = row is None or row["answer_hash"] != answer_hash
+                if question_changed or answer_changed:
+                    yield faq, question_changed, answer_changed
+                else:
+                    self.skipped_count += 2
+
+    def prepare_rows(self, changes):
+        """
+        Embed the changed sides of a batch of FAQ entries and compose their
+        vector DB rows. Vectors of unchanged sides are reused.
+        """
+        questions = [faq["question"] for faq, q_changed, _ in changes if q_changed]
+        answers = [faq["answer"] for faq, _, a_changed in changes if a_changed]
+        question_vectors = iter(self.embed(questions))
+        answer_vectors = iter(self.embed(answers))
+        stored_vectors = self.fetch_stored_vectors(self.client, changes)
+
+        data = []
+        for faq, question_changed, answer_changed in changes:
+            stored_row = stored_vectors.get(faq["id"], {})
+            data.append(
+                {
+                    "id": faq["id"],
+                    "question": faq["question"],
+                    "answer": faq["answer"],
+                    "question_hash": compute_content_hash(faq["question"]),
+                    "answer_hash": compute_content_hash(faq["answer"]),
+                    "question_vector": (
+                        next(question_vectors)
+                        if question_changed
+                        else stored_row["question_vector"]
+                    ),
+                    "answer_vector": (
+                        next(answer_vectors)
+                        if answer_changed
+                        else stored_row["answer_vector"]
+                    ),
+                }
+            )
+        return data
+
+    def insert_rows(self, rows):
+        self.client.insert(collection_name=self.collection_name, data=rows)
+
+    def upsert_rows(self, rows):
+        self.client.upsert(collection_name=self.collection_name, data=rows)
+
+    def embed(self, texts):
+        """Embed texts, counting the computed embeddings."""
+        if not texts:
+            return []
+        self.computed_count += len(texts)
+        # Rows of the float32 matrix are passed as is; pymilvus packs them
+        return USEModelService.get_vector_representation(texts, use_cache=False)
+
+    def fetch_stored_vectors(self, client, changes):
+        """Fetch the stored vectors of entries where only one side changed."""
+        ids = [
+            faq["id"] for faq, q_changed, a_changed in changes if q_changed != a_changed
+        ]
+        if not ids:
+            return {}
+        self.skipped_count += len(ids)
+        rows = client.get(
+            collection_name=self.collection_name,
+            ids=ids,
+            output_fields=["question_vector", "answer_vector"],
+        )
+        return {row["id"]: row for row in rows}
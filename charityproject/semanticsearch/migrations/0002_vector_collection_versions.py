@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("semanticsearch", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vectorsyncstate",
+            name="activated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vectorsyncstate",
+            name="active_collection",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="vectorsyncstate",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
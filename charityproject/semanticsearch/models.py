@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+from semanticsearch.constants import VERSIONED_COLLECTION_FORMAT
+
+
+class VectorSyncState(models.Model):
+    """
+    Model for storing the synchronization state of a vector DB collection.
+    Searches read the physical collection that collection_name points to from
+    active_collection, so a rebuild can fill a new version before switching.
+    """
+
+    collection_name = models.CharField(max_length=255, unique=True)
+    # Latest updated_at of the source rows included in the last sync
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+    # Physical collection currently served, e.g. faq_vectors_v3
+    active_collection = models.CharField(max_length=255, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.collection_name} (synced up to {self.high_water_mark})"
+
+    @property
+    def current_collection(self) -> str:
+        """Physical collection to sync into, or the unversioned legacy one."""
+        return self.active_collection or self.collection_name
+
+    def next_version(self) -> tuple:
+        """Return the version number and the physical name of the next rebuild."""
+        version = self.version + 1
+        return version, VERSIONED_COLLECTION_FORMAT.format(
+            name=self.collection_name, version=version
+        )
+
+    def activate(self, active_collection: str, version: int) -> None:
+        """Point the collection at a newly built version."""
+        self.active_collection = active_collection
+        self.version = version
+        self.activated_at = timezone.now()
+        self.save()
@@ -0,0 +1,127 @@
+import queue, threading, time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+
+class EmbeddingBatchScheduler:
+    """
+    Coalesces concurrent embedding requests into a single model invocation.
+
+    Callers submit a list of texts and receive a Future. A worker thread gathers
+    pending requests until either max_batch_size texts are collected or
+    max_wait_ms has elapsed since the first one arrived, runs the encoder once,
+    and hands each caller back its own rows.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._carry = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._batch_count = 0
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for encoding and return a Future resolving to their vectors."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts: List[str], timeout: float = None) -> np.ndarray:
+        """Encode texts through the scheduler and wait for the result."""
+        return self.submit(texts).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batch-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        """Worker loop: collect a batch, encode it, repeat."""
+        while True:
+            self._process(self._collect_batch())
+
+    def _collect_batch(self) -> list:
+        """
+        Block for the first request, then gather more until the batch is full
+        or the wait window closes. A request that would overflow the batch is
+        carried over to the next one.
+        """
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = self._queue.get()
+        batch = [first]
+        batch_size = len(first[0])
+        deadline = time.monotonic() + self.max_wait_sec
+        while batch_size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if batch_size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            batch.append(item)
+            batch_size += len(item[0])
+        return batch
+
+    def _process(self, batch: list) -> None:
+        """Run the encoder once for the whole batch and resolve each Future."""
+        # Skip requests whose callers have already given up
+        batch = [(texts, f) for texts, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for item_texts, _ in batch for text in item_texts]
+        self._record_batch(len(texts))
+        try:
+            vectors = self.encode_fn(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        offset = 0
+        for item_texts, future in batch:
+            future.set_result(vectors[offset : offset + len(item_texts)])
+            offset += len(item_texts)
+
+    def _record_batch(self, size: int) -> None:
+        """Count the batch in a power-of-two bucketed histogram."""
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self._lock:
+            self._batch_sizes[bucket] += 1
+            self._batch_count += 1
+
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting to be batched."""
+        return self._queue.qsize() + (1 if self._carry is not None else 0)
+
+    def stats(self) -> dict:
+        """Return the queue depth and the batch-size histogram."""
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth(),
+                "batches": self._batch_count,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
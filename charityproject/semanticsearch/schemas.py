@@ -1,4 +1,8 @@
+import math
+
 from pymilvus import FieldSchema, CollectionSchema, DataType
+
+from django.conf import settings
 from semanticsearch.constants import *
 from core.constants import *
 
@@ -29,6 +33,18 @@ def create_faq_schema():
             max_length=MAX_ANSWER_LEN,
             description="Answer text",
         ),
+        FieldSchema(
+            name="question_hash",
+            dtype=DataType.VARCHAR,
+            max_length=CONTENT_HASH_LEN,
+            description="Hash of the embedded question, used for incremental sync",
+        ),
+        FieldSchema(
+            name="answer_hash",
+            dtype=DataType.VARCHAR,
+            max_length=CONTENT_HASH_LEN,
+            description="Hash of the embedded answer, used for incremental sync",
+        ),
         FieldSchema(
             name="question_vector",
             dtype=DataType.FLOAT_VECTOR,
@@ -48,14 +64,48 @@ def create_faq_schema():
     )
 
 
-def create_faq_index_params(index_params):
+def create_index_config(collection_name, row_count):
+    """
+    Return the index type and build parameters for a collection holding
+    row_count rows, as configured in settings.VECTOR_INDEX_CONFIG.
+    With index type AUTO, small collections get an exact FLAT index and larger
+    ones an IVF_FLAT index whose nlist grows with the square root of the size.
+    """
+    config = settings.VECTOR_INDEX_CONFIG.get(collection_name, {})
+    index_type = config.get("index_type", VECTOR_INDEX_AUTO).upper()
+    if index_type == VECTOR_INDEX_AUTO:
+        index_type = "FLAT" if row_count <= FLAT_INDEX_MAX_ROWS else "IVF_FLAT"
+
+    build_params = dict(DEFAULT_INDEX_BUILD_PARAMS.get(index_type, {}))
+    if index_type == "IVF_FLAT" and row_count:
+        min_nlist, max_nlist = IVF_NLIST_RANGE
+        nlist = int(4 * math.sqrt(row_count))
+        build_params["nlist"] = min(max(nlist, min_nlist), max_nlist)
+    build_params.update(config.get("build_params", {}))
+    return index_type, build_params
+
+
+def create_search_params(collection_name, index_type):
+    """
+    Return the search parameters for a collection indexed with index_type,
+    as configured in settings.VECTOR_INDEX_CONFIG.
+    """
+    config = settings.VECTOR_INDEX_CONFIG.get(collection_name, {})
+    params = dict(DEFAULT_INDEX_SEARCH_PARAMS.get(index_type, {}))
+    params.update(config.get("search_params", {}))
+    return {"metric_type": VECTOR_METRIC_TYPE, "params": params}
+
+
+def create_faq_index_params(index_params, row_count=0):
     """Create index parameters for the FAQ collection."""
     # https://milvus.io/api-reference/pymilvus/v2.4.x/MilvusClient/Management/create_index.md
+    index_type, build_params = create_index_config(FAQ_COLLECTION_NAME, row_count)
     for field_name in ["question_vector", "answer_vector"]:
         index_params.add_index(
             field_name=field_name,
-            index_type="FLAT",
-            metric_type="IP",
+            index_type=index_type,
+            metric_type=VECTOR_METRIC_TYPE,
+            params=build_params,
         )
     return index_params
 
@@ -85,6 +135,39 @@ def create_child_schema():
             max_length=MAX_CHILD_PROFILE_LEN,
             description="Child profile description",
         ),
+        FieldSchema(
+            name="content_hash",
+            dtype=DataType.VARCHAR,
+            max_length=CONTENT_HASH_LEN,
+            description="Hash of the embedded text, used for incremental sync",
+        ),
+        FieldSchema(
+            name="country",
+            dtype=DataType.VARCHAR,
+            max_length=MAX_COUNTRY_NAME_LEN,
+            description="Lowercased country name, used in search filters",
+        ),
+        FieldSchema(
+            name="gender",
+            dtype=DataType.VARCHAR,
+            max_length=MAX_GENDER_NAME_LEN,
+            description="Lowercased gender name, used in search filters",
+        ),
+        FieldSchema(
+            name="birth_date",
+            dtype=DataType.INT32,
+            description="Date of birth as YYYYMMDD, used in age search filters",
+        ),
+        FieldSchema(
+            name="birth_month",
+            dtype=DataType.INT8,
+            description="Month of the date of birth, used in search filters",
+        ),
+        FieldSchema(
+            name="birth_day",
+            dtype=DataType.INT8,
+            description="Day of the date of birth, used in search filters",
+        ),
         FieldSchema(
             name="profile_description_vector",
             dtype=DataType.FLOAT_VECTOR,
@@ -98,11 +181,16 @@ def create_child_schema():
     )
 
 
-def create_child_index_params(index_params):
+def create_child_index_params(index_params, row_count=0):
     """Create index parameters for the child collection."""
+    index_type, build_params = create_index_config(CHILD_COLLECTION_NAME, row_count)
     index_params.add_index(
         field_name="profile_description_vector",
-        index_type="FLAT",
-        metric_type="IP",
+        index_type=index_type,
+        metric_type=VECTOR_METRIC_TYPE,
+        params=build_params,
     )
+    # Scalar indexes so filtered searches do not scan every row
+    for field_name in CHILD_FILTER_FIELDS:
+        index_params.add_index(field_name=field_name, index_type=SCALAR_INDEX_TYPE)
     return index_params
@@ -1,17 +1,209 @@
-import os
-from typing import List
+import os, asyncio, functools, hashlib, logging, threading, time, unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 import numpy as np
+import redis
 import tensorflow_hub as hub
 import tensorflow, tensorflow_text  # For loading the USE model
 from pymilvus import MilvusClient, AnnSearchRequest, WeightedRanker
 
 from django.conf import settings
+from django.db import DatabaseError
 from semanticsearch.constants import *
+from semanticsearch.schemas import create_search_params
+from semanticsearch.schedulers import EmbeddingBatchScheduler
+from semanticsearch.embedding_server import EmbeddingServerClient
+from core.constants import PROJECT_LOGGER_NAME
+
+logger = logging.getLogger(PROJECT_LOGGER_NAME)
+
+
+class EmbeddingCacheService:
+    """
+    Two-tier cache for sentence embeddings.
+
+    The first tier is a bounded in-process LRU. The second tier is an optional
+    Redis instance shared by all processes (EMBEDDING_CACHE_REDIS_URL).
+    Keys combine the normalized text with a fingerprint of the model version,
+    so a model upgrade never serves stale vectors once EMBEDDING_MODEL_VERSION
+    is bumped. Values are float32 vectors.
+    """
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+    _redis = None
+    _stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def init_redis(cls):
+        """Initialize the Redis client for the shared tier, if configured."""
+        if cls._redis is None and settings.EMBEDDING_CACHE_REDIS_URL:
+            try:
+                cls._redis = redis.Redis.from_url(settings.EMBEDDING_CACHE_REDIS_URL)
+                print("Embedding cache Redis client initialized.")
+            except Exception as e:
+                print(f"Failed to initialize embedding cache Redis client: {e}")
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Normalize unicode, whitespace and case so trivial variants share a key."""
+        return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+    @staticmethod
+    def model_fingerprint() -> str:
+        """
+        Return a short fingerprint identifying the embedding model.
+        Derived from EMBEDDING_MODEL_VERSION, which every process shares with
+        the embedding server, rather than from local model files.
+        """
+        parts = [settings.EMBEDDING_MODEL_VERSION, str(NUM_DIM)]
+        return hashlib.sha256(":".join(parts).encode()).hexdigest()[:16]
+
+    @classmethod
+    def make_key(cls, text: str) -> str:
+        """Build the cache key for a text."""
+        text_hash = hashlib.sha256(cls.normalize_text(text).encode()).hexdigest()
+        return f"{EMBEDDING_CACHE_KEY_PREFIX}:{cls.model_fingerprint()}:{text_hash}"
+
+    @classmethod
+    def get_many(cls, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the vectors for the given texts.
+        Returns a list aligned with texts, with None for cache misses.
+        """
+        keys = [cls.make_key(text) for text in texts]
+        vectors = [None] * len(keys)
+        local_missing = []
+        with cls._lock:
+            for i, key in enumerate(keys):
+                vector = cls._entries.get(key)
+                if vector is None:
+                    local_missing.append(i)
+                else:
+                    cls._entries.move_to_end(key)
+                    vectors[i] = vector
+                    cls._stats["hits"] += 1
+
+        # Fall back to the shared tier for local misses
+        shared = cls.get_shared([keys[i] for i in local_missing])
+        with cls._lock:
+            for i, vector in zip(local_missing, shared):
+                if vector is None:
+                    cls._stats["misses"] += 1
+                else:
+                    vectors[i] = vector
+                    cls._stats["shared_hits"] += 1
+                    cls._put_local(keys[i], vector)
+        return vectors
+
+    @classmethod
+    def set_many(cls, texts: List[str], vectors: np.ndarray) -> None:
+        """Store the vectors for the given texts in both tiers."""
+        items = {
+            cls.make_key(text): np.asarray(vector, dtype=EMBEDDING_DTYPE)
+            for text, vector in zip(texts, vectors)
+        }
+        with cls._lock:
+            for key, vector in items.items():
+                cls._put_local(key, vector)
+        cls.set_shared(items)
+
+    @classmethod
+    def _put_local(cls, key: str, vector: np.ndarray) -> None:
+        """Insert into the LRU tier, evicting the oldest entries. Caller holds the lock."""
+        cls._entries[key] = vector
+        cls._entries.move_to_end(key)
+        while len(cls._entries) > settings.EMBEDDING_CACHE_MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+            cls._stats["evictions"] += 1
+
+    @classmethod
+    def get_shared(cls, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Fetch vectors from the shared Redis tier. Errors are treated as misses."""
+        if not keys:
+            return []
+        cls.init_redis()
+        if cls._redis is None:
+            return [None] * len(keys)
+        try:
+            raw_values = cls._redis.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return [None] * len(keys)
+        return [
+            np.frombuffer(raw, dtype=EMBEDDING_DTYPE) if raw is not None else None
+            for raw in raw_values
+        ]
+
+    @classmethod
+    def set_shared(cls, items: dict) -> None:
+        """Write vectors to the shared Redis tier in a single pipeline."""
+        cls.init_redis()
+        if cls._redis is None or not items:
+            return
+        try:
+            pipe = cls._redis.pipeline(transaction=False)
+            for key, vector in items.items():
+                pipe.set(key, vector.tobytes(), ex=settings.EMBEDDING_CACHE_TTL_SEC)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Return hit/miss/eviction counters and the current LRU size."""
+        with cls._lock:
+            return {**cls._stats, "size": len(cls._entries)}
+
+    @classmethod
+    def clear(cls) -> None:
+        """Empty the in-process tier and reset the counters."""
+        with cls._lock:
+            cls._entries.clear()
+            for name in cls._stats:
+                cls._stats[name] = 0
+
+
+class SearchExecutorService:
+    """
+    Dedicated bounded thread pool for blocking embedding and vector search calls,
+    so they never run on the event loop or compete with the default executor.
+    """
+
+    _executor = None
+
+    @classmethod
+    def init_executor(cls):
+        """Initialize the thread pool."""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.SEMANTIC_SEARCH_MAX_WORKERS,
+                thread_name_prefix="semantic-search",
+            )
+
+    @classmethod
+    async def run(cls, func, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Run a blocking function on the pool and await its result.
+        Raises TimeoutError after timeout seconds (SEMANTIC_SEARCH_TIMEOUT_SEC by
+        default). On timeout or cancellation, a call that has not started yet is
+        dropped from the pool queue.
+        """
+        cls.init_executor()
+        if timeout is None:
+            timeout = settings.SEMANTIC_SEARCH_TIMEOUT_SEC
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            cls._executor, functools.partial(func, *args, **kwargs)
+        )
+        return await asyncio.wait_for(future, timeout)
 
 
 class USEModelService:
     _model = None
+    _scheduler = None
 
     @classmethod
     def load_model(cls):
@@ -28,18 +220,94 @@ class USEModelService:
                 print(f"USE model directory not found: {settings.USE_MODEL_DIR}")
 
     @classmethod
-    def get_vector_representation(cls, query_list: List[str]) -> np.ndarray:
+    def get_vector_representation(
+        cls, query_list: List[str], use_cache: bool = True
+    ) -> np.ndarray:
         """
         Get the vector representation of a list of query strings using the USE model.
+        Cached vectors are reused and only the cache misses are sent to the model.
+        Bulk indexing should pass use_cache=False so it does not flush hot queries.
+        """
+        if not use_cache or not query_list:
+            return cls.encode(query_list)
+
+        vectors = EmbeddingCacheService.get_many(query_list)
+        missing = list(
+            dict.fromkeys(q for q, vec in zip(query_list, vectors) if vec is None)
+        )
+        if missing:
+            computed = cls.encode(missing)
+            EmbeddingCacheService.set_many(missing, computed)
+            computed_map = dict(zip(missing, computed))
+            vectors = [
+                vec if vec is not None else computed_map[q]
+                for q, vec in zip(query_list, vectors)
+            ]
+        return np.stack(vectors)
+
+    @classmethod
+    async def aget_vector_representation(
+        cls, query_list: List[str], timeout: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Awaitable get_vector_representation that runs on the search executor.
+        """
+        return await SearchExecutorService.run(
+            cls.get_vector_representation, query_list, timeout=timeout
+        )
+
+    @classmethod
+    def encode(cls, query_list: List[str]) -> np.ndarray:
+        """
+        Encode the query strings with the configured backend: the model loaded
+        in this process, or the shared embedding server.
+        """
+        if settings.EMBEDDING_BACKEND == EMBEDDING_BACKEND_SERVER:
+            return EmbeddingServerClient.encode(query_list)
+        return cls.encode_local(query_list)
+
+    @classmethod
+    def encode_local(cls, query_list: List[str]) -> np.ndarray:
+        """
+        Encode the query strings in this process, coalescing small concurrent
+        requests into shared model invocations. Batches that are already large
+        go straight to the model.
+        """
+        if (
+            settings.EMBEDDING_BATCHING_ENABLED
+            and 0 < len(query_list) < settings.EMBEDDING_BATCH_MAX_SIZE
+        ):
+            return cls.get_scheduler().encode(query_list)
+        return cls.run_model(query_list)
+
+    @classmethod
+    def get_scheduler(cls) -> EmbeddingBatchScheduler:
+        """Return the process-wide embedding batch scheduler."""
+        if cls._scheduler is None:
+            cls._scheduler = EmbeddingBatchScheduler(
+                cls.run_model,
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            )
+        return cls._scheduler
+
+    @classmethod
+    def run_model(cls, query_list: List[str]) -> np.ndarray:
+        """
+        Run the USE model on the query strings and return float32 vectors.
         """
         if cls._model is None:
             cls.load_model()
 
-        return cls._model(query_list).numpy()
+        return cls._model(query_list).numpy().astype(EMBEDDING_DTYPE, copy=False)
 
 
 class MilvusClientService:
     _client = None
+    # Collection name -> (active physical collection, monotonic time it was read)
+    _active_collections = {}
+    # (physical collection, vector field) -> search params matching its index
+    _search_params = {}
 
     @classmethod
     def init_client(cls):
@@ -50,26 +318,73 @@ class MilvusClientService:
             except Exception as e:
                 print(f"Failed to initialize Milvus client: {e}")
 
+    @classmethod
+    def resolve_collection(cls, collection_name: str) -> str:
+        """
+        Return the physical collection that collection_name currently points to.
+        The pointer is written by the sync commands when a rebuilt version goes
+        live, and is cached for VECTOR_COLLECTION_CACHE_SEC.
+        """
+        # Imported here because this module is loaded before the app registry
+        from semanticsearch.models import VectorSyncState
+
+        cached = cls._active_collections.get(collection_name)
+        if (
+            cached is not None
+            and time.monotonic() - cached[1] < settings.VECTOR_COLLECTION_CACHE_SEC
+        ):
+            return cached[0]
+
+        try:
+            state = VectorSyncState.objects.filter(
+                collection_name=collection_name
+            ).first()
+        except DatabaseError as e:
+            # Keep serving the last known version if the pointer cannot be read
+            logger.warning(f"Failed to resolve collection {collection_name}: {e}")
+            return cached[0] if cached is not None else collection_name
+
+        active_collection = state.current_collection if state else collection_name
+        cls._active_collections[collection_name] = (active_collection, time.monotonic())
+        return active_collection
+
+    @classmethod
+    def get_search_params(
+        cls, collection_name: str, physical_collection: str, field_name: str
+    ) -> dict:
+        """
+        Return the search params for a vector field, matching the index type the
+        physical collection was built with. Built versions never change their
+        index, so the result is cached per physical collection.
+        """
+        key = (physical_collection, field_name)
+        if key not in cls._search_params:
+            index = cls._client.describe_index(
+                collection_name=physical_collection, index_name=field_name
+            )
+            cls._search_params[key] = create_search_params(
+                collection_name, index["index_type"]
+            )
+        return cls._search_params[key]
+
     @classmethod
     def search_faq_hybrid(cls, query_vectors: np.ndarray, top_k: int = 3):
         if cls._client is None:
             cls.init_client()
 
+        collection_name = cls.resolve_collection(FAQ_COLLECTION_NAME)
         return cls._client.hybrid_search(
-            collection_name=FAQ_COLLECTION_NAME,
+            collection_name=collection_name,
             reqs=[
                 AnnSearchRequest(
                     data=query_vectors,
-                    anns_field="question_vector",
-                    param={"metric_type": "IP", "params": {"nprobe": 10}},
+                    anns_field=field_name,
+                    param=cls.get_search_params(
+                        FAQ_COLLECTION_NAME, collection_name, field_name
+                    ),
                     limit=top_k,
-                ),
-                AnnSearchRequest(
-                    data=query_vectors,
-                    anns_field="answer_vector",
-                    param={"metric_type": "IP", "params": {"nprobe": 10}},
-                    limit=top_k,
-                ),
+                )
+                for field_name in ["question_vector", "answer_vector"]
             ],
             ranker=WeightedRanker(0.7, 0.3),
             output_fields=["question", "answer"],
@@ -77,15 +392,47 @@ class MilvusClientService:
         )
 
     @classmethod
-    def search_child_profiles(cls, query_vectors: np.ndarray, top_k: int = 5):
+    def search_child_profiles(
+        cls, query_vectors: np.ndarray, top_k: int = 5, filter: str = ""
+    ):
+        """
+        Return the top_k children closest to the query vectors among those
+        matching the filter expression on the scalar fields.
+        """
         if cls._client is None:
             cls.init_client()
 
+        collection_name = cls.resolve_collection(CHILD_COLLECTION_NAME)
         return cls._client.search(
-            collection_name=CHILD_COLLECTION_NAME,
+            collection_name=collection_name,
             data=query_vectors,
             anns_field="profile_description_vector",
-            search_params={"metric_type": "IP"},
+            search_params=cls.get_search_params(
+                CHILD_COLLECTION_NAME, collection_name, "profile_description_vector"
+            ),
+            filter=filter,
             output_fields=["id", "name", "profile_description"],
             limit=top_k,
         )
+
+    @classmethod
+    async def asearch_faq_hybrid(
+        cls, query_vectors: np.ndarray, top_k: int = 3, timeout: Optional[float] = None
+    ):
+        """Awaitable search_faq_hybrid that runs on the search executor."""
+        return await SearchExecutorService.run(
+            cls.search_faq_hybrid, query_vectors, top_k, timeout=timeout
+        )
+
+    @classmethod
+    async def asearch_child_profiles(
+        cls,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        filter: str = "",
+        timeout: Optional[float] = None,
+    ):
+        """Awaitable search_child_profiles that runs on the search executor."""
+        return await SearchExecutorService.run(
+            cls.search_child_profiles, query_vectors, top_k, filter, timeout=timeout
+        )
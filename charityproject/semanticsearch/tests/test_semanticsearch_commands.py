@@ -0,0 +1,274 @@
+import numpy as np
+import pytest
+from io import StringIO
+from model_bakery import baker
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from semanticsearch.constants import *
+from semanticsearch.models import VectorSyncState
+from semanticsearch.exceptions import VectorIndexError
+from sponsors.models import *
+from faqs.models import *
+
+
+def fake_vectors(texts, use_cache=True):
+    """Return one deterministic vector per text."""
+    return np.array([[len(text) / 100] * NUM_DIM for text in texts])
+
+
+@pytest.fixture
+def mock_embedding():
+    with patch(
+        "semanticsearch.services.USEModelService.get_vector_representation",
+        side_effect=fake_vectors,
+    ) as mock_get_vectors:
+        yield mock_get_vectors
+
+
+@pytest.fixture
+def test_vector_db(milvus_client):
+    """Point the sync commands at the test vector DB and clean up afterwards."""
+    with patch.object(settings, "VECTOR_DB_FILE", settings.VECTOR_DB_FILE_TEST):
+        yield milvus_client
+    # Drop every version the commands created
+    for collection_name in milvus_client.list_collections():
+        if collection_name.startswith((CHILD_COLLECTION_NAME, FAQ_COLLECTION_NAME)):
+            milvus_client.drop_collection(collection_name=collection_name)
+
+
+def embedded_texts(mock_get_vectors):
+    """Return all texts sent to the embedding model."""
+    return [text for call in mock_get_vectors.call_args_list for text in call.args[0]]
+
+
+def active_collection(collection_name):
+    """Return the physical collection searches are pointed at."""
+    return VectorSyncState.objects.get(
+        collection_name=collection_name
+    ).current_collection
+
+
+@pytest.mark.django_db
+class TestSyncChildVectors:
+    """Test suite for the sync_child_vectors command."""
+
+    def stored_rows(self, client):
+        collection_name = active_collection(CHILD_COLLECTION_NAME)
+        client.load_collection(collection_name=collection_name)
+        rows = client.query(
+            collection_name=collection_name,
+            filter="id >= 0",
+            output_fields=["id", "name", "profile_description"],
+        )
+        return {row["id"]: row for row in rows}
+
+    def test_first_run_builds_collection(self, test_vector_db, mock_embedding):
+        """Test that the first run embeds every live child and records the high-water mark."""
+        children = baker.make(Child, _quantity=3)
+        baker.make(Child, deleted_at=timezone.now())
+
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        assert set(self.stored_rows(test_vector_db)) == {c.id for c in children}
+        state = VectorSyncState.objects.get(collection_name=CHILD_COLLECTION_NAME)
+        assert state.high_water_mark is not None
+        assert state.active_collection == f"{CHILD_COLLECTION_NAME}_v1"
+
+    def test_incremental_run_only_embeds_changed_children(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that an incremental run embeds new and edited profiles only."""
+        unchanged, renamed, edited = baker.make(Child, _quantity=3)
+        call_command("sync_child_vectors", stdout=StringIO())
+        mock_embedding.reset_mock()
+
+        renamed.name = "Renamed"
+        renamed.save()
+        edited.profile_description = "Now loves chess"
+        edited.save()
+        added = baker.make(Child, profile_description="Likes drawing")
+        out = StringIO()
+        call_command("sync_child_vectors", stdout=out)
+
+        assert sorted(embedded_texts(mock_embedding)) == [
+            "Likes drawing",
+            "Now loves chess",
+        ]
+        rows = self.stored_rows(test_vector_db)
+        assert set(rows) == {unchanged.id, renamed.id, edited.id, added.id}
+        assert rows[renamed.id]["name"] == "Renamed"
+        assert rows[edited.id]["profile_description"] == "Now loves chess"
+        assert "2 embedded, 1 refreshed, 0 deleted, 1 unchanged" in out.getvalue()
+
+    def test_incremental_run_removes_deleted_children(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that soft-deleted and removed children are deleted from the collection."""
+        kept, soft_deleted, removed = baker.make(Child, _quantity=3)
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        soft_deleted.deleted_at = timezone.now()
+        soft_deleted.save()
+        removed.delete()
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        assert set(self.stored_rows(test_vector_db)) == {kept.id}
+
+    def test_incremental_run_skips_children_not_updated(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that only children updated after the high-water mark are read, unless --full-scan is given."""
+        child, other = baker.make(Child, _quantity=2)
+        call_command("sync_child_vectors", stdout=StringIO())
+        mock_embedding.reset_mock()
+
+        # update() does not bump updated_at, so the edit is below the high-water mark
+        Child.objects.filter(id=child.id).update(profile_description="Silent edit")
+        out = StringIO()
+        call_command("sync_child_vectors", stdout=out)
+
+        assert embedded_texts(mock_embedding) == []
+        assert "0 embedded, 0 refreshed, 0 deleted, 2 unchanged" in out.getvalue()
+
+        call_command("sync_child_vectors", "--full-scan", stdout=StringIO())
+
+        assert embedded_texts(mock_embedding) == ["Silent edit"]
+        rows = self.stored_rows(test_vector_db)
+        assert rows[child.id]["profile_description"] == "Silent edit"
+
+    def test_stores_filterable_scalar_fields(self, test_vector_db, mock_embedding):
+        """Test that children can be filtered on their scalar fields in the vector DB."""
+        peru = baker.make(Country, name="Peru")
+        female = baker.make(Gender, name="Female")
+        match = baker.make(
+            Child, country=peru, gender=female, age=8, date_of_birth="2017-03-15"
+        )
+        baker.make(Child, country=peru, age=12, date_of_birth="2012-03-15")
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        rows = test_vector_db.query(
+            collection_name=active_collection(CHILD_COLLECTION_NAME),
+            filter='country == "peru" and gender == "female" '
+            "and birth_date > 20140101 and birth_month == 3 and birth_day == 15",
+            output_fields=["id"],
+        )
+
+        assert [row["id"] for row in rows] == [match.id]
+
+    def test_full_flag_re_embeds_everything(self, test_vector_db, mock_embedding):
+        """Test that --full rebuilds the collection from scratch."""
+        baker.make(Child, _quantity=2)
+        call_command("sync_child_vectors", stdout=StringIO())
+        mock_embedding.reset_mock()
+
+        call_command("sync_child_vectors", "--full", stdout=StringIO())
+
+        assert len(embedded_texts(mock_embedding)) == 2
+        assert active_collection(CHILD_COLLECTION_NAME) == f"{CHILD_COLLECTION_NAME}_v2"
+        # The previous version is kept for the grace period
+        assert test_vector_db.has_collection(f"{CHILD_COLLECTION_NAME}_v1")
+
+    def test_retired_versions_are_dropped_after_grace_period(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that versions replaced by a rebuild are dropped once the grace period is over."""
+        baker.make(Child, _quantity=2)
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        with patch.object(settings, "VECTOR_COLLECTION_GRACE_SEC", 0):
+            call_command("sync_child_vectors", "--full", stdout=StringIO())
+
+        assert not test_vector_db.has_collection(f"{CHILD_COLLECTION_NAME}_v1")
+        assert len(self.stored_rows(test_vector_db)) == 2
+
+    def test_failed_validation_keeps_active_version(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that a rebuild failing validation is dropped and searches stay on the active version."""
+        baker.make(Child, _quantity=2)
+        call_command("sync_child_vectors", stdout=StringIO())
+
+        with patch(
+            "semanticsearch.management.commands.sync_child_vectors.validate_row_count",
+            side_effect=VectorIndexError("row count mismatch"),
+        ):
+            with pytest.raises(CommandError, match="row count mismatch"):
+                call_command("sync_child_vectors", "--full", stdout=StringIO())
+
+        assert active_collection(CHILD_COLLECTION_NAME) == f"{CHILD_COLLECTION_NAME}_v1"
+        assert not test_vector_db.has_collection(f"{CHILD_COLLECTION_NAME}_v2")
+        assert len(self.stored_rows(test_vector_db)) == 2
+
+
+@pytest.mark.django_db
+class TestSyncFaqVectors:
+    """Test suite for the sync_faq_vectors command."""
+
+    def stored_rows(self, client):
+        collection_name = active_collection(FAQ_COLLECTION_NAME)
+        client.load_collection(collection_name=collection_name)
+        rows = client.query(
+            collection_name=collection_name,
+            filter="id >= 0",
+            output_fields=["id", "answer", "question_vector", "answer_vector"],
+        )
+        return {row["id"]: row for row in rows}
+
+    def test_first_run_embeds_questions_and_answers(
+        self, test_vector_db, mock_embedding
+    ):
+        """Test that the first run embeds both sides of every live entry."""
+        faqs = baker.make(FAQEntry, _quantity=2)
+        baker.make(FAQEntry, deleted_at=timezone.now())
+        out = StringIO()
+
+        call_command("sync_faq_vectors", stdout=out)
+
+        assert set(self.stored_rows(test_vector_db)) == {faq.id for faq in faqs}
+        assert "Embeddings computed: 4, skipped: 0" in out.getvalue()
+
+    def test_edited_answer_only_re_embeds_answer(self, test_vector_db, mock_embedding):
+        """Test that an answer edit re-embeds the answer and reuses the question vector."""
+        edited, unchanged = baker.make(FAQEntry, _quantity=2)
+        call_command("sync_faq_vectors", stdout=StringIO())
+        question_vector = self.stored_rows(test_vector_db)[edited.id]["question_vector"]
+        mock_embedding.reset_mock()
+
+        edited.answer = "A new, much longer answer text"
+        edited.save()
+        out = StringIO()
+        call_command("sync_faq_vectors", stdout=out)
+
+        assert embedded_texts(mock_embedding) == ["A new, much longer answer text"]
+        row = self.stored_rows(test_vector_db)[edited.id]
+        assert row["answer"] == "A new, much longer answer text"
+        np.testing.assert_allclose(row["question_vector"], question_vector)
+        np.testing.assert_allclose(row["answer_vector"], [0.3] * NUM_DIM)
+        assert "Embeddings computed: 1, skipped: 3" in out.getvalue()
+
+    def test_removes_deleted_entries(self, test_vector_db, mock_embedding):
+        """Test that soft-deleted and removed entries are deleted from the collection."""
+        kept, soft_deleted, removed = baker.make(FAQEntry, _quantity=3)
+        call_command("sync_faq_vectors", stdout=StringIO())
+
+        soft_deleted.deleted_at = timezone.now()
+        soft_deleted.save()
+        removed.delete()
+        call_command("sync_faq_vectors", stdout=StringIO())
+
+        assert set(self.stored_rows(test_vector_db)) == {kept.id}
+
+    def test_full_flag_switches_to_new_version(self, test_vector_db, mock_embedding):
+        """Test that --full builds a new version and points searches at it."""
+        baker.make(FAQEntry, _quantity=2)
+        call_command("sync_faq_vectors", stdout=StringIO())
+
+        call_command("sync_faq_vectors", "--full", stdout=StringIO())
+
+        assert active_collection(FAQ_COLLECTION_NAME) == f"{FAQ_COLLECTION_NAME}_v2"
+        assert len(self.stored_rows(test_vector_db)) == 2
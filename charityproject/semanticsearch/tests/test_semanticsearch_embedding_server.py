@@ -0,0 +1,65 @@
+import threading
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from django.conf import settings
+
+from semanticsearch.constants import *
+from semanticsearch.embedding_server import *
+from semanticsearch.exceptions import EmbeddingServerError
+
+
+def fake_encode(texts):
+    """Encode each text as a row filled with its length."""
+    if "fail" in texts:
+        raise ValueError("cannot encode")
+    return np.array([[len(text)] * NUM_DIM for text in texts])
+
+
+@pytest.fixture
+def embedding_server(tmp_path):
+    """Run an embedding server with a fake encoder on a temporary socket."""
+    socket_path = str(tmp_path / "embedding.sock")
+    server = EmbeddingServer(socket_path, fake_encode)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch.object(settings, "EMBEDDING_SERVER_SOCKET", socket_path):
+        yield server
+    EmbeddingServerClient.close()
+    server.shutdown()
+    server.server_close()
+
+
+class TestEmbeddingServer:
+    """Test suite for the embedding server and its client."""
+
+    def test_client_receives_vectors(self, embedding_server):
+        """Test that the client gets one float32 row per text."""
+        vectors = EmbeddingServerClient.encode(["a", "bbb"])
+
+        assert vectors.shape == (2, NUM_DIM)
+        assert vectors.dtype == np.float32
+        np.testing.assert_array_equal(vectors[:, 0], [1, 3])
+
+    def test_client_reuses_connection(self, embedding_server):
+        """Test that consecutive requests share one persistent connection."""
+        EmbeddingServerClient.encode(["a"])
+        sock = EmbeddingServerClient.connect()
+        EmbeddingServerClient.encode(["b"])
+
+        assert EmbeddingServerClient.connect() is sock
+
+    def test_server_error_is_raised_to_client(self, embedding_server):
+        """Test that an encoder failure is reported without closing the connection."""
+        with pytest.raises(EmbeddingServerError, match="cannot encode"):
+            EmbeddingServerClient.encode(["fail"])
+
+        assert EmbeddingServerClient.encode(["ok"]).shape == (1, NUM_DIM)
+
+    def test_client_raises_when_server_is_down(self, tmp_path):
+        """Test that a missing server raises EmbeddingServerError."""
+        missing_socket = str(tmp_path / "missing.sock")
+        with patch.object(settings, "EMBEDDING_SERVER_SOCKET", missing_socket):
+            with pytest.raises(EmbeddingServerError):
+                EmbeddingServerClient.encode(["a"])
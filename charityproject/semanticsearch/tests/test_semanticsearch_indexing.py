@@ -0,0 +1,89 @@
+import pytest
+import threading
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from semanticsearch.indexing import *
+from sponsors.models import *
+
+
+@pytest.mark.django_db
+class TestIterateKeyset:
+    """Test suite for iterate_keyset."""
+
+    def test_yields_all_rows_in_batches(self):
+        """Test that every row is yielded once, in primary key order."""
+        children = baker.make(Child, _quantity=5)
+
+        batches = list(iterate_keyset(Child.objects.all(), ["id", "name"], 2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [row["id"] for batch in batches for row in batch] == sorted(
+            child.id for child in children
+        )
+
+    def test_uses_keyset_instead_of_offset(self):
+        """Test that batches are fetched with an id predicate, not an OFFSET."""
+        baker.make(Child, _quantity=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            list(iterate_keyset(Child.objects.all(), ["id"], 2))
+
+        assert len(queries) == 3
+        assert all("OFFSET" not in query["sql"] for query in queries)
+
+
+class TestRebatch:
+    """Test suite for rebatch."""
+
+    def test_regroups_stream(self):
+        """Test that a stream of rows is regrouped into fixed-size lists."""
+        assert list(rebatch(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_empty_stream(self):
+        """Test that an empty stream yields no batches."""
+        assert list(rebatch(iter([]), 2)) == []
+
+
+class TestBulkIndexer:
+    """Test suite for BulkIndexer."""
+
+    def test_writes_prepared_rows_in_order(self):
+        """Test that every prepared batch is written once, in order, and counted."""
+        written = []
+        indexer = BulkIndexer(lambda batch: [x * 10 for x in batch], written.append)
+
+        stats = indexer.run([[1, 2], [3], []])
+
+        assert written == [[10, 20], [30]]
+        assert stats.rows == 3
+        assert stats.batches == 2
+        assert "3 rows in" in str(stats)
+
+    def test_write_overlaps_next_prepare(self):
+        """Test that batch N is written while batch N+1 is being prepared."""
+        write_started = threading.Event()
+        overlapped = []
+
+        def prepare(batch):
+            if batch == [2]:
+                # The first write must be running while the second batch is prepared
+                overlapped.append(write_started.wait(timeout=1))
+            return batch
+
+        def write(rows):
+            write_started.set()
+
+        BulkIndexer(prepare, write).run([[1], [2]])
+
+        assert overlapped == [True]
+
+    def test_write_errors_are_raised(self):
+        """Test that a failed write is surfaced to the caller."""
+
+        def write(rows):
+            raise RuntimeError("insert failed")
+
+        with pytest.raises(RuntimeError, match="insert failed"):
+            BulkIndexer(lambda batch: batch, write).run([[1], [2]])
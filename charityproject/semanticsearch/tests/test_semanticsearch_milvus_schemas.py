@@ -1,4 +1,8 @@
+from unittest.mock import patch
+
+from django.conf import settings
 from semanticsearch.constants import *
+from semanticsearch.schemas import *
 
 
 def test_faq_vector_insertion(setup_milvus_faq_collection):
@@ -9,6 +13,8 @@ def test_faq_vector_insertion(setup_milvus_faq_collection):
         "id": 1,
         "question": "Test question?",
         "answer": "Test answer",
+        "question_hash": "0" * CONTENT_HASH_LEN,
+        "answer_hash": "0" * CONTENT_HASH_LEN,
         "question_vector": [0.1] * NUM_DIM,
         "answer_vector": [0.2] * NUM_DIM,
     }
@@ -35,6 +41,12 @@ def test_child_vector_insertion(setup_milvus_child_collection):
         "id": 1,
         "name": "Test child",
         "profile_description": "Test profile description",
+        "content_hash": "0" * CONTENT_HASH_LEN,
+        "country": "peru",
+        "gender": "female",
+        "birth_date": 20170315,
+        "birth_month": 3,
+        "birth_day": 15,
         "profile_description_vector": [0.1] * NUM_DIM,
     }
     # Insert child entry
@@ -50,3 +62,43 @@ def test_child_vector_insertion(setup_milvus_child_collection):
     # Verify child query results
     assert len(query_results) == 1
     assert query_results[0]["name"] == test_data["name"]
+
+
+def test_auto_index_is_flat_for_small_collections():
+    """Test that AUTO picks an exact FLAT index for small collections."""
+    index_type, build_params = create_index_config(FAQ_COLLECTION_NAME, 30)
+    assert index_type == "FLAT"
+    assert build_params == {}
+
+
+def test_auto_index_is_ivf_for_large_collections():
+    """Test that AUTO picks IVF_FLAT with nlist scaled to the collection size."""
+    index_type, build_params = create_index_config(CHILD_COLLECTION_NAME, 1_000_000)
+    assert index_type == "IVF_FLAT"
+    assert build_params == {"nlist": 4000}
+
+
+def test_index_config_from_settings():
+    """Test that the configured index type and params override the defaults."""
+    config = {
+        CHILD_COLLECTION_NAME: {
+            "index_type": "hnsw",
+            "build_params": {"M": 32},
+            "search_params": {"ef": 128},
+        }
+    }
+    with patch.object(settings, "VECTOR_INDEX_CONFIG", config):
+        index_type, build_params = create_index_config(CHILD_COLLECTION_NAME, 10)
+        search_params = create_search_params(CHILD_COLLECTION_NAME, index_type)
+
+    assert index_type == "HNSW"
+    assert build_params == {"M": 32, "efConstruction": 200}
+    assert search_params == {"metric_type": "IP", "params": {"ef": 128}}
+
+
+def test_flat_search_params_have_no_nprobe():
+    """Test that FLAT indexes are searched without IVF parameters."""
+    assert create_search_params(FAQ_COLLECTION_NAME, "FLAT") == {
+        "metric_type": "IP",
+        "params": {},
+    }
@@ -0,0 +1,82 @@
+import threading
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from semanticsearch.schedulers import *
+
+
+def fake_encode(texts):
+    """Encode each text as a row filled with its length."""
+    return np.array([[len(text)] * 4 for text in texts], dtype=np.float32)
+
+
+class TestEmbeddingBatchScheduler:
+    """Test suite for EmbeddingBatchScheduler."""
+
+    def test_returns_rows_for_each_caller(self):
+        """Test that each caller gets back only its own rows."""
+        scheduler = EmbeddingBatchScheduler(fake_encode, max_wait_ms=20)
+
+        first = scheduler.submit(["a", "bb"])
+        second = scheduler.submit(["ccc"])
+
+        np.testing.assert_array_equal(first.result(1)[:, 0], [1, 2])
+        np.testing.assert_array_equal(second.result(1)[:, 0], [3])
+
+    def test_coalesces_concurrent_requests(self):
+        """Test that concurrent requests are served by a single encoder call."""
+        calls = []
+        scheduler = EmbeddingBatchScheduler(
+            lambda texts: calls.append(list(texts)) or fake_encode(texts),
+            max_wait_ms=200,
+        )
+        barrier = threading.Barrier(8)
+
+        def encode(i):
+            barrier.wait()
+            return scheduler.encode(["x" * (i + 1)], timeout=2)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(encode, range(8)))
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == sorted("x" * (i + 1) for i in range(8))
+        assert [int(r[0, 0]) for r in results] == list(range(1, 9))
+        assert scheduler.stats()["batch_size_histogram"] == {8: 1}
+
+    def test_respects_max_batch_size(self):
+        """Test that a request overflowing the batch is carried to the next one."""
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_encode(texts):
+            calls.append(len(texts))
+            started.set()
+            release.wait(1)
+            return fake_encode(texts)
+
+        scheduler = EmbeddingBatchScheduler(
+            blocking_encode, max_batch_size=3, max_wait_ms=50
+        )
+        blocker = scheduler.submit(["block"])
+        started.wait(1)
+        futures = [scheduler.submit(["a", "b"]) for _ in range(3)]
+        assert scheduler.stats()["queue_depth"] == 3
+        release.set()
+
+        for future in [blocker, *futures]:
+            future.result(1)
+        assert calls == [1, 2, 2, 2]
+
+    def test_propagates_encoder_errors(self):
+        """Test that an encoder failure is raised to every caller in the batch."""
+
+        def failing_encode(texts):
+            raise RuntimeError("model failure")
+
+        scheduler = EmbeddingBatchScheduler(failing_encode)
+
+        with pytest.raises(RuntimeError, match="model failure"):
+            scheduler.encode(["a"], timeout=1)
@@ -1,8 +1,21 @@
+import threading
+import numpy as np
+import pytest
 from unittest.mock import MagicMock, patch
 
+from django.test import override_settings
+
 from semanticsearch.services import *
 
 
+@pytest.fixture(autouse=True)
+def clear_embedding_cache():
+    """Start every test with an empty embedding cache."""
+    EmbeddingCacheService.clear()
+    yield
+    EmbeddingCacheService.clear()
+
+
 class TestUSEModelService:
     """Test suite for USEModelService."""
 
@@ -24,11 +37,213 @@ class TestUSEModelService:
     def test_get_vector_representation_returns_expected_array(self, mock_load_model):
         """Test that get_vector_representation returns the expected vector array."""
         mock_model = MagicMock()
-        fake_numpy_array = MagicMock()
+        fake_numpy_array = np.full((1, NUM_DIM), 0.5)
         mock_model.return_value.numpy.return_value = fake_numpy_array
 
         USEModelService._model = mock_model
         result = USEModelService.get_vector_representation(["Hello world"])
 
-        assert result == fake_numpy_array
+        np.testing.assert_array_equal(result, fake_numpy_array)
+        assert result.dtype == np.float32
         mock_model.assert_called_once_with(["Hello world"])
+
+    @patch("semanticsearch.services.USEModelService.load_model")
+    def test_get_vector_representation_only_encodes_cache_misses(self, mock_load_model):
+        """Test that cached texts are not sent to the model again."""
+        mock_model = MagicMock()
+        mock_model.side_effect = lambda texts: MagicMock(
+            numpy=lambda: np.arange(len(texts) * NUM_DIM).reshape(len(texts), NUM_DIM)
+        )
+        USEModelService._model = mock_model
+
+        first = USEModelService.get_vector_representation(["donation methods"])
+        result = USEModelService.get_vector_representation(
+            ["  Donation   Methods ", "girls in Kenya"]
+        )
+
+        assert mock_model.call_count == 2
+        mock_model.assert_called_with(["girls in Kenya"])
+        np.testing.assert_array_equal(result[0], first[0])
+        assert result.shape == (2, NUM_DIM)
+
+    @patch("semanticsearch.services.USEModelService.load_model")
+    def test_get_vector_representation_without_cache(self, mock_load_model):
+        """Test that use_cache=False always runs the model and stores nothing."""
+        mock_model = MagicMock()
+        mock_model.return_value.numpy.return_value = np.zeros((1, NUM_DIM))
+        USEModelService._model = mock_model
+
+        USEModelService.get_vector_representation(["hello"], use_cache=False)
+        USEModelService.get_vector_representation(["hello"], use_cache=False)
+
+        assert mock_model.call_count == 2
+        assert EmbeddingCacheService.stats()["size"] == 0
+
+    @patch.object(settings, "EMBEDDING_BACKEND", EMBEDDING_BACKEND_SERVER)
+    @patch("semanticsearch.services.EmbeddingServerClient.encode")
+    def test_server_backend_delegates_to_embedding_server(self, mock_encode):
+        """Test that the server backend never loads the model in this process."""
+        mock_encode.return_value = np.ones((1, NUM_DIM), dtype=np.float32)
+        USEModelService._model = None
+
+        result = USEModelService.get_vector_representation(["hello"])
+
+        mock_encode.assert_called_once_with(["hello"])
+        assert USEModelService._model is None
+        assert result.shape == (1, NUM_DIM)
+
+
+class TestEmbeddingCacheService:
+    """Test suite for EmbeddingCacheService."""
+
+    def test_counts_hits_and_misses(self):
+        """Test that lookups update the hit and miss counters."""
+        EmbeddingCacheService.set_many(["a"], np.ones((1, NUM_DIM)))
+
+        vectors = EmbeddingCacheService.get_many(["a", "b"])
+
+        assert vectors[0].dtype == np.float32
+        assert vectors[1] is None
+        stats = EmbeddingCacheService.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @patch.object(settings, "EMBEDDING_CACHE_MAX_ENTRIES", 2)
+    def test_evicts_least_recently_used_entry(self):
+        """Test that the LRU tier stays bounded and evicts the oldest entry."""
+        EmbeddingCacheService.set_many(["a", "b"], np.ones((2, NUM_DIM)))
+        EmbeddingCacheService.get_many(["a"])
+        EmbeddingCacheService.set_many(["c"], np.ones((1, NUM_DIM)))
+
+        vectors = EmbeddingCacheService.get_many(["a", "b", "c"])
+
+        assert vectors[1] is None
+        assert vectors[0] is not None and vectors[2] is not None
+        assert EmbeddingCacheService.stats()["evictions"] == 1
+        assert EmbeddingCacheService.stats()["size"] == 2
+
+    def test_key_includes_model_fingerprint(self):
+        """Test that keys change when the model version changes."""
+        key = EmbeddingCacheService.make_key("hello")
+        with override_settings(EMBEDDING_MODEL_VERSION="othermodel"):
+            assert EmbeddingCacheService.make_key("hello") != key
+
+    def test_key_ignores_local_model_files(self):
+        """Test that keys do not depend on the local model directory."""
+        key = EmbeddingCacheService.make_key("hello")
+        with override_settings(USE_MODEL_DIR="/nonexistent"):
+            assert EmbeddingCacheService.make_key("hello") == key
+
+    def test_reads_from_shared_tier_on_local_miss(self):
+        """Test that a local miss is served from the shared Redis tier."""
+        vector = np.full(NUM_DIM, 0.25, dtype=np.float32)
+        mock_redis = MagicMock()
+        mock_redis.mget.return_value = [vector.tobytes()]
+
+        with patch.object(EmbeddingCacheService, "_redis", mock_redis):
+            result = EmbeddingCacheService.get_many(["shared text"])
+
+        np.testing.assert_array_equal(result[0], vector)
+        assert EmbeddingCacheService.stats()["shared_hits"] == 1
+        assert EmbeddingCacheService.stats()["size"] == 1
+
+
+class TestSearchExecutorService:
+    """Test suite for SearchExecutorService and the awaitable search API."""
+
+    @pytest.mark.asyncio
+    @patch("semanticsearch.services.USEModelService.get_vector_representation")
+    async def test_aget_vector_representation_runs_off_loop(self, mock_get_vectors):
+        """Test that the awaitable variant runs the blocking call on a pool thread."""
+        caller_threads = []
+        mock_get_vectors.side_effect = lambda texts: (
+            caller_threads.append(threading.current_thread().name)
+            or np.zeros((len(texts), NUM_DIM))
+        )
+
+        result = await USEModelService.aget_vector_representation(["hello"])
+
+        assert result.shape == (1, NUM_DIM)
+        assert caller_threads[0].startswith("semantic-search")
+
+    @pytest.mark.asyncio
+    @patch("semanticsearch.services.MilvusClientService.search_child_profiles")
+    async def test_asearch_child_profiles_times_out(self, mock_search):
+        """Test that a slow search raises TimeoutError after the given timeout."""
+        release = threading.Event()
+        mock_search.side_effect = lambda *args: release.wait(1)
+
+        with pytest.raises(TimeoutError):
+            await MilvusClientService.asearch_child_profiles(
+                np.zeros((1, NUM_DIM)), timeout=0.05
+            )
+        release.set()
+
+    @pytest.mark.asyncio
+    @patch("semanticsearch.services.MilvusClientService.search_faq_hybrid")
+    async def test_asearch_faq_hybrid_passes_arguments(self, mock_search):
+        """Test that the awaitable FAQ search forwards its arguments."""
+        mock_search.return_value = [[{"id": 1}]]
+        query_vectors = np.zeros((1, NUM_DIM))
+
+        result = await MilvusClientService.asearch_faq_hybrid(query_vectors, top_k=2)
+
+        assert result == [[{"id": 1}]]
+        mock_search.assert_called_once_with(query_vectors, 2)
+
+
+@pytest.mark.django_db
+class TestMilvusClientService:
+    """Test suite for MilvusClientService."""
+
+    @pytest.fixture(autouse=True)
+    def clear_active_collections(self):
+        MilvusClientService._active_collections.clear()
+        MilvusClientService._search_params.clear()
+        yield
+        MilvusClientService._active_collections.clear()
+        MilvusClientService._search_params.clear()
+
+    def test_resolve_collection_defaults_to_collection_name(self):
+        """Test that a collection without a sync state resolves to its own name."""
+        assert (
+            MilvusClientService.resolve_collection(FAQ_COLLECTION_NAME)
+            == FAQ_COLLECTION_NAME
+        )
+
+    def test_resolve_collection_returns_active_version(self):
+        """Test that a collection resolves to the version activated by a rebuild."""
+        from semanticsearch.models import VectorSyncState
+
+        state = VectorSyncState.objects.create(collection_name=FAQ_COLLECTION_NAME)
+        state.activate(f"{FAQ_COLLECTION_NAME}_v3", 3)
+
+        assert (
+            MilvusClientService.resolve_collection(FAQ_COLLECTION_NAME)
+            == f"{FAQ_COLLECTION_NAME}_v3"
+        )
+
+    def test_resolve_collection_is_cached(self, django_assert_num_queries):
+        """Test that the pointer is read from the DB once per cache period."""
+        with django_assert_num_queries(1):
+            MilvusClientService.resolve_collection(CHILD_COLLECTION_NAME)
+            MilvusClientService.resolve_collection(CHILD_COLLECTION_NAME)
+
+    def test_get_search_params_matches_built_index(self):
+        """Test that search params follow the index type of the collection and are cached."""
+        mock_client = MagicMock()
+        mock_client.describe_index.return_value = {"index_type": "IVF_FLAT"}
+
+        with patch.object(MilvusClientService, "_client", mock_client):
+            for _ in range(2):
+                params = MilvusClientService.get_search_params(
+                    CHILD_COLLECTION_NAME,
+                    f"{CHILD_COLLECTION_NAME}_v1",
+                    "profile_description_vector",
+                )
+
+        assert params == {"metric_type": "IP", "params": {"nprobe": 16}}
+        mock_client.describe_index.assert_called_once_with(
+            collection_name=f"{CHILD_COLLECTION_NAME}_v1",
+            index_name="profile_description_vector",
+        )
@@ -0,0 +1,53 @@
+# Utility functions for the semanticsearch app.
+import hashlib
+
+
+def compute_content_hash(*texts: str) -> str:
+    """
+    Return a stable SHA-256 hex digest of the given texts.
+    Used to detect whether the text behind a stored vector has changed.
+    """
+    hash_obj = hashlib.sha256()
+    for text in texts:
+        hash_obj.update(text.encode())
+        # Separator so ("ab", "c") and ("a", "bc") hash differently
+        hash_obj.update(b"\0")
+    return hash_obj.hexdigest()
+
+
+def collection_matches_schema(client, collection_name: str, schema) -> bool:
+    """Return True if the collection exists and has every field of the schema."""
+    if not client.has_collection(collection_name=collection_name):
+        return False
+    description = client.describe_collection(collection_name=collection_name)
+    stored_fields = {field["name"] for field in description["fields"]}
+    return all(field.name in stored_fields for field in schema.fields)
+
+
+def escape_filter_value(value: str) -> str:
+    """Quote a string for use in a Milvus filter expression."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def encode_date(value) -> int:
+    """Encode a date as a YYYYMMDD integer, which orders like the date."""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def fetch_stored_fields(client, collection_name: str, fields: list) -> dict:
+    """
+    Return a mapping of primary key to the given scalar fields for every row
+    of the collection, read with a query iterator.
+    """
+    stored = {}
+    iterator = client.query_iterator(
+        collection_name=collection_name,
+        batch_size=1000,
+        filter="id >= 0",
+        output_fields=["id", *fields],
+    )
+    while rows := iterator.next():
+        stored.update({row["id"]: row for row in rows})
+    iterator.close()
+    return stored
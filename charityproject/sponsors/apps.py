@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class SponsorsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sponsors"
+
+    def ready(self):
+        """
+        This method is called when the app is ready.
+        """
+        # Register signal handlers
+        from sponsors import signals
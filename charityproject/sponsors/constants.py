@@ -1,2 +1,31 @@
 # Items per page in the children list view
 CHILDREN_ITEMS_PER_PAGE = 6
+
+# Gender codes stored on Child for filtering without joining Gender, by Gender name
+GENDER_CODES = {
+    "Male": "M",
+    "Female": "F",
+    "Other": "O",
+}
+
+# ChildSearchForm fields, in the order ChildRepository.fetch_filtered_by takes them
+CHILD_SEARCH_FIELDS = (
+    "country",
+    "gender",
+    "min_age",
+    "max_age",
+    "birth_month",
+    "birth_day",
+)
+
+# Pagination modes of the children list view
+PAGINATION_MODE_PAGE = "page"
+PAGINATION_MODE_CURSOR = "cursor"
+
+# Cache keys of the child counts: entries live under the current generation
+CHILD_COUNT_KEY_PREFIX = "sponsors:child_count"
+CHILD_COUNT_GENERATION_KEY = "sponsors:child_count_generation"
+
+# Child CSV import: rows parsed and inserted per transaction, and rows per INSERT
+CHILD_IMPORT_CHUNK_SIZE = 10000
+CHILD_IMPORT_BATCH_SIZE = 1000
@@ -1,5 +1,7 @@
 from django import forms
 from sponsors.models import *
+from sponsors.repositories import ChildRepository
+from sponsors.constants import GENDER_CODES
 from calendar import month_name
 
 
@@ -64,6 +66,26 @@ class ChildSearchForm(forms.Form):
         widget=forms.Select(attrs=form_control_class),
     )
 
+    def set_facet_counts(self, facets: dict) -> None:
+        """
+        Show the number of matching children next to each country and gender,
+        given the counts returned by ChildCountService.facets.
+        """
+        country_counts = facets["country"]
+        self.fields["country"].label_from_instance = (
+            lambda country: f"{country.name} ({country_counts.get(country.pk, 0)})"
+        )
+        gender_counts = facets["gender"]
+        choices = []
+        for choice, label in self.fields["gender"].choices:
+            if choice in ChildRepository.GENDER_MAP:
+                gender_code = GENDER_CODES[ChildRepository.GENDER_MAP[choice]]
+                count = gender_counts.get(gender_code, 0)
+            else:
+                count = sum(gender_counts.values())
+            choices.append((choice, f"{label} ({count})"))
+        self.fields["gender"].choices = choices
+
     def clean(self):
         """Validate form data before processing."""
         cleaned_data = super().clean()
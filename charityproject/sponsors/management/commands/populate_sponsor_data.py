@@ -1,11 +1,16 @@
-import csv
+import csv, time
+from itertools import islice
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction
 
 from sponsors.models import *
+from sponsors.repositories import ChildRepository
+from sponsors.services import ChildCountService
+from sponsors.constants import *
 from core.validators import *
 from core.utils import *
 from sponsors.utils import *
@@ -41,6 +46,18 @@ class Command(BaseCommand):
             default="children.csv",
             help="The CSV file to load child data from (default: children.csv).",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHILD_IMPORT_CHUNK_SIZE,
+            help="Number of child rows parsed and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CHILD_IMPORT_BATCH_SIZE,
+            help="Number of child rows per INSERT statement.",
+        )
 
     def handle(self, *args, **kwargs):
         # Get the file path from the command line arguments
@@ -64,8 +81,9 @@ class Command(BaseCommand):
         total_records = 0
 
         try:
-            # Delete exisiting data
-            Child.objects.all().delete()
+            # Delete exisiting data. Children are deleted with one DELETE
+            # and no signals; counts are invalidated below
+            ChildRepository.delete_all()
             Country.objects.all().delete()
             Gender.objects.all().delete()
 
@@ -89,14 +107,19 @@ class Command(BaseCommand):
             )
             total_records += len(gender_records)
             # Load and insert child data
-            childlen_records = self.read_child_data(file_paths["child"])
-            Child.objects.bulk_create(childlen_records)
+            started = time.monotonic()
+            child_count, rejected_count = self.import_child_data(
+                file_paths["child"], kwargs["chunk_size"], kwargs["batch_size"]
+            )
+            elapsed = time.monotonic() - started
             write_success(
                 self.stdout,
                 self.style,
-                f"{len(childlen_records)} items created from {kwargs['child']}",
+                f"{child_count} items created from {kwargs['child']} "
+                f"({rejected_count} rows rejected, "
+                f"{child_count / max(elapsed, 1e-6):.0f} rows/s)",
             )
-            total_records += len(childlen_records)
+            total_records += child_count
 
             write_success(
                 self.stdout, self.style, f"Total records created: {total_records}"
@@ -107,6 +130,10 @@ class Command(BaseCommand):
                 self.style,
                 f"An error occurred while populating the database: {e}",
             )
+        finally:
+            # Neither the delete nor bulk_create sends signals, so drop the
+            # cached counts once, even if the import stopped halfway
+            ChildCountService.invalidate()
 
     def read_country_data(self, file_path):
         """
@@ -172,45 +199,67 @@ class Command(BaseCommand):
                     continue
         return genders
 
-    def read_child_data(self, file_path):
+    def import_child_data(self, file_path, chunk_size, batch_size):
         """
-        Read and validate child data from a CSV file, including foreign key references.
+        Stream child data from a CSV file into the database, one chunk of rows
+        per transaction, so memory use does not grow with the file.
+        Returns the numbers of created children and rejected rows.
         """
-        children = []
+        genders = {gender.name: gender for gender in Gender.objects.all()}
+        countries = {country.name: country for country in Country.objects.all()}
+        self.rejected_count = 0
+        child_count = 0
         with open(file_path, mode="r", encoding="utf-8") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",")
-            csv_reader.__next__()
-            for row in csv_reader:
-                try:
-                    # Extract and clean the row data
-                    name = row[0].strip()
-                    gender = Gender.objects.get(name=row[1].strip())
-                    country = Country.objects.get(name=row[2].strip())
-                    profile_description = row[3].strip()
-                    birth_date_str = row[4].strip()
-                    # Validate individual fields
-                    max_length_255_validator(name)
-                    validate_birth_date(birth_date_str)
-                    # Convert the valid string to a datetime.date object
-                    birth_date = datetime.strptime(birth_date_str, "%Y-%m-%d").date()
-                    # Compute age from birth date
-                    age = calculate_age(birth_date)
-                    # Create and append the child object
-                    children.append(
-                        Child(
-                            name=name,
-                            age=age,
-                            gender=gender,
-                            country=country,
-                            profile_description=profile_description,
-                            date_of_birth=birth_date,
-                        )
-                    )
-                except Exception as e:
-                    write_error(
-                        self.stdout,
-                        self.style,
-                        f"Exception in row {csv_reader.line_num}: {e}",
-                    )
-                    continue
-        return children
+            children = self.read_child_data(csv_file, genders, countries)
+            while chunk := list(islice(children, chunk_size)):
+                with transaction.atomic():
+                    Child.objects.bulk_create(chunk, batch_size=batch_size)
+                child_count += len(chunk)
+        return child_count, self.rejected_count
+
+    def read_child_data(self, csv_file, genders, countries):
+        """
+        Read and validate child data from a CSV file, resolving the foreign key
+        references from the preloaded genders and countries by name.
+        Yields the children of valid rows and counts the rejected rows.
+        """
+        csv_reader = csv.reader(csv_file, delimiter=",")
+        csv_reader.__next__()
+        for row in csv_reader:
+            try:
+                # Extract and clean the row data
+                name = row[0].strip()
+                gender = genders.get(row[1].strip())
+                if gender is None:
+                    raise Gender.DoesNotExist("Gender matching query does not exist.")
+                country = countries.get(row[2].strip())
+                if country is None:
+                    raise Country.DoesNotExist("Country matching query does not exist.")
+                profile_description = row[3].strip()
+                birth_date_str = row[4].strip()
+                # Validate individual fields
+                max_length_255_validator(name)
+                # Validate and convert the string to a datetime.date object
+                birth_date = validate_birth_date(birth_date_str)
+                # Compute age from birth date
+                age = calculate_age(birth_date)
+                # Create the child object
+                child = Child(
+                    name=name,
+                    age=age,
+                    gender=gender,
+                    country=country,
+                    profile_description=profile_description,
+                    date_of_birth=birth_date,
+                )
+                # bulk_create does not call save(), which sets the search columns
+                child.set_search_fields()
+            except Exception as e:
+                self.rejected_count += 1
+                write_error(
+                    self.stdout,
+                    self.style,
+                    f"Exception in row {csv_reader.line_num}: {e}",
+                )
+                continue
+            yield child
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sponsors.repositories import ChildRepository
+from sponsors.services import ChildCountService
+from core.utils import *
+
+
+class Command(BaseCommand):
+    # python manage.py rebuild_child_search_fields --help
+    help = (
+        "Recompute the birth month, birth day and gender code search columns "
+        "of every child from date_of_birth and gender.\n\n"
+        "Run it after changing children with bulk operations that bypass "
+        "Child.save, such as QuerySet.update.\n\n"
+    )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        updated = ChildRepository.rebuild_search_fields()
+        # QuerySet.update sends no signals, so drop the cached counts here
+        ChildCountService.invalidate()
+        write_success(
+            self.stdout,
+            self.style,
+            f"Rebuilt the search columns of {updated} children "
+            f"in {time.monotonic() - started:.2f} s",
+        )
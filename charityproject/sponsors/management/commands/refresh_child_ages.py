@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sponsors.repositories import ChildRepository
+from sponsors.services import ChildCountService
+from core.utils import *
+
+
+class Command(BaseCommand):
+    # python manage.py refresh_child_ages --help
+    help = (
+        "Recompute the stored age of every child from its date of birth.\n\n"
+        "Search filters do not depend on the stored age, but pages display it, "
+        "so run this daily, e.g. from cron.\n\n"
+    )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        updated = ChildRepository.refresh_ages()
+        if updated:
+            # QuerySet.update sends no signals, so drop the cached counts here
+            ChildCountService.invalidate()
+        write_success(
+            self.stdout,
+            self.style,
+            f"Updated the age of {updated} children "
+            f"in {time.monotonic() - started:.2f} s",
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sponsors", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="child",
+            index=models.Index(
+                fields=["name", "id"], name="sponsors_ch_name_5517c2_idx"
+            ),
+        ),
+    ]
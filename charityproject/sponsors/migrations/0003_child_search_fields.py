@@ -0,0 +1,68 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:52
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+# GENDER_CODES at the time of this migration
+GENDER_CODES = {"Male": "M", "Female": "F", "Other": "O"}
+
+
+def fill_search_fields(apps, schema_editor):
+    """Fill the new search columns of the existing children."""
+    Child = apps.get_model("sponsors", "Child")
+    Gender = apps.get_model("sponsors", "Gender")
+    Child.objects.update(
+        birth_month=ExtractMonth("date_of_birth"),
+        birth_day=ExtractDay("date_of_birth"),
+    )
+    for gender in Gender.objects.all():
+        Child.objects.filter(gender=gender).update(
+            gender_code=GENDER_CODES.get(gender.name, "")
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sponsors", "0002_child_sponsors_ch_name_5517c2_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="child",
+            name="birth_day",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="child",
+            name="birth_month",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="child",
+            name="gender_code",
+            field=models.CharField(blank=True, editable=False, max_length=1),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="child",
+            index=models.Index(
+                fields=["country", "gender_code", "birth_month", "birth_day"],
+                name="sponsors_ch_country_8ca73a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="child",
+            index=models.Index(
+                fields=["gender_code", "birth_month", "birth_day"],
+                name="sponsors_ch_gender__0ae344_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="child",
+            index=models.Index(
+                fields=["birth_month", "birth_day"],
+                name="sponsors_ch_birth_m_223955_idx",
+            ),
+        ),
+    ]
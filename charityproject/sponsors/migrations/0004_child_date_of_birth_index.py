@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sponsors", "0003_child_search_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="child",
+            index=models.Index(
+                fields=["date_of_birth"], name="sponsors_ch_date_of_2cbdbf_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 
 from core.constants import *
+from sponsors.constants import GENDER_CODES
 
 
 class Country(models.Model):
@@ -64,15 +65,48 @@ class Child(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # Search columns copied from date_of_birth and gender by save(), so the
+    # children list filters are answered from indexes
+    birth_month = models.PositiveSmallIntegerField(default=0, editable=False)
+    birth_day = models.PositiveSmallIntegerField(default=0, editable=False)
+    gender_code = models.CharField(max_length=1, blank=True, editable=False)
+
+    # Fields derived by set_search_fields
+    SEARCH_FIELDS = ("birth_month", "birth_day", "gender_code")
 
     class Meta:
         ordering = ["name"]
         indexes = [
             models.Index(fields=["name"]),
+            # Keyset pagination of the children list seeks on (name, id)
+            models.Index(fields=["name", "id"]),
             models.Index(fields=["country"]),
+            # Age filters are date of birth ranges
+            models.Index(fields=["date_of_birth"]),
+            # Filter combinations of the children list search form
+            models.Index(fields=["country", "gender_code", "birth_month", "birth_day"]),
+            models.Index(fields=["gender_code", "birth_month", "birth_day"]),
+            models.Index(fields=["birth_month", "birth_day"]),
         ]
         verbose_name = "Child"
         verbose_name_plural = "Children"
 
     def __str__(self):
         return f"{self.name} ({self.age}), {self.country.name}, {self.date_of_birth}"
+
+    def set_search_fields(self):
+        """Copy the birth month, birth day and gender code to the search columns."""
+        # date_of_birth may still be the assigned string
+        date_of_birth = self._meta.get_field("date_of_birth").to_python(
+            self.date_of_birth
+        )
+        self.birth_month = date_of_birth.month
+        self.birth_day = date_of_birth.day
+        self.gender_code = GENDER_CODES.get(self.gender.name, "")
+
+    def save(self, *args, **kwargs):
+        self.set_search_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.SEARCH_FIELDS}
+        super().save(*args, **kwargs)
@@ -0,0 +1,144 @@
+import base64, binascii, json
+from collections.abc import Sequence
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.query import QuerySet
+
+
+class CursorPaginator:
+    """
+    Keyset (seek) paginator.
+
+    Rows are ordered by the given fields, the last of which must be unique.
+    A page is fetched with a predicate on the ordering key of the row it
+    starts after (or before), so every page costs one indexed range scan of
+    per_page + 1 rows regardless of how deep it is, and no COUNT(*) is run.
+
+    Cursors are opaque URL-safe strings holding the direction and the key
+    of the boundary row. The total count is only known if it is passed in.
+    """
+
+    NEXT = "n"
+    PREVIOUS = "p"
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        per_page: int,
+        ordering: tuple = ("name", "id"),
+        count: Optional[int] = None,
+    ):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.count = count
+
+    def get_page(self, cursor: Optional[str]) -> "CursorPage":
+        """
+        Return the page the cursor points to. A missing or invalid cursor
+        returns the first page.
+        """
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            return self.first_page()
+        direction, key = decoded
+        try:
+            queryset = self.queryset.filter(
+                self.seek(key, "gt" if direction == self.NEXT else "lt")
+            )
+        except (TypeError, ValueError, ValidationError):
+            # The key does not fit the ordering fields
+            return self.first_page()
+
+        if direction == self.NEXT:
+            rows = self.fetch(queryset.order_by(*self.ordering))
+            return self.make_page(
+                rows[: self.per_page], True, len(rows) > self.per_page
+            )
+        rows = self.fetch(queryset.order_by(*[f"-{f}" for f in self.ordering]))
+        return self.make_page(
+            rows[: self.per_page][::-1], len(rows) > self.per_page, True
+        )
+
+    def first_page(self) -> "CursorPage":
+        rows = self.fetch(self.queryset.order_by(*self.ordering))
+        return self.make_page(rows[: self.per_page], False, len(rows) > self.per_page)
+
+    def fetch(self, queryset: QuerySet) -> list:
+        """Fetch one row more than a page, to know whether another page follows."""
+        return list(queryset[: self.per_page + 1])
+
+    def seek(self, key: list, lookup: str) -> Q:
+        """
+        Build the predicate selecting rows after (gt) or before (lt) the key
+        in the lexicographic order of the ordering fields.
+        """
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        predicate = Q()
+        for index, field in enumerate(self.ordering):
+            equal = dict(zip(self.ordering[:index], key[:index]))
+            predicate |= Q(**equal, **{f"{field}__{lookup}": key[index]})
+        return predicate
+
+    def make_page(self, rows: list, has_previous: bool, has_next: bool) -> "CursorPage":
+        previous_cursor = next_cursor = None
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(self.PREVIOUS, self.row_key(rows[0]))
+        if rows and has_next:
+            next_cursor = self.encode_cursor(self.NEXT, self.row_key(rows[-1]))
+        return CursorPage(rows, self, previous_cursor, next_cursor)
+
+    def row_key(self, row) -> list:
+        return [getattr(row, field) for field in self.ordering]
+
+    def encode_cursor(self, direction: str, key: list) -> str:
+        payload = json.dumps([direction, *key], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: Optional[str]) -> Optional[tuple]:
+        """Return (direction, key) of a cursor, or None if it is missing or invalid."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, *key = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if direction not in (self.NEXT, self.PREVIOUS):
+            return None
+        if len(key) != len(self.ordering):
+            return None
+        # Key values are the scalars encode_cursor wrote
+        if not all(isinstance(value, (str, int, float)) for value in key):
+            return None
+        return direction, key
+
+
+class CursorPage(Sequence):
+    """A page of CursorPaginator, with the cursors of its neighbours."""
+
+    def __init__(
+        self,
+        object_list: list,
+        paginator: CursorPaginator,
+        previous_cursor: Optional[str],
+        next_cursor: Optional[str],
+    ):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
@@ -1,6 +1,12 @@
+from datetime import date
+
+from django.db.models import Min
+from django.db.models.functions import ExtractDay, ExtractMonth
 from django.db.models.query import QuerySet
 
 from sponsors.models import *
+from sponsors.constants import GENDER_CODES
+from sponsors.utils import birth_date_range, calculate_age
 
 
 class ChildRepository:
@@ -48,11 +54,17 @@ class ChildRepository:
 
     @staticmethod
     def apply_age_filter(queryset, min_age, max_age):
-        """Filter by age range."""
-        if min_age:
-            queryset = queryset.filter(age__gte=min_age)
-        if max_age:
-            queryset = queryset.filter(age__lte=max_age)
+        """
+        Filter by age range, as a date of birth range so the result is correct
+        on any day and can use the date_of_birth index.
+        """
+        born_after, born_on_or_before = birth_date_range(
+            min_age or None, max_age or None
+        )
+        if born_on_or_before:
+            queryset = queryset.filter(date_of_birth__lte=born_on_or_before)
+        if born_after:
+            queryset = queryset.filter(date_of_birth__gt=born_after)
         return queryset
 
     @staticmethod
@@ -64,18 +76,71 @@ class ChildRepository:
 
     @staticmethod
     def apply_gender_filter(queryset, gender):
-        """Filter by gender."""
+        """Filter by gender, using the gender code stored on the child."""
         if gender and gender != "All":
             db_gender = ChildRepository.GENDER_MAP.get(gender)
             if db_gender:
-                queryset = queryset.filter(gender__name=db_gender)
+                queryset = queryset.filter(gender_code=GENDER_CODES[db_gender])
         return queryset
 
     @staticmethod
     def apply_birth_date_filter(queryset, birth_month, birth_day):
-        """Filter by birth month and day."""
+        """Filter by birth month and day, using the columns stored on the child."""
         if birth_month:
-            queryset = queryset.filter(date_of_birth__month=int(birth_month))
+            queryset = queryset.filter(birth_month=int(birth_month))
         if birth_day:
-            queryset = queryset.filter(date_of_birth__day=int(birth_day))
+            queryset = queryset.filter(birth_day=int(birth_day))
         return queryset
+
+    @staticmethod
+    def refresh_ages(today=None) -> int:
+        """
+        Recompute the stored age of every child with one set-based UPDATE per
+        age: the children born between two birthday boundaries share an age.
+        Only rows whose age changed are written. Returns the number of
+        children updated.
+        """
+        today = today or date.today()
+        oldest = Child.objects.aggregate(oldest=Min("date_of_birth"))["oldest"]
+        if oldest is None:
+            return 0
+        updated = 0
+        for age in range(calculate_age(oldest, today) + 1):
+            born_after, born_on_or_before = birth_date_range(age, age, today)
+            updated += (
+                Child.objects.filter(
+                    date_of_birth__gt=born_after,
+                    date_of_birth__lte=born_on_or_before,
+                )
+                .exclude(age=age)
+                .update(age=age)
+            )
+        return updated
+
+    @staticmethod
+    def rebuild_search_fields() -> int:
+        """
+        Recompute the search columns of every child with set-based UPDATEs:
+        one for the birth month and day, and one per gender. Returns the
+        number of children updated.
+        """
+        updated = Child.objects.update(
+            birth_month=ExtractMonth("date_of_birth"),
+            birth_day=ExtractDay("date_of_birth"),
+        )
+        for gender in Gender.objects.all():
+            Child.objects.filter(gender=gender).update(
+                gender_code=GENDER_CODES.get(gender.name, "")
+            )
+        return updated
+
+    @staticmethod
+    def delete_all() -> int:
+        """
+        Delete every child with a single DELETE, without loading the rows or
+        sending a post_delete signal per child. Nothing references Child, so
+        there is nothing to cascade to. Callers must invalidate the cached
+        child counts. Returns the number of children deleted.
+        """
+        queryset = Child.objects.all()
+        return queryset._raw_delete(queryset.db)
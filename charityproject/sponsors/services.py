@@ -0,0 +1,111 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.query import QuerySet
+
+from sponsors.constants import *
+from sponsors.repositories import ChildRepository
+
+
+class ChildCountService:
+    """
+    Cached counts of the children matching a ChildSearchForm filter combination,
+    and per-country and per-gender facet counts for its dropdowns.
+
+    Entries are stored in the Django cache under the normalized filter tuple
+    and a generation number. Saving or deleting a child bumps the generation,
+    which orphans every entry at once; orphaned entries expire after
+    CHILD_COUNT_CACHE_TTL_SEC. With a shared cache backend the invalidation
+    reaches every process.
+    """
+
+    @staticmethod
+    def normalize_filters(
+        country=None,
+        gender=None,
+        min_age=None,
+        max_age=None,
+        birth_month=None,
+        birth_day=None,
+    ) -> tuple:
+        """
+        Return the filters as a hashable tuple, with values that do not filter
+        (empty, zero, "All") as None, matching how ChildRepository applies them.
+        """
+        return (
+            country.pk if country else None,
+            gender if gender in ChildRepository.GENDER_MAP else None,
+            min_age or None,
+            max_age or None,
+            int(birth_month) if birth_month else None,
+            int(birth_day) if birth_day else None,
+        )
+
+    @staticmethod
+    def get_generation() -> int:
+        """Return the current generation, starting one if there is none."""
+        cache.add(CHILD_COUNT_GENERATION_KEY, 1, timeout=None)
+        return cache.get(CHILD_COUNT_GENERATION_KEY, 1)
+
+    @staticmethod
+    def invalidate() -> None:
+        """Orphan every cached count by moving to the next generation."""
+        try:
+            cache.incr(CHILD_COUNT_GENERATION_KEY)
+        except ValueError:
+            # No generation yet, so nothing is cached under one
+            cache.add(CHILD_COUNT_GENERATION_KEY, 1, timeout=None)
+
+    @classmethod
+    def make_key(cls, kind: str, filters: Optional[tuple]) -> str:
+        values = ":".join("" if v is None else str(v) for v in filters or ())
+        return f"{CHILD_COUNT_KEY_PREFIX}:{cls.get_generation()}:{kind}:{values}"
+
+    @classmethod
+    def get_or_compute(cls, kind: str, filters: Optional[tuple], compute):
+        """Return the cached value, computing and storing it on a miss."""
+        if not settings.CHILD_COUNT_CACHE_ENABLED:
+            return compute()
+        key = cls.make_key(kind, filters)
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, settings.CHILD_COUNT_CACHE_TTL_SEC)
+        return value
+
+    @classmethod
+    def count(cls, queryset: QuerySet, filters: Optional[tuple]) -> int:
+        """
+        Return the number of rows of the queryset, which must be the children
+        matching the filters (None for the unfiltered list).
+        """
+        return cls.get_or_compute("count", filters, queryset.count)
+
+    @classmethod
+    def facets(cls, filters: Optional[tuple]) -> dict:
+        """
+        Return per-country and per-gender-code counts of the live children
+        matching the filters. Each facet ignores its own filter, so the counts show what
+        selecting another country or gender would return.
+        """
+        return cls.get_or_compute(
+            "facets", filters, lambda: cls.compute_facets(filters)
+        )
+
+    @staticmethod
+    def compute_facets(filters: Optional[tuple]) -> dict:
+        country, gender, *other_filters = filters or (None,) * 6
+        by_country = ChildRepository.fetch_filtered_by(None, gender, *other_filters)
+        by_gender = ChildRepository.fetch_filtered_by(country, None, *other_filters)
+        return {
+            "country": dict(
+                by_country.order_by().values_list("country").annotate(total=Count("id"))
+            ),
+            "gender": dict(
+                by_gender.order_by()
+                .values_list("gender_code")
+                .annotate(total=Count("id"))
+            ),
+        }
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sponsors.models import Child
+from sponsors.services import ChildCountService
+
+
+@receiver([post_save, post_delete], sender=Child)
+def invalidate_child_counts(sender, instance, **kwargs):
+    """Drop the cached child counts when a child changes."""
+    ChildCountService.invalidate()
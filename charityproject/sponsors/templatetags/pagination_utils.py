@@ -9,11 +9,14 @@ register = template.Library()
 def pagination_query_params(context, **kwargs):
     """
     A template tag for handling pagination query parameters.
-    Maintains current GET parameters while setting a new page number.
+    Maintains current GET parameters while setting a new page number or
+    cursor. Parameters set to None are removed.
 
     Example usage:
     {% pagination_query_params page=2 %}
+    {% pagination_query_params cursor=children.next_cursor page=None %}
     """
     query = context["request"].GET.dict()
     query.update(kwargs)
+    query = {key: value for key, value in query.items() if value is not None}
     return "?" + urlencode(query)
@@ -2,9 +2,17 @@ import pytest
 from io import StringIO
 from datetime import datetime
 
+from django.conf import settings
 from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete
+from unittest.mock import patch
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
 
 from sponsors.models import *
+from sponsors.services import ChildCountService
+from sponsors.utils import calculate_age
 
 
 @pytest.mark.django_db
@@ -35,8 +43,10 @@ def test_populate_sponsor_data():
     assert child.country == Country.objects.get(name="Kenya")
     assert child.profile_description == "Valid case"
     assert child.date_of_birth == datetime(2021, 6, 12).date()
+    assert (child.birth_month, child.birth_day, child.gender_code) == (6, 12, "M")
 
     output = out.getvalue()
+    assert "1 items created from children.csv (5 rows rejected" in output
     assert "row 4: ['This field must contain exactly 3 numeric digits.']" in output
     assert (
         "row 5: ['This field must contain exactly 2 uppercase alphabetic characters.']"
@@ -57,3 +67,105 @@ def test_populate_sponsor_data():
         "row 7: [\"The date '1900-06-12' cannot be earlier than 2000-01-01.\"]"
         in output
     )
+
+
+@pytest.mark.django_db
+def test_populate_sponsor_data_in_chunks(tmp_path):
+    """Test that children are imported across several chunks and INSERT batches."""
+    rows = [f"Child {i},Male,Kenya,Profile {i},2020-01-{i + 1:02}" for i in range(7)]
+    child_file = tmp_path / "children.csv"
+    child_file.write_text(
+        "name,gender,country,profile_description,date_of_birth\n"
+        + "\n".join(rows + ["Bad,Male,Kenya,Bad date,2020-13-01"])
+    )
+
+    out = StringIO()
+    call_command(
+        "populate_sponsor_data",
+        "--child",
+        str(child_file),
+        "--country",
+        str(settings.DATA_DIR / "test_countries.csv"),
+        "--gender",
+        str(settings.DATA_DIR / "test_genders.csv"),
+        "--chunk-size",
+        "3",
+        "--batch-size",
+        "2",
+        stdout=out,
+    )
+
+    assert Child.objects.count() == 7
+    assert Child.objects.get(name="Child 6").birth_day == 7
+    assert "7 items created from" in out.getvalue()
+    assert "(1 rows rejected" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_populate_sponsor_data_replaces_children_in_one_delete():
+    """Test that existing children are deleted with one query and counts are invalidated."""
+    baker.make("sponsors.Child", _quantity=3)
+    generation = ChildCountService.get_generation()
+
+    with CaptureQueriesContext(connection) as queries, patch.object(
+        post_delete, "disconnect"
+    ) as mock_disconnect:
+        call_command(
+            "populate_sponsor_data",
+            "--child",
+            str(settings.DATA_DIR / "test_children.csv"),
+            "--country",
+            str(settings.DATA_DIR / "test_countries.csv"),
+            "--gender",
+            str(settings.DATA_DIR / "test_genders.csv"),
+            stdout=StringIO(),
+        )
+
+    child_deletes = [
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].startswith(f'DELETE FROM "{Child._meta.db_table}"')
+    ]
+    # A fast delete has no WHERE clause, unlike one that collects rows for signals
+    assert len(child_deletes) == 1
+    assert "WHERE" not in child_deletes[0]
+    mock_disconnect.assert_not_called()
+    assert post_delete.has_listeners(Child)
+    assert ChildCountService.get_generation() > generation
+
+
+@pytest.mark.django_db
+def test_rebuild_child_search_fields():
+    """
+    Test that 'rebuild_child_search_fields' repairs search columns left stale
+    by a bulk update.
+    """
+    child = baker.make(
+        Child,
+        gender=baker.make(Gender, name="Other"),
+        date_of_birth=datetime(2018, 2, 14).date(),
+    )
+    Child.objects.update(birth_month=0, birth_day=0, gender_code="")
+
+    out = StringIO()
+    call_command("rebuild_child_search_fields", stdout=out)
+
+    child.refresh_from_db()
+    assert (child.birth_month, child.birth_day, child.gender_code) == (2, 14, "O")
+    assert "Rebuilt the search columns of 1 children" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_refresh_child_ages():
+    """Test that 'refresh_child_ages' updates only the ages that are out of date."""
+    birth_date = datetime(2015, 1, 1).date()
+    stale = baker.make(Child, age=1, date_of_birth=birth_date)
+    current = baker.make(Child, age=calculate_age(birth_date), date_of_birth=birth_date)
+
+    out = StringIO()
+    call_command("refresh_child_ages", stdout=out)
+
+    stale.refresh_from_db()
+    current.refresh_from_db()
+    assert stale.age == current.age == calculate_age(birth_date)
+    assert "Updated the age of 1 children" in out.getvalue()
@@ -76,6 +76,21 @@ class GenderModelTest(TestCase):
         with pytest.raises(Exception):
             baker.make(Gender, name=name)
 
+    def test_search_fields(self):
+        """Test that saving copies the birth month, birth day and gender code."""
+        child = baker.make(
+            Child,
+            gender=baker.make(Gender, name="Female"),
+            date_of_birth=date(2017, 5, 20),
+        )
+        child.refresh_from_db()
+        assert (child.birth_month, child.birth_day, child.gender_code) == (5, 20, "F")
+
+        child.date_of_birth = date(2016, 12, 3)
+        child.save(update_fields=["date_of_birth"])
+        child.refresh_from_db()
+        assert (child.birth_month, child.birth_day) == (12, 3)
+
     def test_field_constraints(self):
         """Test constraints on model fields."""
         name_max_length = Gender._meta.get_field("name").max_length
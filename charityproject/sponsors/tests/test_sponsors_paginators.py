@@ -0,0 +1,79 @@
+import pytest
+from model_bakery import baker
+
+from sponsors.models import *
+from sponsors.paginators import *
+
+
+@pytest.fixture
+def children():
+    """Create 7 children, two of them sharing a name, ordered by (name, id)."""
+    country = baker.make(Country, name="Kenya")
+    gender = baker.make(Gender, name="Female")
+    for name in ["Amy", "Bea", "Cara", "Cara", "Dana", "Eve", "Fay"]:
+        baker.make(Child, name=name, country=country, gender=gender)
+    return list(Child.objects.order_by("name", "id"))
+
+
+@pytest.mark.django_db
+class TestCursorPaginator:
+    def test_first_page(self, children):
+        """Test that the first page has no previous cursor."""
+        page = CursorPaginator(Child.objects.all(), 3).get_page(None)
+        assert list(page) == children[:3]
+        assert not page.has_previous()
+        assert page.has_next()
+
+    def test_walk_forward_and_back(self, children):
+        """Test that following the cursors visits every child once, in both directions."""
+        paginator = CursorPaginator(Child.objects.all(), 3)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        assert [list(page) for page in pages] == [
+            children[:3],
+            children[3:6],
+            children[6:],
+        ]
+        assert not pages[-1].has_next()
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        assert list(previous) == children[3:6]
+        assert previous.has_previous()
+        first = paginator.get_page(previous.previous_cursor)
+        assert list(first) == children[:3]
+        assert not first.has_previous()
+        assert first.has_next()
+
+    def test_page_boundary_between_equal_names(self, children):
+        """Test that children with the same name are split across pages by id."""
+        paginator = CursorPaginator(Child.objects.all(), 3)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        assert first[-1].name == second[0].name == "Cara"
+        assert first[-1].id < second[0].id
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "not-a-cursor",
+            # ["x","A",1]: unknown direction
+            "WyJ4IiwiQSIsMV0",
+            # ["n","A","x"]: id is not a number
+            "WyJuIiwiQSIsIngiXQ",
+            # ["n","a",[1]] and ["n",{},[1]]: key values are not scalars
+            "WyJuIiwiYSIsWzFdXQ",
+            "WyJuIix7fSxbMV1d",
+        ],
+    )
+    def test_invalid_cursor_returns_first_page(self, children, cursor):
+        """Test that a malformed or tampered cursor falls back to the first page."""
+        page = CursorPaginator(Child.objects.all(), 3).get_page(cursor)
+        assert list(page) == children[:3]
+
+    def test_empty_queryset(self):
+        """Test that an empty queryset gives an empty page without cursors."""
+        page = CursorPaginator(Child.objects.all(), 3).get_page(None)
+        assert len(page) == 0
+        assert not page.has_previous()
+        assert not page.has_next()
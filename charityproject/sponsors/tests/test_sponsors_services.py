@@ -0,0 +1,97 @@
+import pytest
+from datetime import date
+from model_bakery import baker
+
+from django.test import override_settings
+
+from sponsors.models import *
+from sponsors.services import *
+from sponsors.utils import years_before
+
+
+@pytest.fixture
+def children():
+    """Create children in two countries, and return the countries."""
+    male = baker.make(Gender, name="Male")
+    female = baker.make(Gender, name="Female")
+    kenya = baker.make(Country, name="Kenya")
+    uganda = baker.make(Country, name="Uganda")
+    five = years_before(date.today(), 5)
+    nine = years_before(date.today(), 9)
+    baker.make(Child, _quantity=2, country=kenya, gender=male, date_of_birth=five)
+    baker.make(Child, country=kenya, gender=female, date_of_birth=nine)
+    baker.make(Child, country=uganda, gender=female, date_of_birth=five)
+    return {"kenya": kenya, "uganda": uganda}
+
+
+def test_normalize_filters(db):
+    """Test that values that do not filter are normalized to None."""
+    assert (
+        ChildCountService.normalize_filters(None, "All", 0, None, "", "")
+        == ChildCountService.normalize_filters()
+    )
+    country = baker.make(Country)
+    assert ChildCountService.normalize_filters(country, "Girls", 3, 7, "5", "12") == (
+        country.pk,
+        "Girls",
+        3,
+        7,
+        5,
+        12,
+    )
+
+
+@pytest.mark.django_db
+class TestChildCountService:
+    def test_count_is_cached(self, children, django_assert_num_queries):
+        """Test that a repeated filter combination is counted once."""
+        filters = ChildCountService.normalize_filters(children["kenya"])
+        queryset = ChildRepository.fetch_filtered_by(children["kenya"])
+        with django_assert_num_queries(1):
+            assert ChildCountService.count(queryset, filters) == 3
+            assert ChildCountService.count(queryset, filters) == 3
+
+    def test_count_invalidated_on_save_and_delete(self, children):
+        """Test that saving or deleting a child drops the cached counts."""
+        filters = ChildCountService.normalize_filters()
+        assert (
+            ChildCountService.count(ChildRepository.fetch_filtered_by(), filters) == 4
+        )
+
+        child = baker.make(
+            Child, country=children["uganda"], gender=Gender.objects.first()
+        )
+        assert (
+            ChildCountService.count(ChildRepository.fetch_filtered_by(), filters) == 5
+        )
+
+        child.delete()
+        assert (
+            ChildCountService.count(ChildRepository.fetch_filtered_by(), filters) == 4
+        )
+
+    @override_settings(CHILD_COUNT_CACHE_ENABLED=False)
+    def test_count_not_cached_when_disabled(self, children, django_assert_num_queries):
+        """Test that every call counts when the cache is disabled."""
+        queryset = ChildRepository.fetch_filtered_by()
+        with django_assert_num_queries(2):
+            ChildCountService.count(queryset, None)
+            ChildCountService.count(queryset, None)
+
+    def test_facets_ignore_their_own_filter(self, children):
+        """Test that each facet counts the other filters but not its own."""
+        filters = ChildCountService.normalize_filters(
+            children["kenya"], "Girls", None, None, None, None
+        )
+        facets = ChildCountService.facets(filters)
+        # Girls in every country
+        assert facets["country"] == {children["kenya"].pk: 1, children["uganda"].pk: 1}
+        # Children of every gender in Kenya
+        assert facets["gender"] == {"M": 2, "F": 1}
+
+    def test_facets_apply_other_filters(self, children):
+        """Test that the facets count only children matching the other filters."""
+        filters = ChildCountService.normalize_filters(None, None, None, 5)
+        facets = ChildCountService.facets(filters)
+        assert facets["country"] == {children["kenya"].pk: 2, children["uganda"].pk: 1}
+        assert facets["gender"] == {"M": 2, "F": 1}
@@ -41,3 +41,27 @@ def test_calculate_age_leap_year(mock_today_2024_0330):
     """Should correctly calculate age for Feb 29 birthdate in a leap year."""
     birth_date = date(2004, 2, 29)
     assert calculate_age(birth_date) == 20
+
+
+def test_birth_date_range():
+    """Test that an age range becomes the matching date of birth range."""
+    today = date(2024, 3, 30)
+    assert birth_date_range(5, 10, today) == (date(2013, 3, 30), date(2019, 3, 30))
+    assert birth_date_range(None, None, today) == (None, None)
+
+
+@pytest.mark.parametrize(
+    "birth_date",
+    [date(2016, 2, 29), date(2016, 2, 28), date(2016, 3, 1), date(2015, 3, 1)],
+)
+@pytest.mark.parametrize(
+    "today", [date(2024, 2, 28), date(2024, 2, 29), date(2025, 2, 28)]
+)
+def test_birth_date_range_matches_calculate_age(birth_date, today):
+    """Test that the range agrees with calculate_age around leap days."""
+    age = calculate_age(birth_date, today)
+    born_after, born_on_or_before = birth_date_range(age, age, today)
+    assert born_after < birth_date <= born_on_or_before
+    born_after, born_on_or_before = birth_date_range(age + 1, age - 1, today)
+    assert not birth_date <= born_on_or_before
+    assert not born_after < birth_date
@@ -1,10 +1,13 @@
 import pytest
+from datetime import date
 from django.urls import reverse
 
 from model_bakery import baker
 from sponsors.models import *
 from sponsors.constants import *
+from sponsors.utils import years_before
 from django.core.paginator import Paginator
+from django.test import override_settings
 
 
 @pytest.mark.django_db
@@ -40,9 +43,30 @@ class TestSponsorViews:
         country1 = baker.make(Country, name="Uganda")
         country2 = baker.make(Country, name="Kenya")
 
-        baker.make(Child, name="Carlos", age=10, country=country1, gender=gender1)
-        baker.make(Child, name="John", age=7, country=country2, gender=gender1)
-        baker.make(Child, name="Maria", age=5, country=country2, gender=gender2)
+        baker.make(
+            Child,
+            name="Carlos",
+            age=10,
+            date_of_birth=years_before(date.today(), 10),
+            country=country1,
+            gender=gender1,
+        )
+        baker.make(
+            Child,
+            name="John",
+            age=7,
+            date_of_birth=years_before(date.today(), 7),
+            country=country2,
+            gender=gender1,
+        )
+        baker.make(
+            Child,
+            name="Maria",
+            age=5,
+            date_of_birth=years_before(date.today(), 5),
+            country=country2,
+            gender=gender2,
+        )
         return {"kenya": country2}
 
     @pytest.fixture
@@ -184,3 +208,47 @@ class TestSponsorViews:
 
         for child in second_page_children:
             assert child.name in content
+
+    @override_settings(CHILD_LIST_PAGINATION="cursor")
+    def test_child_list_cursor_pagination(self, client, list_url, paginated_children):
+        """Test that cursor pagination walks the list with Previous/Next links only."""
+        response = client.get(list_url, {"gender": "Girls"})
+        first_page = list(response.context["children"])
+        assert response.context["cursor_pagination"]
+        assert '<a class="page-link" href="#" tabindex="-1">Previous</a>' in (
+            response.content.decode("utf-8")
+        )
+
+        next_cursor = response.context["children"].next_cursor
+        response = client.get(list_url, {"gender": "Girls", "cursor": next_cursor})
+        second_page = list(response.context["children"])
+        content = response.content.decode("utf-8")
+
+        female_children = list(
+            paginated_children.filter(gender__name="Female").order_by("name", "id")
+        )
+        assert first_page + second_page == female_children
+        assert "gender=Girls&amp;cursor=" in content
+        assert '<a class="page-link" href="#" tabindex="-1">Next</a>' in content
+
+    @override_settings(
+        CHILD_LIST_PAGINATION="cursor", CHILD_LIST_CURSOR_COUNT_ENABLED=True
+    )
+    def test_child_list_cursor_pagination_count(
+        self, client, list_url, paginated_children
+    ):
+        """Test that cursor pagination shows the count only if enabled."""
+        response = client.get(list_url)
+        assert "20 children found" in response.content.decode("utf-8")
+
+    def test_child_list_shows_facet_counts(self, client, list_url, children_data):
+        """Test that the dropdowns show the number of children per country and gender."""
+        response = client.get(list_url, {"gender": "Boys"})
+        content = response.content.decode("utf-8")
+        # Boys per country
+        assert "Kenya (1)" in content
+        assert "Uganda (1)" in content
+        # Children per gender, in every country
+        assert "Boys (2)" in content
+        assert "Girls (1)" in content
+        assert "All (3)" in content
@@ -1,17 +1,47 @@
 from datetime import date
 
 
-def calculate_age(birth_date) -> int:
+def calculate_age(birth_date, today=None) -> int:
     """
-    Calculates the age based on the given birth date.
+    Calculates the age based on the given birth date, as of today unless
+    another day is given.
 
     This implementation is based on the example from:
     https://www.geeksforgeeks.org/python-program-to-calculate-age-in-year/
     """
-    today = date.today()
+    today = today or date.today()
     age = (
         today.year
         - birth_date.year
         - ((today.month, today.day) < (birth_date.month, birth_date.day))
     )
     return age
+
+
+def years_before(day: date, years: int) -> date:
+    """
+    Return the same calendar day the given number of years earlier.
+    February 29 becomes February 28 in years that are not leap years.
+    """
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def birth_date_range(min_age=None, max_age=None, today=None) -> tuple:
+    """
+    Translate an age range into a date of birth range, with the same notion
+    of age as calculate_age. Returns (born_after, born_on_or_before): a child
+    is between min_age and max_age today if born after born_after and on or
+    before born_on_or_before. A bound is None if its age is not given.
+    """
+    today = today or date.today()
+    born_after = born_on_or_before = None
+    if min_age is not None:
+        # Turned min_age on or before today
+        born_on_or_before = years_before(today, min_age)
+    if max_age is not None:
+        # Not yet turned max_age + 1
+        born_after = years_before(today, max_age + 1)
+    return born_after, born_on_or_before
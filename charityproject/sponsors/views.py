@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404
@@ -8,6 +9,8 @@ from django.http import JsonResponse
 from sponsors.repositories import *
 from sponsors.models import *
 from sponsors.forms import ChildSearchForm
+from sponsors.paginators import CursorPaginator
+from sponsors.services import ChildCountService
 from sponsors.constants import *
 from core.utils import track_user_with_session
 
@@ -27,15 +30,20 @@ def child_list(request):
     search_form = ChildSearchForm(request.GET or None)
 
     # Get filtered child data
+    filters = get_search_filters(search_form)
     children = get_filtered_children(search_form)
 
     # Paginate the child data
-    page_obj = paginate_children(children, request)
+    page_obj = paginate_children(children, request, filters)
+
+    # Show the number of matching children per country and gender
+    search_form.set_facet_counts(ChildCountService.facets(filters))
 
     # Create the context for rendering
     context = {
         "children": page_obj,
         "search_form": search_form,
+        "cursor_pagination": isinstance(page_obj.paginator, CursorPaginator),
     }
 
     return render(request, "sponsors/child_list.html", context)
@@ -99,8 +107,35 @@ def get_filtered_children(search_form):
     return children
 
 
-def paginate_children(children, request):
-    """Paginate the child data."""
+def get_search_filters(search_form):
+    """
+    Return the normalized filters of the search form, which key the cached
+    counts, or None if the form is not valid and the list is unfiltered.
+    """
+    if not search_form.is_valid():
+        return None
+    return ChildCountService.normalize_filters(
+        *(search_form.cleaned_data.get(field) for field in CHILD_SEARCH_FIELDS)
+    )
+
+
+def paginate_children(children, request, filters):
+    """
+    Paginate the child data by page number, or by cursor if
+    CHILD_LIST_PAGINATION is "cursor". Cursor pages are fetched with a keyset
+    predicate on (name, id) instead of a COUNT(*) and an OFFSET.
+    """
+    children = children.order_by("name", "id")
+    if settings.CHILD_LIST_PAGINATION == PAGINATION_MODE_CURSOR:
+        count = None
+        if settings.CHILD_LIST_CURSOR_COUNT_ENABLED:
+            count = ChildCountService.count(children, filters)
+        paginator = CursorPaginator(
+            children, CHILDREN_ITEMS_PER_PAGE, ("name", "id"), count
+        )
+        return paginator.get_page(request.GET.get("cursor"))
     paginator = Paginator(children, CHILDREN_ITEMS_PER_PAGE)
+    # Use the cached count instead of a COUNT(*) per page view
+    paginator.count = ChildCountService.count(children, filters)
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)